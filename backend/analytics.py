@@ -0,0 +1,313 @@
+"""
+Analítica de entrenamiento vectorizada con NumPy (/api/analytics/*).
+
+El historial del usuario se lee una sola vez como arrays columnares (fecha,
+ejercicio, peso, repeticiones, series, tiempo, distancia; NaN = NULL) y todos
+los cálculos se hacen en lote sobre esos arrays, sin bucles por fila:
+- volumen semanal o mensual con media móvil
+- tendencia lineal de la métrica principal por ejercicio (regresión con sumas
+  agrupadas por ejercicio) y detección de estancamientos
+- relación de carga aguda:crónica (ACWR: carga de 7 días frente a la media
+  semanal de los últimos 28)
+
+Con ANALYTICS_CACHE_MAX_BYTES > 0 los arrays se guardan por (usuario, versión
+de datos) en una LRU, así las distintas vistas del mismo historial no lo
+vuelven a leer.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+from models import Exercise, ProgressSummary, WorkoutEntry
+from progress import get_primary_metric_config
+from schemas import (
+    ExerciseTrend, TrendAnalytics, VolumeAnalytics, VolumePeriod, WorkloadAnalytics, WorkloadDay
+)
+
+# 0 desactiva la caché de historiales
+ANALYTICS_CACHE_MAX_BYTES = int(os.getenv("ANALYTICS_CACHE_MAX_BYTES", "67108864"))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "256"))
+
+METRIC_FIELDS = ("weight", "repetitions", "time_minutes", "distance_km")
+HISTORY_ARRAYS = ("day", "exercise_id", "sets", *METRIC_FIELDS)
+# Sesiones mínimas dentro de la ventana para hablar de estancamiento
+PLATEAU_MIN_SESSIONS = 3
+# Zonas de ACWR: (límite superior, nombre)
+WORKLOAD_ZONES = ((0.8, "low"), (1.3, "optimal"), (1.5, "caution"), (float("inf"), "high"))
+# 1970-01-01 fue jueves: sumar 3 días alinea las semanas al lunes
+EPOCH_WEEKDAY_OFFSET = 3
+
+
+@dataclass
+class UserHistory:
+    """Historial columnar de un usuario, ordenado por fecha"""
+    day: np.ndarray          # días desde 1970-01-01 (int64)
+    exercise_id: np.ndarray  # int64
+    weight: np.ndarray
+    repetitions: np.ndarray
+    sets: np.ndarray
+    time_minutes: np.ndarray
+    distance_km: np.ndarray
+    # exercise_id -> (nombre, grupo muscular)
+    exercises: Dict[int, tuple]
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in HISTORY_ARRAYS)
+
+    @property
+    def volume(self) -> np.ndarray:
+        # Igual que SUM(weight * repetitions * sets): las filas con algún NULL no suman
+        return np.nan_to_num(self.weight * self.repetitions * self.sets)
+
+
+history_cache = (
+    LRUCache(
+        "analytics_history",
+        ANALYTICS_CACHE_MAX_ENTRIES,
+        max_bytes=ANALYTICS_CACHE_MAX_BYTES,
+        sizeof=lambda history: history.nbytes
+    )
+    if ANALYTICS_CACHE_MAX_BYTES > 0 else None
+)
+
+
+def history_select(user_id: int):
+    # Índice (user_id, date). Solo hace falta el día: date() evita convertir cada fila a datetime
+    return select(
+        func.date(WorkoutEntry.date), WorkoutEntry.exercise_id, WorkoutEntry.weight, WorkoutEntry.repetitions,
+        WorkoutEntry.sets, WorkoutEntry.time_minutes, WorkoutEntry.distance_km
+    ).where(WorkoutEntry.user_id == user_id).order_by(WorkoutEntry.date)
+
+
+def history_exercises_select(user_id: int):
+    # Hay un resumen por cada ejercicio con entrenamientos: no se recorre workout_entries otra vez
+    return (
+        select(Exercise.id, Exercise.name, Exercise.muscle_group)
+        .join(ProgressSummary, ProgressSummary.exercise_id == Exercise.id)
+        .where(ProgressSummary.user_id == user_id)
+    )
+
+
+def build_history(rows, exercise_rows) -> UserHistory:
+    columns = list(zip(*rows)) if rows else [()] * 7
+    # dtype float convierte los NULL (None) en NaN
+    weight, repetitions, sets, time_minutes, distance_km = (np.array(column, dtype=float) for column in columns[2:])
+    return UserHistory(
+        day=np.array(columns[0], dtype="datetime64[D]").astype(np.int64),
+        exercise_id=np.array(columns[1], dtype=np.int64),
+        weight=weight, repetitions=repetitions, sets=sets, time_minutes=time_minutes, distance_km=distance_km,
+        exercises={row.id: (row.name, row.muscle_group) for row in exercise_rows}
+    )
+
+
+def load_history(db: Session, user_id: int, version: int) -> UserHistory:
+    key = (user_id, version)
+    history = history_cache.get(key) if history_cache is not None else None
+    if history is None:
+        history = build_history(db.execute(history_select(user_id)).all(), db.execute(history_exercises_select(user_id)).all())
+        if history_cache is not None:
+            history_cache.set(key, history)
+    return history
+
+
+async def load_history_async(db: AsyncSession, user_id: int, version: int) -> UserHistory:
+    key = (user_id, version)
+    history = history_cache.get(key) if history_cache is not None else None
+    if history is None:
+        rows = (await db.execute(history_select(user_id))).all()
+        history = build_history(rows, (await db.execute(history_exercises_select(user_id))).all())
+        if history_cache is not None:
+            history_cache.set(key, history)
+    return history
+
+
+def day_strings(days: np.ndarray) -> List[str]:
+    return np.datetime_as_string(days.astype("datetime64[D]")).tolist()
+
+
+def optional_floats(values: np.ndarray) -> list:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    totals = np.cumsum(values)
+    totals[window:] = totals[window:] - totals[:-window]
+    return totals
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Media de los últimos `window` valores (de los disponibles al principio de la serie)"""
+    return rolling_sum(values, window) / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+# ---------------------------------------------------------------------------
+# Volumen por período
+# ---------------------------------------------------------------------------
+
+def period_starts(days: np.ndarray, period: str) -> np.ndarray:
+    """Primer día de la semana (lunes) o del mes de cada día"""
+    if period == "week":
+        return days - (days + EPOCH_WEEKDAY_OFFSET) % 7
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def calendar_periods(first: int, last: int, period: str) -> np.ndarray:
+    """Todos los períodos entre el primero y el último, aunque no tengan entrenamientos"""
+    if period == "week":
+        return np.arange(first, last + 1, 7)
+    first_month, last_month = np.array([first, last]).astype("datetime64[D]").astype("datetime64[M]")
+    return np.arange(first_month, last_month + 1).astype("datetime64[D]").astype(np.int64)
+
+
+def compute_volume(history: UserHistory, period: str, window: int, periods: int) -> VolumeAnalytics:
+    if not len(history):
+        return VolumeAnalytics(period=period, window=window, periods=[])
+    starts = period_starts(history.day, period)
+    calendar = calendar_periods(starts[0], starts[-1], period)
+    index = np.searchsorted(calendar, starts)
+    size = len(calendar)
+
+    def total(values: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=np.nan_to_num(values), minlength=size)
+
+    volume = total(history.volume)
+    rolling = rolling_mean(volume, window)
+    # Sesiones = días distintos con entrenamientos
+    session_days = np.unique(history.day)
+    sessions = np.bincount(np.searchsorted(calendar, period_starts(session_days, period)), minlength=size)
+
+    tail = slice(max(0, size - periods), size)
+    columns = zip(
+        day_strings(calendar[tail]), volume[tail].tolist(), rolling[tail].tolist(),
+        total(history.sets)[tail].tolist(), np.bincount(index, minlength=size)[tail].tolist(), sessions[tail].tolist(),
+        total(history.time_minutes)[tail].tolist(), total(history.distance_km)[tail].tolist()
+    )
+    return VolumeAnalytics(period=period, window=window, periods=[
+        VolumePeriod(
+            period_start=start, volume=period_volume, rolling_volume=rolling_volume, sets=int(sets),
+            entries=entries, sessions=period_sessions, time_minutes=time_minutes, distance_km=distance_km
+        )
+        for start, period_volume, rolling_volume, sets, entries, period_sessions, time_minutes, distance_km in columns
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Tendencia y estancamiento por ejercicio
+# ---------------------------------------------------------------------------
+
+def primary_values(history: UserHistory, exercise_ids: np.ndarray, exercise_index: np.ndarray) -> np.ndarray:
+    """Métrica principal de cada fila según el grupo muscular de su ejercicio (con la alternativa si falta)"""
+    configs = [get_primary_metric_config(history.exercises.get(exercise_id, (None, None))[1]) for exercise_id in exercise_ids.tolist()]
+    field = np.array([METRIC_FIELDS.index(config["field"]) for config in configs], dtype=np.int64)
+    fallback = np.array([METRIC_FIELDS.index(config["fallback_field"]) for config in configs], dtype=np.int64)
+    metrics = np.stack([getattr(history, name) for name in METRIC_FIELDS])
+    rows = np.arange(len(history))
+    values = metrics[field[exercise_index], rows]
+    return np.where(np.isnan(values), metrics[fallback[exercise_index], rows], values)
+
+
+def compute_trends(history: UserHistory, plateau_weeks: int, exercise_id: Optional[int] = None) -> TrendAnalytics:
+    exercise_ids, exercise_index = np.unique(history.exercise_id, return_inverse=True)
+    values = primary_values(history, exercise_ids, exercise_index)
+    valid = ~np.isnan(values)
+    if exercise_id is not None:
+        valid &= history.exercise_id == exercise_id
+    if not valid.any():
+        return TrendAnalytics(plateau_weeks=plateau_weeks, exercises=[])
+
+    # Filas ordenadas por ejercicio y fecha: cada ejercicio es un tramo contiguo
+    group, day, y = exercise_index[valid], history.day[valid], values[valid]
+    order = np.lexsort((day, group))
+    group, day, y = group[order], day[order], y[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, len(group)])
+    first_day = day[starts]
+    last_day = day[starts + counts - 1]
+
+    # Regresión lineal por ejercicio (x en semanas desde su primera sesión)
+    x = (day - np.repeat(first_day, counts)) / 7
+    sum_x, sum_y = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+    sum_xx, sum_xy, sum_yy = np.add.reduceat(x * x, starts), np.add.reduceat(x * y, starts), np.add.reduceat(y * y, starts)
+    covariance = counts * sum_xy - sum_x * sum_y
+    variance_x = counts * sum_xx - sum_x ** 2
+    variance_y = counts * sum_yy - sum_y ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(variance_x > 0, covariance / variance_x, np.nan)
+        r2 = np.where((variance_x > 0) & (variance_y > 0), covariance ** 2 / (variance_x * variance_y), np.nan)
+
+    best = np.maximum.reduceat(y, starts)
+    best_day = np.minimum.reduceat(np.where(y == np.repeat(best, counts), day, np.iinfo(np.int64).max), starts)
+
+    # Estancado: en las últimas plateau_weeks no se superó la mejor marca anterior
+    in_window = day > np.repeat(last_day - plateau_weeks * 7, counts)
+    best_before = np.maximum.reduceat(np.where(in_window, -np.inf, y), starts)
+    best_recent = np.maximum.reduceat(np.where(in_window, y, -np.inf), starts)
+    recent_sessions = np.add.reduceat(in_window.astype(np.int64), starts)
+    plateau = np.isfinite(best_before) & (recent_sessions >= PLATEAU_MIN_SESSIONS) & (best_recent <= best_before)
+
+    trends = []
+    columns = zip(
+        exercise_ids[group[starts]].tolist(), counts.tolist(), day_strings(first_day), day_strings(last_day),
+        optional_floats(slope), optional_floats(r2), best.tolist(), day_strings(best_day), plateau.tolist()
+    )
+    for exercise, sessions, first, last, exercise_slope, exercise_r2, exercise_best, best_date, stalled in columns:
+        name, muscle_group = history.exercises.get(exercise, (None, None))
+        config = get_primary_metric_config(muscle_group)
+        trends.append(ExerciseTrend(
+            exercise_id=exercise, name=name, muscle_group=muscle_group,
+            metric_name=config["name"], metric_unit=config["unit"],
+            sessions=sessions, first_date=first, last_date=last,
+            slope_per_week=exercise_slope, r2=exercise_r2,
+            best=exercise_best, best_date=best_date, plateau=stalled
+        ))
+    trends.sort(key=lambda trend: (trend.name or "", trend.exercise_id))
+    return TrendAnalytics(plateau_weeks=plateau_weeks, exercises=trends)
+
+
+# ---------------------------------------------------------------------------
+# Carga aguda:crónica
+# ---------------------------------------------------------------------------
+
+def workload_zone(ratio: Optional[float]) -> Optional[str]:
+    if ratio is None:
+        return None
+    return next(zone for limit, zone in WORKLOAD_ZONES if ratio < limit)
+
+
+def compute_workload(history: UserHistory, metric: str, days: int, today: Optional[datetime] = None) -> WorkloadAnalytics:
+    """Carga diaria (volumen en kg o minutos) y ACWR de los últimos `days` días"""
+    end = np.datetime64((today or datetime.utcnow()).date(), "D").astype(np.int64)
+    if len(history):
+        end = max(end, int(history.day[-1]))
+    # 27 días previos para que la ventana crónica esté completa desde el primer día mostrado
+    start = end - days + 1 - 27
+    load = history.volume if metric == "volume" else np.nan_to_num(history.time_minutes)
+    inside = history.day >= start
+    daily = np.bincount(history.day[inside] - start, weights=load[inside], minlength=end - start + 1)
+
+    acute = rolling_sum(daily, 7)
+    chronic = rolling_sum(daily, 28) / 4
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(chronic > 0, acute / chronic, np.nan)
+
+    shown = slice(27, None)
+    series = [
+        WorkloadDay(date=date, load=day_load, acute=day_acute, chronic=day_chronic, ratio=day_ratio)
+        for date, day_load, day_acute, day_chronic, day_ratio in zip(
+            day_strings(np.arange(start, end + 1)[shown]), daily[shown].tolist(), acute[shown].tolist(),
+            chronic[shown].tolist(), optional_floats(ratio[shown])
+        )
+    ]
+    current = series[-1].ratio
+    return WorkloadAnalytics(metric=metric, days=days, ratio=current, zone=workload_zone(current), series=series)
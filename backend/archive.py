@@ -0,0 +1,761 @@
+"""
+Archivo de entrenamientos antiguos.
+
+Los entrenamientos anteriores al horizonte (ARCHIVE_HORIZON_DAYS, redondeado
+al primer día del mes) salen de workout_entries y quedan como:
+- una fila por (usuario, ejercicio, mes) en workout_archive_months con lo que
+  necesitan progress_summaries y la serie de /api/progress (sesiones y suma,
+  mínimo, máximo y último valor de la métrica principal)
+- sus mejores marcas en archived_records, para que records.py pueda recalcular
+  un par sin las filas
+- las filas originales, según ARCHIVE_RAW:
+    table  workout_entries_archive (mismas columnas, conserva el id)
+    file   un archivo columnar con gzip (formato de export.py) por usuario y
+           mes en ARCHIVE_DIR; pensado para SQLite, donde achica la base.
+           Los archivos se publican antes del commit y la versión anterior
+           de cada mes queda en <mes>.gtc.gz.prev hasta que el commit termina:
+           si falla se restaura, y si el proceso muere recover_files lo
+           resuelve al arrancar la app o antes de volver a archivar al
+           usuario (mientras tanto las filas pueden verse dos veces)
+    none   se descartan y solo quedan los agregados
+
+GET /api/workouts, GET /api/workouts/export y GET /api/progress/{exercise_id}
+combinan el historial con lo archivado. Los entrenamientos archivados son de
+solo lectura (PUT y DELETE responden 404). /api/analytics y
+/api/progress/overview leen solo workout_entries, así que el horizonte debe
+cubrir sus ventanas.
+
+Los meses guardan la métrica principal del grupo muscular del ejercicio: si
+cambia, se recalculan desde las filas archivadas en la misma transacción. Con
+ARCHIVE_RAW=none no hay filas y el cambio se rechaza (ArchiveConflict).
+
+Cada usuario se archiva en su propia transacción, con un lock por usuario
+(pg_advisory_xact_lock; en SQLite una escritura que toma el lock de la base
+antes de leer) y sus entrenamientos bloqueados (FOR UPDATE): los resúmenes y récords ya incluyen esas filas y no cambian;
+las filas se borran con sentencias Core (sin listeners) y se incrementa la
+versión de datos del usuario. workout_entries usa AUTOINCREMENT en SQLite
+(migración 0009): un id archivado no se vuelve a asignar.
+
+Uso (desde backend/):
+    python archive.py run [--user-id N] [--horizon-days D]
+    python archive.py stats
+"""
+import argparse
+import glob
+import gzip
+import heapq
+import io
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from catalog import CatalogExercise, catalog
+from data_versions import bump_data_version
+from events import queue_resync
+from export import EPOCH, EXPORT_FIELDS, columnar_stream, gzip_stream, read_columnar
+from models import ArchivedRecord, ArchivedWorkoutEntry, Exercise, User, WorkoutArchiveMonth, WorkoutEntry
+from progress import get_primary_metric_config
+from queries import WORKOUTS_STREAM_CHUNK_SIZE, custom_exercises_select, decode_workouts_cursor
+from records import RECORD_KEY, archived_records_select, keep_best, record_candidates
+from summaries import primary_value
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "730"))
+# Menos de un mes archivaría entrenamientos que todavía se editan
+ARCHIVE_MIN_HORIZON_DAYS = 31
+ARCHIVE_RAW = os.getenv("ARCHIVE_RAW", "table").lower()
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive"))
+ARCHIVE_BATCH_USERS = int(os.getenv("ARCHIVE_BATCH_USERS", "100"))
+ARCHIVE_DELETE_CHUNK = 500
+# Versión anterior de un archivo mensual mientras el commit que lo reemplazó no termina
+PREVIOUS_SUFFIX = ".prev"
+# Clave de pg_advisory_xact_lock(clave, user_id) para archivar o recuperar a un usuario
+ARCHIVE_LOCK_KEY = 25
+
+if ARCHIVE_RAW not in ("table", "file", "none"):
+    raise ValueError(f"ARCHIVE_RAW must be table, file or none (got {ARCHIVE_RAW!r})")
+
+archived_table = ArchivedWorkoutEntry.__table__
+month_table = WorkoutArchiveMonth.__table__
+archived_record_table = ArchivedRecord.__table__
+
+RAW_FIELDS = ("id", "user_id", "exercise_id", "weight", "repetitions", "sets", "time_minutes",
+              "distance_km", "date", "notes", "created_at")
+
+
+class ArchiveConflict(Exception):
+    """El archivo no admite el cambio sin perder o mezclar datos (se rechaza)"""
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def archive_cutoff(horizon_days: int = ARCHIVE_HORIZON_DAYS, now: Optional[datetime] = None) -> datetime:
+    """Se archiva lo anterior a esta fecha (primer día de un mes)"""
+    moment = (now or datetime.utcnow()) - timedelta(days=max(horizon_days, ARCHIVE_MIN_HORIZON_DAYS))
+    return month_start(moment)
+
+
+# ---------------------------------------------------------------------------
+# Entrenamientos archivados (lectura)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ArchivedWorkout:
+    """Entrenamiento archivado con los atributos de WorkoutEntry (y de las filas de WORKOUT_COLUMNS)"""
+    id: int
+    exercise_id: int
+    weight: Optional[float]
+    repetitions: Optional[int]
+    sets: Optional[int]
+    time_minutes: Optional[float]
+    distance_km: Optional[float]
+    date: datetime
+    notes: Optional[str]
+    exercise: object
+
+    @property
+    def exercise_name(self) -> str:
+        return self.exercise.name
+
+    @property
+    def exercise_description(self) -> Optional[str]:
+        return self.exercise.description
+
+    @property
+    def exercise_muscle_group(self) -> str:
+        return self.exercise.muscle_group
+
+    @property
+    def exercise_user_id(self) -> Optional[int]:
+        return self.exercise.user_id
+
+    def export_row(self) -> tuple:
+        """Tupla en el orden de EXPORT_COLUMNS"""
+        return (self.id, self.date, self.exercise_id, self.exercise.name, self.exercise.muscle_group,
+                self.weight, self.repetitions, self.sets, self.time_minutes, self.distance_km, self.notes)
+
+
+def workout_order(workout) -> Tuple[datetime, int]:
+    return workout.date, workout.id
+
+
+def merge_workouts(hot: Iterable, archived: Iterable, limit: Optional[int] = None, descending: bool = True) -> list:
+    """Une dos listas ya ordenadas por (date, id) y corta en `limit`"""
+    merged = heapq.merge(hot, archived, key=workout_order, reverse=descending)
+    return list(islice(merged, limit))
+
+
+def archived_workouts_select(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = None,
+    muscle_group: Optional[str] = None,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+):
+    """Mismos filtros y orden que queries.workouts_select, sobre workout_entries_archive"""
+    a = ArchivedWorkoutEntry
+    stmt = select(
+        a.id, a.exercise_id, a.weight, a.repetitions, a.sets, a.time_minutes, a.distance_km, a.date, a.notes,
+        Exercise.name, Exercise.description, Exercise.muscle_group, Exercise.user_id.label("exercise_user_id")
+    ).join(Exercise, Exercise.id == a.exercise_id).where(a.user_id == user_id)
+    if date_from is not None:
+        stmt = stmt.where(a.date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(a.date <= date_to)
+    if exercise_id is not None:
+        stmt = stmt.where(a.exercise_id == exercise_id)
+    if muscle_group is not None:
+        stmt = stmt.where(Exercise.muscle_group == muscle_group)
+    if cursor is not None:
+        cursor_date, cursor_id = decode_workouts_cursor(cursor)
+        stmt = stmt.where(or_(a.date < cursor_date, and_(a.date == cursor_date, a.id < cursor_id)))
+    if descending:
+        return stmt.order_by(a.date.desc(), a.id.desc())
+    return stmt.order_by(a.date, a.id)
+
+
+def archived_workout(row) -> ArchivedWorkout:
+    exercise = CatalogExercise(
+        id=row.exercise_id, name=row.name, description=row.description,
+        muscle_group=row.muscle_group, user_id=row.exercise_user_id
+    )
+    return ArchivedWorkout(
+        id=row.id, exercise_id=row.exercise_id, weight=row.weight, repetitions=row.repetitions, sets=row.sets,
+        time_minutes=row.time_minutes, distance_km=row.distance_km, date=row.date, notes=row.notes,
+        exercise=exercise
+    )
+
+
+def archived_months_select(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = None,
+    muscle_group: Optional[str] = None,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+):
+    """Meses con archivos que pueden tener entrenamientos que cumplen los filtros"""
+    m = WorkoutArchiveMonth
+    stmt = select(m.month).where(m.user_id == user_id)
+    if date_from is not None:
+        stmt = stmt.where(m.month >= month_start(date_from))
+    if date_to is not None:
+        stmt = stmt.where(m.month <= date_to)
+    if exercise_id is not None:
+        stmt = stmt.where(m.exercise_id == exercise_id)
+    if muscle_group is not None:
+        stmt = stmt.join(Exercise, Exercise.id == m.exercise_id).where(Exercise.muscle_group == muscle_group)
+    if cursor is not None:
+        stmt = stmt.where(m.month <= decode_workouts_cursor(cursor)[0])
+    return stmt.group_by(m.month).order_by(m.month.desc() if descending else m.month)
+
+
+# ---------------------------------------------------------------------------
+# Archivos por mes (ARCHIVE_RAW=file)
+# ---------------------------------------------------------------------------
+
+def month_path(user_id: int, month: datetime) -> str:
+    return os.path.join(ARCHIVE_DIR, str(user_id), f"{month:%Y-%m}.gtc.gz")
+
+
+def read_month(user_id: int, month: datetime) -> List[dict]:
+    """Filas de un mes ordenadas por (date, id); lista vacía si no hay archivo"""
+    return read_month_file(month_path(user_id, month))
+
+
+def read_month_file(path: str) -> List[dict]:
+    try:
+        with gzip.open(path, "rb") as stream:
+            data = io.BytesIO(stream.read())
+    except FileNotFoundError:
+        return []
+    rows = []
+    for block in read_columnar(data):
+        block["date"] = [EPOCH + timedelta(microseconds=value) for value in block["date"]]
+        rows.extend(dict(zip(EXPORT_FIELDS, values)) for values in zip(*(block[name] for name in EXPORT_FIELDS)))
+    return rows
+
+
+def write_month(path: str, rows: List[tuple]) -> str:
+    """Escribe un archivo temporal junto a `path`; se reemplaza después del commit"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as stream:
+        for part in gzip_stream(columnar_stream([rows])):
+            stream.write(part)
+    return temporary
+
+
+def month_workouts(
+    user_id: int,
+    month: datetime,
+    exercises: Dict[int, object],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = None,
+    muscle_group: Optional[str] = None,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+) -> List[ArchivedWorkout]:
+    """Entrenamientos de un archivo mensual con los filtros de archived_workouts_select"""
+    after = decode_workouts_cursor(cursor) if cursor is not None else None
+    workouts = []
+    for row in read_month(user_id, month):
+        exercise = exercises.get(row["exercise_id"])
+        if (
+            exercise is None
+            or (date_from is not None and row["date"] < date_from)
+            or (date_to is not None and row["date"] > date_to)
+            or (exercise_id is not None and row["exercise_id"] != exercise_id)
+            or (muscle_group is not None and exercise.muscle_group != muscle_group)
+            or (after is not None and (row["date"], row["id"]) >= after)
+        ):
+            continue
+        workouts.append(ArchivedWorkout(
+            id=row["id"], exercise_id=row["exercise_id"], weight=row["weight"], repetitions=row["repetitions"],
+            sets=row["sets"], time_minutes=row["time_minutes"], distance_km=row["distance_km"],
+            date=row["date"], notes=row["notes"], exercise=exercise
+        ))
+    if descending:
+        workouts.reverse()
+    return workouts
+
+
+def exercise_lookup(custom: Iterable[Exercise]) -> Dict[int, object]:
+    # Los entrenamientos solo usan ejercicios predefinidos o propios
+    exercises = {exercise.id: exercise for exercise in catalog.exercises}
+    exercises.update((exercise.id, exercise) for exercise in custom)
+    return exercises
+
+
+def iter_archived(db: Session, user_id: int, limit: Optional[int] = None, descending: bool = True,
+                  **filters) -> Iterator[ArchivedWorkout]:
+    """Entrenamientos archivados en el orden de /api/workouts (o ascendente, para exportar)"""
+    if ARCHIVE_RAW == "table":
+        stmt = archived_workouts_select(user_id, descending=descending, **filters)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        for row in db.execute(stmt.execution_options(yield_per=WORKOUTS_STREAM_CHUNK_SIZE)):
+            yield archived_workout(row)
+    elif ARCHIVE_RAW == "file":
+        months = db.scalars(archived_months_select(user_id, descending=descending, **filters)).all()
+        if not months:
+            return
+        exercises = exercise_lookup(db.scalars(custom_exercises_select(user_id)))
+        workouts = (
+            workout
+            for month in months
+            for workout in month_workouts(user_id, month, exercises, descending=descending, **filters)
+        )
+        yield from islice(workouts, limit)
+
+
+async def iter_archived_async(db: AsyncSession, user_id: int, limit: Optional[int] = None,
+                              descending: bool = True, **filters):
+    if ARCHIVE_RAW == "table":
+        stmt = archived_workouts_select(user_id, descending=descending, **filters)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await db.stream(stmt.execution_options(yield_per=WORKOUTS_STREAM_CHUNK_SIZE))
+        async for row in result:
+            yield archived_workout(row)
+    elif ARCHIVE_RAW == "file":
+        months = (await db.scalars(archived_months_select(user_id, descending=descending, **filters))).all()
+        if not months:
+            return
+        exercises = exercise_lookup((await db.scalars(custom_exercises_select(user_id))).all())
+        remaining = limit
+        for month in months:
+            # Leer y descomprimir el archivo no debe bloquear el event loop
+            workouts = await run_in_threadpool(
+                month_workouts, user_id, month, exercises, descending=descending, **filters
+            )
+            for workout in workouts[:remaining]:
+                yield workout
+            if remaining is not None:
+                remaining -= min(remaining, len(workouts))
+                if not remaining:
+                    return
+
+
+def archived_page(db: Session, user_id: int, limit: Optional[int] = None, **filters) -> List[ArchivedWorkout]:
+    return list(iter_archived(db, user_id, limit=limit, **filters))
+
+
+async def archived_page_async(db: AsyncSession, user_id: int, limit: Optional[int] = None,
+                              **filters) -> List[ArchivedWorkout]:
+    return [workout async for workout in iter_archived_async(db, user_id, limit=limit, **filters)]
+
+
+async def merge_streams(hot, archived, descending: bool = True):
+    """heapq.merge para dos iteradores async ya ordenados por (date, id)"""
+    sources = [hot.__aiter__(), archived.__aiter__()]
+    heads = [await anext(source, None) for source in sources]
+    while any(head is not None for head in heads):
+        candidates = [index for index, head in enumerate(heads) if head is not None]
+        pick = (max if descending else min)(candidates, key=lambda index: workout_order(heads[index]))
+        yield heads[pick]
+        heads[pick] = await anext(sources[pick], None)
+
+
+# ---------------------------------------------------------------------------
+# Archivado
+# ---------------------------------------------------------------------------
+
+def hot_rows_select(user_id: int, cutoff: datetime):
+    w = WorkoutEntry
+    return select(
+        *(getattr(w, name) for name in RAW_FIELDS), Exercise.name.label("exercise_name"), Exercise.muscle_group
+    ).join(Exercise, Exercise.id == w.exercise_id).where(
+        w.user_id == user_id, w.date < cutoff
+    ).order_by(w.date, w.id)
+
+
+def add_to_month(months: Dict[Tuple[int, datetime], dict], row: dict, config: dict) -> None:
+    key = (row["exercise_id"], month_start(row["date"]))
+    month = months.setdefault(key, {
+        "sessions": 0, "primary_count": 0, "primary_field_count": 0, "primary_sum": 0.0, "primary_min": None,
+        "primary_max": None, "first_date": None, "last_primary": None, "last_date": None, "last_workout_id": None,
+    })
+    month["sessions"] += 1
+    value = primary_value(config, row)
+    if value is None:
+        return
+    month["primary_count"] += 1
+    month["primary_field_count"] += row[config["field"]] is not None
+    month["primary_sum"] += value
+    month["primary_min"] = value if month["primary_min"] is None else min(month["primary_min"], value)
+    month["primary_max"] = value if month["primary_max"] is None else max(month["primary_max"], value)
+    month["first_date"] = row["date"] if month["first_date"] is None else min(month["first_date"], row["date"])
+    # Las filas llegan ordenadas por (date, id): la última es la más reciente
+    month.update(last_primary=value, last_date=row["date"], last_workout_id=row["id"])
+
+
+def merge_month(month: dict, previous) -> None:
+    """Suma al mes recién calculado lo que ya estaba archivado de ese mes"""
+    month["sessions"] += previous.sessions
+    month["primary_count"] += previous.primary_count
+    month["primary_field_count"] += previous.primary_field_count
+    month["primary_sum"] += previous.primary_sum
+    for name, pick in (("primary_min", min), ("primary_max", max), ("first_date", min)):
+        values = [value for value in (month[name], getattr(previous, name)) if value is not None]
+        month[name] = pick(values) if values else None
+    if previous.last_date is not None and (
+        month["last_date"] is None
+        or (previous.last_date, previous.last_workout_id) > (month["last_date"], month["last_workout_id"])
+    ):
+        month.update(last_primary=previous.last_primary, last_date=previous.last_date,
+                     last_workout_id=previous.last_workout_id)
+
+
+def store_months(db: Session, user_id: int, months: Dict[Tuple[int, datetime], dict]) -> None:
+    m = WorkoutArchiveMonth
+    exercise_ids = {exercise_id for exercise_id, _ in months}
+    existing = db.execute(select(m).where(
+        m.user_id == user_id, m.exercise_id.in_(exercise_ids), m.month.in_({month for _, month in months})
+    )).scalars()
+    for previous in existing:
+        key = (previous.exercise_id, previous.month)
+        if key in months:
+            merge_month(months[key], previous)
+            db.delete(previous)
+    db.flush()
+    db.execute(insert(month_table), [
+        {"user_id": user_id, "exercise_id": exercise_id, "month": month, **values}
+        for (exercise_id, month), values in months.items()
+    ])
+
+
+def store_records(db: Session, user_id: int, rows: list) -> None:
+    best = {}
+    for row in rows:
+        for candidate in record_candidates(dict(row._mapping)):
+            keep_best(best, candidate)
+    exercise_ids = {row.exercise_id for row in rows}
+    for previous in db.execute(archived_records_select(user_id, exercise_ids)):
+        keep_best(best, dict(previous._mapping))
+    db.execute(delete(archived_record_table).where(
+        archived_record_table.c.user_id == user_id, archived_record_table.c.exercise_id.in_(exercise_ids)
+    ))
+    if best:
+        db.execute(insert(archived_record_table), [
+            {name: record[name] for name in (*RECORD_KEY, "value", "workout_id", "date")} for record in best.values()
+        ])
+
+
+def store_files(user_id: int, rows: list) -> List[Tuple[str, str]]:
+    """Archivos temporales (temporal, definitivo) con las filas de cada mes unidas a las ya archivadas"""
+    by_month: Dict[datetime, List[tuple]] = {}
+    for row in rows:
+        by_month.setdefault(month_start(row.date), []).append(tuple(getattr(row, name) for name in EXPORT_FIELDS))
+    written = []
+    try:
+        for month, month_rows in by_month.items():
+            previous = read_month(user_id, month)
+            seen = {row[0] for row in month_rows}
+            for row in previous:
+                if row["id"] in seen:
+                    # Dos entrenamientos con el mismo id: no se descarta ninguno
+                    raise ArchiveConflict(f"Workout {row['id']} is already archived in {month_path(user_id, month)}")
+                month_rows.append(tuple(row[name] for name in EXPORT_FIELDS))
+            month_rows.sort(key=lambda values: (values[1], values[0]))
+            path = month_path(user_id, month)
+            written.append((write_month(path, month_rows), path))
+    except BaseException:
+        discard_files(written)
+        raise
+    return written
+
+
+def discard_files(written: List[Tuple[str, str]]) -> None:
+    for temporary, _ in written:
+        remove_file(temporary)
+
+
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def publish_files(written: List[Tuple[str, str]]) -> List[str]:
+    """Reemplaza los archivos mensuales guardando la versión anterior (vacía si no había)"""
+    published = []
+    try:
+        for temporary, path in written:
+            previous = path + PREVIOUS_SUFFIX
+            if os.path.exists(path):
+                os.link(path, previous)
+            else:
+                open(previous, "wb").close()
+            published.append(path)
+            os.replace(temporary, path)
+    except BaseException:
+        restore_files(published)
+        discard_files(written)
+        raise
+    return published
+
+
+def restore_files(published: List[str]) -> None:
+    """El commit no se hizo: vuelve cada mes a su versión anterior"""
+    for path in published:
+        previous = path + PREVIOUS_SUFFIX
+        try:
+            if os.path.getsize(previous) == 0:
+                remove_file(path)
+                os.remove(previous)
+            else:
+                os.replace(previous, path)
+        except FileNotFoundError:
+            pass  # Ya lo resolvió recover_files
+
+
+def forget_previous(published: List[str]) -> None:
+    """El commit se hizo: las versiones anteriores ya no hacen falta"""
+    for path in published:
+        remove_file(path + PREVIOUS_SUFFIX)
+
+
+def lock_user_archive(db: Session, user_id: int) -> None:
+    """Serializa archive_user y recover_files de un mismo usuario hasta el fin de la transacción"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(ARCHIVE_LOCK_KEY, user_id)))
+    elif dialect == "sqlite":
+        # SQLite ignora FOR UPDATE: una escritura sin cambios toma el lock de la base antes de leer
+        users = User.__table__
+        db.execute(update(users).where(users.c.id == user_id).values(data_version=users.c.data_version))
+
+
+def still_hot(db: Session, ids: List[int]) -> bool:
+    for start in range(0, len(ids), ARCHIVE_DELETE_CHUNK):
+        chunk = ids[start:start + ARCHIVE_DELETE_CHUNK]
+        if db.scalar(select(WorkoutEntry.id).where(WorkoutEntry.id.in_(chunk)).limit(1)) is not None:
+            return True
+    return False
+
+
+def recover_user_files(db: Session, user_id: int) -> int:
+    """Resuelve los meses que un archivado interrumpido dejó con versión anterior; requiere lock_user_archive"""
+    recovered = 0
+    for previous in glob.glob(os.path.join(ARCHIVE_DIR, str(user_id), "*.gtc.gz" + PREVIOUS_SUFFIX)):
+        path = previous[:-len(PREVIOUS_SUFFIX)]
+        before = {row["id"] for row in read_month_file(previous)} if os.path.getsize(previous) else set()
+        added = [row["id"] for row in read_month_file(path) if row["id"] not in before]
+        # Si las filas nuevas del archivo siguen en workout_entries, el commit no se hizo
+        if not os.path.exists(path) or still_hot(db, added):
+            restore_files([path])
+        else:
+            forget_previous([path])
+        recovered += 1
+    return recovered
+
+
+def settle_files(db: Session, user_id: int) -> None:
+    """Después de un error el commit puede haberse hecho o no: decide recover_user_files"""
+    try:
+        db.rollback()
+        lock_user_archive(db, user_id)
+        recover_user_files(db, user_id)
+        db.rollback()
+    except Exception:
+        # Las versiones anteriores quedan para la próxima recuperación; se propaga el error original
+        pass
+
+
+def recover_files(db: Session) -> int:
+    """Resuelve los archivados interrumpidos de todos los usuarios (al arrancar la app)"""
+    user_ids = sorted({
+        int(os.path.basename(os.path.dirname(previous)))
+        for previous in glob.glob(os.path.join(ARCHIVE_DIR, "*", "*.gtc.gz" + PREVIOUS_SUFFIX))
+    })
+    recovered = 0
+    for user_id in user_ids:
+        lock_user_archive(db, user_id)
+        recovered += recover_user_files(db, user_id)
+        db.rollback()
+    return recovered
+
+
+def archive_user(db: Session, user_id: int, cutoff: datetime) -> int:
+    """Archiva los entrenamientos de un usuario anteriores a `cutoff`; devuelve cuántos"""
+    lock_user_archive(db, user_id)
+    if ARCHIVE_RAW == "file":
+        recover_user_files(db, user_id)
+    # Un cambio de grupo muscular en curso termina antes (o espera) y los meses usan la métrica vigente.
+    # Los ejercicios predefinidos no cambian de grupo desde la API
+    db.execute(select(Exercise.id).where(Exercise.user_id == user_id).with_for_update(read=True))
+    # Un PUT o DELETE en curso termina antes de leer, y otro archivado no vuelve a tomar las mismas filas
+    rows = db.execute(hot_rows_select(user_id, cutoff).with_for_update(of=WorkoutEntry)).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    months: Dict[Tuple[int, datetime], dict] = {}
+    for row in rows:
+        add_to_month(months, row._mapping, get_primary_metric_config(row.muscle_group))
+    store_months(db, user_id, months)
+    store_records(db, user_id, rows)
+
+    published = []
+    try:
+        if ARCHIVE_RAW == "table":
+            db.execute(insert(archived_table), [{name: getattr(row, name) for name in RAW_FIELDS} for row in rows])
+        elif ARCHIVE_RAW == "file":
+            # Antes del commit: si el proceso muere después, las filas siguen en los archivos
+            published = publish_files(store_files(user_id, rows))
+
+        ids = [row.id for row in rows]
+        workouts = WorkoutEntry.__table__
+        for start in range(0, len(ids), ARCHIVE_DELETE_CHUNK):
+            # Sentencia Core: los resúmenes y récords ya cuentan estas filas
+            db.execute(delete(workouts).where(workouts.c.id.in_(ids[start:start + ARCHIVE_DELETE_CHUNK])))
+        bump_data_version(db.connection(), user_id)
+        queue_resync(db, user_id, "archive")
+        db.commit()
+    except BaseException:
+        if published:
+            settle_files(db, user_id)
+        raise
+    forget_previous(published)
+    return len(rows)
+
+
+def archive_workouts(db: Session, cutoff: datetime, user_id: Optional[int] = None) -> dict:
+    """Archiva uno o todos los usuarios, cada uno en su propia transacción"""
+    if user_id is not None:
+        return {"users": 1, "archived": archive_user(db, user_id, cutoff), "cutoff": cutoff.isoformat()}
+    users = archived = 0
+    last_id = 0
+    while True:
+        # Recorrido por clave primaria, en lotes
+        batch = db.scalars(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(ARCHIVE_BATCH_USERS)
+        ).all()
+        if not batch:
+            break
+        for batch_user_id in batch:
+            count = archive_user(db, batch_user_id, cutoff)
+            users += bool(count)
+            archived += count
+        last_id = batch[-1]
+    return {"users": users, "archived": archived, "cutoff": cutoff.isoformat()}
+
+
+# ---------------------------------------------------------------------------
+# Cambio de grupo muscular
+# ---------------------------------------------------------------------------
+
+def archived_exercise_rows(connection: Connection, user_id: int, exercise_id: int,
+                           months: Iterable[datetime]) -> List[dict]:
+    """Filas archivadas de un ejercicio ordenadas por (date, id), de la tabla o de los archivos"""
+    if ARCHIVE_RAW == "table":
+        a = ArchivedWorkoutEntry
+        return [dict(row._mapping) for row in connection.execute(
+            select(*(getattr(a, name) for name in RAW_FIELDS))
+            .where(a.user_id == user_id, a.exercise_id == exercise_id).order_by(a.date, a.id)
+        )]
+    rows = []
+    for month in sorted(months):
+        rows.extend(row for row in read_month(user_id, month) if row["exercise_id"] == exercise_id)
+    return rows
+
+
+def reaggregate_exercise(connection: Connection, user_id: int, exercise_id: int, muscle_group: str) -> None:
+    """Recalcula los meses archivados de un ejercicio con la métrica de `muscle_group`"""
+    m = WorkoutArchiveMonth
+    stored = dict(connection.execute(
+        select(m.month, m.sessions).where(m.user_id == user_id, m.exercise_id == exercise_id)
+    ).all())
+    if not stored:
+        return
+    if ARCHIVE_RAW == "none":
+        raise ArchiveConflict("Cannot change the muscle group of an exercise with archived workouts")
+    config = get_primary_metric_config(muscle_group)
+    months: Dict[Tuple[int, datetime], dict] = {}
+    for row in archived_exercise_rows(connection, user_id, exercise_id, stored):
+        add_to_month(months, row, config)
+    if {month: values["sessions"] for (_, month), values in months.items()} != stored:
+        # Meses archivados con otro ARCHIVE_RAW: faltan filas para recalcularlos
+        raise ArchiveConflict("Archived workouts of this exercise are not available to recompute its progress")
+    connection.execute(delete(month_table).where(
+        month_table.c.user_id == user_id, month_table.c.exercise_id == exercise_id
+    ))
+    connection.execute(insert(month_table), [
+        {"user_id": user_id, "exercise_id": exercise_id, "month": month, **values}
+        for (_, month), values in months.items()
+    ])
+
+
+# insert=True: antes que el listener de summaries.py, que recalcula los resúmenes a partir de estos meses.
+# Después del UPDATE del ejercicio, que lo bloquea frente a archive_user (o toma el lock de SQLite)
+@event.listens_for(Exercise, "after_update", insert=True)
+def reaggregate_after_exercise_update(mapper, connection, target):
+    if not inspect(target).attrs.muscle_group.history.has_changes():
+        return
+    m = WorkoutArchiveMonth
+    if target.user_id is not None:
+        user_ids = [target.user_id]
+    else:
+        user_ids = connection.scalars(select(m.user_id).where(m.exercise_id == target.id).distinct()).all()
+    for user_id in user_ids:
+        reaggregate_exercise(connection, user_id, target.id, target.muscle_group)
+
+
+def archived_sessions_select(user_id: int, exercise_id: int):
+    """Entrenamientos archivados de un ejercicio (no se puede borrar mientras tenga)"""
+    m = WorkoutArchiveMonth
+    return select(func.coalesce(func.sum(m.sessions), 0)).where(m.user_id == user_id, m.exercise_id == exercise_id)
+
+
+def archive_stats(db: Session) -> dict:
+    m = WorkoutArchiveMonth
+    totals = db.execute(select(func.count(), func.coalesce(func.sum(m.sessions), 0))).one()
+    stats = {
+        "raw": ARCHIVE_RAW,
+        "hot_rows": db.scalar(select(func.count()).select_from(WorkoutEntry)),
+        "archived_months": totals[0],
+        "archived_sessions": totals[1],
+        "archived_records": db.scalar(select(func.count()).select_from(ArchivedRecord)),
+        "cold_rows": db.scalar(select(func.count()).select_from(ArchivedWorkoutEntry)),
+    }
+    files = glob.glob(os.path.join(ARCHIVE_DIR, "*", "*.gtc.gz"))
+    stats.update(files=len(files), file_bytes=sum(os.path.getsize(path) for path in files))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo de entrenamientos antiguos")
+    parser.add_argument("command", choices=["run", "stats"])
+    parser.add_argument("--user-id", type=int, help="Limitar a un usuario")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        if args.command == "run":
+            result = archive_workouts(db, archive_cutoff(args.horizon_days), user_id=args.user_id)
+            print(f"✅ {result['archived']} entrenamientos de {result['users']} usuarios archivados "
+                  f"(anteriores a {result['cutoff'][:10]})")
+            return
+        for name, value in archive_stats(db).items():
+            print(f"{name:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
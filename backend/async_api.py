@@ -0,0 +1,392 @@
+"""
+Versión async de los endpoints de ejercicios, entrenamientos y progreso.
+
+Se activa con DB_MODE=async: cada handler corre en el event loop con una
+AsyncSession (aiosqlite o asyncpg) en lugar de ocupar un hilo del threadpool
+durante toda la consulta.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from analytics import compute_trends, compute_volume, compute_workload, load_history_async
+from archive import (
+    ArchiveConflict, archived_page_async, archived_sessions_select, iter_archived_async, merge_streams, merge_workouts
+)
+from auth import (
+    Principal, cached_principal, decode_access_token, remember_principal,
+    security, user_not_found
+)
+from data_versions import get_data_version_async
+from catalog import catalog
+from database import get_async_db
+from fast_json import FAST_JSON, WORKOUT_COLUMNS, progress_stats_json, workouts_json
+from http_cache import cached_response, json_body, store_response
+from leaderboards import (
+    LEADERBOARD_MAX_LIMIT, METRIC_PATTERN, build_leaderboard, entry_select, sketch_select, state_select,
+    top_select
+)
+from models import User, Exercise, WorkoutEntry
+from overview import compute_overview_async
+from progress import compute_progress_stats_async
+from queries import (
+    WORKOUTS_STREAM_CHUNK_SIZE, custom_exercises_select, encode_workouts_cursor,
+    own_exercise_select, own_workout_select, workouts_select
+)
+from records import RECORD_TYPE_PATTERN, record_rows, records_select
+from schemas import (
+    ExerciseCreate, ExerciseUpdate, ExerciseResponse,
+    WorkoutEntryCreate, WorkoutEntryUpdate, WorkoutEntryResponse,
+    ProgressStats, ProgressOverview, PersonalRecordResponse,
+    VolumeAnalytics, TrendAnalytics, WorkloadAnalytics, Leaderboard
+)
+
+router = APIRouter()
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    user_id, payload = decode_access_token(credentials.credentials)
+    principal = cached_principal(user_id, payload)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise user_not_found()
+    return remember_principal(user)
+
+
+async def load_workout(db: AsyncSession, workout_id: int) -> WorkoutEntry:
+    """Recarga el entrenamiento con su ejercicio (no hay lazy loading en async)"""
+    return await db.scalar(
+        select(WorkoutEntry)
+        .options(joinedload(WorkoutEntry.exercise))
+        .where(WorkoutEntry.id == workout_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+@router.get("/api/exercises", response_model=List[ExerciseResponse])
+async def get_exercises(request: Request, current_user: Principal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    exercises = [*catalog.exercises, *(await db.scalars(custom_exercises_select(current_user.id)))]
+    return store_response(request, current_user.id, version, json_body(List[ExerciseResponse], exercises))
+
+@router.post("/api/exercises", response_model=ExerciseResponse)
+async def create_exercise(exercise_data: ExerciseCreate, current_user: Principal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    exercise = Exercise(
+        name=exercise_data.name,
+        description=exercise_data.description,
+        muscle_group=exercise_data.muscle_group,
+        user_id=current_user.id
+    )
+    db.add(exercise)
+    await db.commit()
+    await db.refresh(exercise)
+    return exercise
+
+async def stream_workouts_ndjson(db: AsyncSession, stmt, archived, limit: Optional[int] = None):
+    result = await db.stream_scalars(stmt.execution_options(yield_per=WORKOUTS_STREAM_CHUNK_SIZE))
+    sent = 0
+    async for workout in merge_streams(result, archived):
+        if limit is not None and sent == limit:
+            break
+        sent += 1
+        yield WorkoutEntryResponse.model_validate(workout).model_dump_json() + "\n"
+
+@router.get("/api/workouts", response_model=List[WorkoutEntryResponse])
+async def get_workouts(
+    request: Request,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = Query(None, gt=0),
+    muscle_group: Optional[str] = Query(None, max_length=50),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    filters = dict(
+        date_from=date_from, date_to=date_to,
+        exercise_id=exercise_id, muscle_group=muscle_group,
+        cursor=cursor
+    )
+    stmt = workouts_select(current_user.id, **filters, columns=WORKOUT_COLUMNS if FAST_JSON and format == "json" else None)
+
+    if format == "ndjson":
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        archived = iter_archived_async(db, current_user.id, limit=limit, **filters)
+        return StreamingResponse(stream_workouts_ndjson(db, stmt, archived, limit), media_type="application/x-ndjson")
+
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    # Con FAST_JSON las filas son tuplas de WORKOUT_COLUMNS en lugar de objetos ORM
+    # Los entrenamientos archivados (archive.py) se intercalan por (date, id)
+    fetch = db.execute if FAST_JSON else db.scalars
+    headers = {}
+    if limit is None:
+        workouts = merge_workouts((await fetch(stmt)).all(), await archived_page_async(db, current_user.id, **filters))
+    else:
+        workouts = merge_workouts(
+            (await fetch(stmt.limit(limit + 1))).all(),
+            await archived_page_async(db, current_user.id, limit + 1, **filters),
+            limit + 1
+        )
+        if len(workouts) > limit:
+            workouts = workouts[:limit]
+            headers["X-Next-Cursor"] = encode_workouts_cursor(workouts[-1])
+    body = workouts_json(workouts) if FAST_JSON else json_body(List[WorkoutEntryResponse], workouts)
+    return store_response(request, current_user.id, version, body, headers)
+
+@router.post("/api/workouts", response_model=WorkoutEntryResponse)
+async def create_workout(workout_data: WorkoutEntryCreate, current_user: Principal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    # Verificar que el ejercicio existe y el usuario tiene acceso
+    exercise = (
+        catalog.get(workout_data.exercise_id)
+        or await db.scalar(own_exercise_select(current_user.id, workout_data.exercise_id))
+    )
+    if not exercise:
+        raise HTTPException(
+            status_code=404,
+            detail="Exercise not found or you don't have access to it"
+        )
+
+    # Validar fecha (no puede ser futura más de 1 día)
+    workout_date = workout_data.date or datetime.utcnow()
+    if workout_date > datetime.utcnow() + timedelta(days=1):
+        raise HTTPException(
+            status_code=400,
+            detail="Workout date cannot be more than 1 day in the future"
+        )
+
+    workout = WorkoutEntry(
+        user_id=current_user.id,
+        exercise_id=workout_data.exercise_id,
+        weight=workout_data.weight,
+        repetitions=workout_data.repetitions,
+        sets=workout_data.sets,
+        time_minutes=workout_data.time_minutes,
+        distance_km=workout_data.distance_km,
+        date=workout_date,
+        notes=workout_data.notes
+    )
+    db.add(workout)
+    await db.commit()
+    return await load_workout(db, workout.id)
+
+# Debe registrarse antes de /api/progress/{exercise_id}
+@router.get("/api/progress/overview", response_model=ProgressOverview)
+async def get_progress_overview(
+    weeks: int = Query(12, ge=1, le=104),
+    sparkline_points: int = Query(0, ge=0, le=100),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await compute_overview_async(db, current_user.id, weeks, sparkline_points)
+
+@router.get("/api/progress/{exercise_id}", response_model=ProgressStats)
+async def get_exercise_progress(
+    request: Request,
+    exercise_id: int,
+    buckets: Optional[int] = Query(None, ge=2, le=2000),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    exercise = await db.get(Exercise, exercise_id)
+    if not exercise:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    if FAST_JSON:
+        body = await compute_progress_stats_async(db, current_user.id, exercise, buckets=buckets, build=progress_stats_json)
+    else:
+        body = json_body(ProgressStats, await compute_progress_stats_async(db, current_user.id, exercise, buckets=buckets))
+    return store_response(request, current_user.id, version, body)
+
+@router.get("/api/records", response_model=List[PersonalRecordResponse])
+async def get_personal_records(
+    request: Request,
+    exercise_id: Optional[int] = Query(None, gt=0),
+    record_type: Optional[str] = Query(None, pattern=RECORD_TYPE_PATTERN),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(records_select(current_user.id, exercise_id, record_type))).all()
+    return store_response(request, current_user.id, version, json_body(List[PersonalRecordResponse], record_rows(rows)))
+
+@router.get("/api/analytics/volume", response_model=VolumeAnalytics)
+async def get_volume_analytics(
+    request: Request,
+    period: str = Query("week", pattern="^(week|month)$"),
+    window: int = Query(4, ge=1, le=52),
+    periods: int = Query(52, ge=1, le=520),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    history = await load_history_async(db, current_user.id, version)
+    return store_response(request, current_user.id, version, json_body(VolumeAnalytics, compute_volume(history, period, window, periods)))
+
+@router.get("/api/analytics/trends", response_model=TrendAnalytics)
+async def get_trend_analytics(
+    request: Request,
+    plateau_weeks: int = Query(6, ge=1, le=52),
+    exercise_id: Optional[int] = Query(None, gt=0),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_data_version_async(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    history = await load_history_async(db, current_user.id, version)
+    return store_response(request, current_user.id, version, json_body(TrendAnalytics, compute_trends(history, plateau_weeks, exercise_id)))
+
+@router.get("/api/analytics/workload", response_model=WorkloadAnalytics)
+async def get_workload_analytics(
+    metric: str = Query("volume", pattern="^(volume|time)$"),
+    days: int = Query(90, ge=7, le=730),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    history = await load_history_async(db, current_user.id, await get_data_version_async(db, current_user.id))
+    return compute_workload(history, metric, days)
+
+@router.get("/api/leaderboards/{exercise_id}", response_model=Leaderboard)
+async def get_leaderboard(
+    exercise_id: int,
+    metric: str = Query("e1rm", pattern=METRIC_PATTERN),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_MAX_LIMIT),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if catalog.get(exercise_id) is None:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    top = (await db.execute(top_select(exercise_id, metric, limit))).all()
+    sketch = (await db.execute(sketch_select(exercise_id, metric))).first()
+    own_value = await db.scalar(entry_select(exercise_id, metric, current_user.id))
+    return build_leaderboard(exercise_id, metric, top, sketch, own_value, current_user.id, await db.scalar(state_select()))
+
+@router.put("/api/exercises/{exercise_id}", response_model=ExerciseResponse)
+async def update_exercise(
+    exercise_id: int,
+    exercise_data: ExerciseUpdate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    exercise = await db.scalar(own_exercise_select(current_user.id, exercise_id))
+    if not exercise:
+        raise HTTPException(
+            status_code=404,
+            detail="Exercise not found or you don't have permission to edit it"
+        )
+
+    update_data = exercise_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(exercise, field, value)
+
+    try:
+        # Un cambio de grupo muscular recalcula los meses archivados (archive.py)
+        await db.commit()
+    except ArchiveConflict as exc:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(exc))
+    await db.refresh(exercise)
+    return exercise
+
+@router.put("/api/workouts/{workout_id}", response_model=WorkoutEntryResponse)
+async def update_workout(
+    workout_id: int,
+    workout_data: WorkoutEntryUpdate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    workout = await db.scalar(own_workout_select(current_user.id, workout_id))
+    if not workout:
+        raise HTTPException(
+            status_code=404,
+            detail="Workout not found or you don't have permission to edit it"
+        )
+
+    update_data = workout_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(workout, field, value)
+
+    await db.commit()
+    return await load_workout(db, workout.id)
+
+@router.delete("/api/exercises/{exercise_id}")
+async def delete_exercise(
+    exercise_id: int,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    exercise = await db.scalar(own_exercise_select(current_user.id, exercise_id))
+    if not exercise:
+        raise HTTPException(
+            status_code=404,
+            detail="Exercise not found or you don't have permission to delete it"
+        )
+
+    workout_count = await db.scalar(
+        select(func.count()).select_from(WorkoutEntry).where(WorkoutEntry.exercise_id == exercise_id)
+    )
+    workout_count += await db.scalar(archived_sessions_select(current_user.id, exercise_id))
+    if workout_count > 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot delete exercise. It is used in {workout_count} workout(s)"
+        )
+
+    await db.delete(exercise)
+    await db.commit()
+    return {"message": "Exercise deleted successfully"}
+
+@router.delete("/api/workouts/{workout_id}")
+async def delete_workout(
+    workout_id: int,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    workout = await db.scalar(own_workout_select(current_user.id, workout_id))
+    if not workout:
+        raise HTTPException(
+            status_code=404,
+            detail="Workout not found or you don't have permission to delete it"
+        )
+
+    await db.delete(workout)
+    await db.commit()
+    return {"message": "Workout deleted successfully"}
@@ -0,0 +1,130 @@
+"""
+Autenticación: tokens JWT, usuario actual (con caché) y token de administración
+
+El hash de contraseñas está en passwords.py.
+"""
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+import hmac
+import jwt
+import os
+from dotenv import load_dotenv
+
+from cache import LRUCache
+from database import get_db
+from models import User
+
+load_dotenv()
+
+# JWT settings - MEJORADOS
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Validar que SECRET_KEY esté configurada en producción
+if SECRET_KEY == "your-secret-key-here-change-in-production":
+    import warnings
+    warnings.warn("⚠️  SECURITY WARNING: Using default SECRET_KEY. Change this in production!")
+
+# Caché de usuarios autenticados (por proceso). El TTL acota cuánto tarda otro
+# worker en ver un cambio de usuario; en este proceso se invalida al instante.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+# Si está activo, email y nombre viajan en el token y la autenticación no consulta
+# la base; un usuario eliminado sigue siendo válido hasta que expire su token.
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Token para los endpoints /api/admin/* (header X-Admin-Token); vacío los desactiva
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Security
+security = HTTPBearer()
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuario autenticado; inmutable para poder compartirlo entre requests"""
+    id: int
+    email: str
+    name: str
+
+principal_cache = LRUCache("auth_principals", AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_principal(mapper, connection, target):
+    principal_cache.invalidate(target.id)
+
+def remember_principal(user: User) -> Principal:
+    principal = Principal(id=user.id, email=user.email, name=user.name)
+    principal_cache.set(user.id, principal)
+    return principal
+
+def cached_principal(user_id: int, payload: dict) -> Optional[Principal]:
+    """Usuario sin consultar la base: desde los claims del token o la caché"""
+    if AUTH_TRUST_TOKEN_CLAIMS and "email" in payload and "name" in payload:
+        return Principal(id=user_id, email=payload["email"], name=payload["name"])
+    return principal_cache.get(user_id)
+
+def access_token_claims(user: User) -> dict:
+    claims = {"sub": str(user.id)}
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        claims.update(email=user.email, name=user.name)
+    return claims
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def decode_access_token(token: str):
+    """Valida el JWT y devuelve el id del usuario junto con el payload"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        subject = payload.get("sub")
+        if subject is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials"
+            )
+        # "sub" viaja como string; asyncpg no acepta strings en columnas enteras
+        user_id = int(subject)
+    except (jwt.PyJWTError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    return user_id, payload
+
+def user_not_found():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found"
+    )
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    user_id, payload = decode_access_token(credentials.credentials)
+    principal = cached_principal(user_id, payload)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise user_not_found()
+    return remember_principal(user)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
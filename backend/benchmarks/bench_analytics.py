@@ -0,0 +1,233 @@
+"""
+Benchmark de analytics.py: cálculos vectorizados con NumPy frente a una
+implementación en Python puro (bucles por fila, como get_exercise_progress)
+sobre el mismo historial, por defecto de 100k entrenamientos de un usuario.
+
+Mide la lectura (arrays columnares frente a objetos ORM) y cada cálculo, y
+verifica que ambas implementaciones den los mismos resultados.
+
+Uso (desde backend/):
+    python benchmarks/bench_analytics.py --rows 100000
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')}"
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from analytics import (
+    PLATEAU_MIN_SESSIONS, build_history, compute_trends, compute_volume, compute_workload,
+    history_exercises_select, history_select
+)
+from database import engine
+from models import Base, Exercise, User, WorkoutEntry
+from progress import get_primary_metric_config
+from summaries import rebuild_summaries
+
+EXERCISES = [
+    ("Press Banca", "Pecho"), ("Sentadilla", "Piernas"), ("Peso Muerto", "Espalda"), ("Press Militar", "Hombros"),
+    ("Curl", "Brazos"), ("Remo", "Espalda"), ("Zancadas", "Piernas"), ("Carrera", "Cardio"),
+    ("Bicicleta", "Cardio"), ("Plancha", "Abdomen"), ("Crunch", "Abdomen"), ("Burpees", "Funcional"),
+]
+
+
+def prepare(rows: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, rows // 40)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, email="analytics@example.com", hashed_password="x", name="Analytics"))
+        conn.execute(insert(Exercise), [
+            {"id": index, "name": name, "muscle_group": group, "user_id": 1}
+            for index, (name, group) in enumerate(EXERCISES, start=1)
+        ])
+        batch = []
+        for index in range(rows):
+            exercise_id = rnd.randint(1, len(EXERCISES))
+            group = EXERCISES[exercise_id - 1][1]
+            day = days * index // rows
+            row = {"user_id": 1, "exercise_id": exercise_id, "date": end - timedelta(days=days - day, hours=-rnd.randint(6, 21)),
+                   "weight": None, "repetitions": None, "sets": None, "time_minutes": None, "distance_km": None}
+            if group == "Cardio":
+                row["time_minutes"] = round(rnd.gauss(30 + day * 0.01, 5), 1)
+                row["distance_km"] = round(row["time_minutes"] / rnd.uniform(5, 8), 2)
+            elif group == "Abdomen":
+                row["repetitions"] = rnd.randint(10, 30)
+                row["sets"] = rnd.randint(2, 4)
+            else:
+                row["weight"] = round((40 + day * 0.05 + rnd.gauss(0, 3)) / 2.5) * 2.5
+                row["repetitions"] = rnd.choice((5, 8, 10, 12))
+                row["sets"] = rnd.randint(3, 5)
+            batch.append(row)
+            if len(batch) == 5000:
+                conn.execute(insert(WorkoutEntry), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(WorkoutEntry), batch)
+        rebuild_summaries(conn)
+
+
+# ---------------------------------------------------------------------------
+# Implementación de referencia en Python puro
+# ---------------------------------------------------------------------------
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def python_volume(workouts, period: str, window: int) -> list:
+    totals = defaultdict(float)
+    for workout in workouts:
+        day = workout.date.date()
+        start = week_start(day) if period == "week" else day.replace(day=1)
+        if workout.weight is not None and workout.repetitions is not None and workout.sets is not None:
+            totals[start] += workout.weight * workout.repetitions * workout.sets
+        else:
+            totals[start] += 0.0
+    first, last = min(totals), max(totals)
+    calendar, current = [], first
+    while current <= last:
+        calendar.append(current)
+        current = current + timedelta(weeks=1) if period == "week" else (current + timedelta(days=32)).replace(day=1)
+    volumes = [totals.get(start, 0.0) for start in calendar]
+    rolling = [sum(volumes[max(0, i - window + 1):i + 1]) / min(i + 1, window) for i in range(len(volumes))]
+    return list(zip([start.isoformat() for start in calendar], volumes, rolling))
+
+
+def python_trends(workouts, plateau_weeks: int) -> dict:
+    points = defaultdict(list)
+    for workout in workouts:
+        config = get_primary_metric_config(workout.exercise.muscle_group)
+        value = getattr(workout, config["field"])
+        if value is None:
+            value = getattr(workout, config["fallback_field"])
+        if value is not None:
+            points[workout.exercise_id].append((workout.date.date(), value))
+    trends = {}
+    for exercise_id, series in points.items():
+        series.sort()
+        first = series[0][0]
+        xs = [(day - first).days / 7 for day, _ in series]
+        ys = [value for _, value in series]
+        n = len(xs)
+        mean_x, mean_y = sum(xs) / n, sum(ys) / n
+        variance_x = sum((x - mean_x) ** 2 for x in xs)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance_x if variance_x > 0 else None
+        cutoff = series[-1][0] - timedelta(weeks=plateau_weeks)
+        before = [value for day, value in series if day <= cutoff]
+        recent = [value for day, value in series if day > cutoff]
+        plateau = bool(before) and len(recent) >= PLATEAU_MIN_SESSIONS and max(recent) <= max(before)
+        trends[exercise_id] = (n, slope, max(ys), plateau)
+    return trends
+
+
+def python_workload(workouts, days: int) -> list:
+    daily = defaultdict(float)
+    for workout in workouts:
+        if workout.weight is not None and workout.repetitions is not None and workout.sets is not None:
+            daily[workout.date.date()] += workout.weight * workout.repetitions * workout.sets
+    end = max(datetime.utcnow().date(), max(daily))
+    ratios = []
+    for offset in range(days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        acute = sum(daily.get(day - timedelta(days=i), 0.0) for i in range(7))
+        chronic = sum(daily.get(day - timedelta(days=i), 0.0) for i in range(28)) / 4
+        ratios.append(acute / chronic if chronic > 0 else None)
+    return ratios
+
+
+# ---------------------------------------------------------------------------
+
+def timed(function, repeat: int):
+    result = function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def close(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    prepare(args.rows, args.seed)
+    print(f"{args.rows} entrenamientos de un usuario")
+    with Session(engine) as db:
+        history, load_numpy = timed(
+            lambda: build_history(db.execute(history_select(1)).all(), db.execute(history_exercises_select(1)).all()), args.repeat
+        )
+        workouts, load_python = timed(
+            lambda: db.scalars(select(WorkoutEntry).where(WorkoutEntry.user_id == 1).order_by(WorkoutEntry.date)).all(),
+            args.repeat
+        )
+        for workout in workouts:
+            workout.exercise  # relaciones cargadas antes de medir los cálculos
+
+        results = []
+        numpy_volume, numpy_ms = timed(lambda: compute_volume(history, "week", 4, 10_000), args.repeat)
+        python_result, python_ms = timed(lambda: python_volume(workouts, "week", 4), args.repeat)
+        matches = len(numpy_volume.periods) == len(python_result) and all(
+            period.period_start == start and close(period.volume, volume) and close(period.rolling_volume, rolling)
+            for period, (start, volume, rolling) in zip(numpy_volume.periods, python_result)
+        )
+        results.append(("volumen semanal", numpy_ms, python_ms, matches))
+
+        numpy_monthly, numpy_ms = timed(lambda: compute_volume(history, "month", 3, 10_000), args.repeat)
+        python_result, python_ms = timed(lambda: python_volume(workouts, "month", 3), args.repeat)
+        matches = [p.period_start for p in numpy_monthly.periods] == [start for start, _, _ in python_result] and all(
+            close(period.volume, volume) for period, (_, volume, _) in zip(numpy_monthly.periods, python_result)
+        )
+        results.append(("volumen mensual", numpy_ms, python_ms, matches))
+
+        numpy_trends, numpy_ms = timed(lambda: compute_trends(history, 6), args.repeat)
+        python_result, python_ms = timed(lambda: python_trends(workouts, 6), args.repeat)
+        matches = len(numpy_trends.exercises) == len(python_result) and all(
+            python_result[trend.exercise_id][0] == trend.sessions
+            and math.isclose(python_result[trend.exercise_id][1], trend.slope_per_week, rel_tol=1e-6, abs_tol=1e-9)
+            and close(python_result[trend.exercise_id][2], trend.best)
+            and python_result[trend.exercise_id][3] == trend.plateau
+            for trend in numpy_trends.exercises
+        )
+        results.append(("tendencias + estancamiento", numpy_ms, python_ms, matches))
+
+        numpy_workload, numpy_ms = timed(lambda: compute_workload(history, "volume", 365), args.repeat)
+        python_result, python_ms = timed(lambda: python_workload(workouts, 365), args.repeat)
+        matches = all(close(day.ratio, ratio) for day, ratio in zip(numpy_workload.series, python_result))
+        results.append(("ACWR (365 días)", numpy_ms, python_ms, matches))
+
+    print(f"{'lectura':<28}{'columnar':>12}{'ORM':>12}")
+    print(f"{'':<28}{load_numpy:>9.1f} ms{load_python:>9.1f} ms")
+    print(f"{'cálculo':<28}{'NumPy':>12}{'Python':>12}{'speedup':>10}  resultados")
+    for label, numpy_ms, python_ms, matches in results:
+        print(f"{label:<28}{numpy_ms:>9.2f} ms{python_ms:>9.1f} ms{python_ms / numpy_ms:>9.0f}x  {'iguales' if matches else 'DISTINTOS'}")
+    if not all(matches for *_, matches in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
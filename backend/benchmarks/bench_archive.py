@@ -0,0 +1,142 @@
+"""
+Benchmark de archive.py: tamaño de workout_entries y de la base, y latencia de
+GET /api/workouts y GET /api/progress/{exercise_id} antes y después de
+archivar lo anterior al horizonte.
+
+Genera años de historial sintético (synthetic_data.py), mide, archiva con el
+ARCHIVE_RAW elegido, compacta la base (VACUUM) y vuelve a medir. Corre la app
+en proceso (TestClient), así se mide también el costo de cada request HTTP.
+
+Uso (desde backend/):
+    python benchmarks/bench_archive.py --users 200 --years 8 --horizon-days 730 --raw table
+    python benchmarks/bench_archive.py --users 200 --years 8 --horizon-days 730 --raw file
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+WORKDIR = tempfile.mkdtemp()
+DATABASE_PATH = os.path.join(WORKDIR, "bench_archive.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+os.environ["ARCHIVE_DIR"] = os.path.join(WORKDIR, "archive")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LEADERBOARD_REFRESH_SECONDS", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+os.environ.setdefault("EVENTS_SYNC_SECONDS", "0")
+
+
+def median_ms(call, repeat: int) -> float:
+    call()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = call()
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"{response.request.url}: {response.status_code}")
+    return statistics.median(samples)
+
+
+def database_bytes(engine) -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(DATABASE_PATH)
+
+
+def archive_bytes() -> int:
+    total = 0
+    for directory, _, files in os.walk(os.environ["ARCHIVE_DIR"]):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--years", type=float, default=8)
+    parser.add_argument("--horizon-days", type=int, default=730)
+    parser.add_argument("--raw", choices=["table", "file", "none"], default="table")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    os.environ["ARCHIVE_RAW"] = args.raw
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    import main
+    from archive import archive_cutoff, archive_stats, archive_workouts
+    from auth import create_access_token
+    from database import SessionLocal, engine
+    from models import WorkoutEntry
+    from synthetic_data import generate_dataset
+
+    dataset = generate_dataset(engine, users=args.users, years=args.years)
+    main.catalog.load()
+    user = dataset.users[0]
+    exercise_id = dataset.exercises_by_user[user["id"]][0]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user['id'])})}"}
+    cutoff = archive_cutoff(args.horizon_days)
+    old_page = f"/api/workouts?limit=50&date_to={cutoff.replace(year=cutoff.year - 1).isoformat()}"
+    requests = [
+        ("workouts, primera página (50)", "/api/workouts?limit=50"),
+        ("workouts, página archivada (50)", old_page),
+        ("workouts, historial completo", "/api/workouts"),
+        ("progreso de un ejercicio", f"/api/progress/{exercise_id}"),
+        ("progreso, buckets=100", f"/api/progress/{exercise_id}?buckets=100"),
+    ]
+
+    with TestClient(main.app) as client:
+        def measure():
+            return {
+                label: median_ms(lambda url=url: client.get(url, headers=headers), args.repeat)
+                for label, url in requests
+            }
+
+        def sizes():
+            with SessionLocal() as db:
+                hot = db.scalar(select(func.count()).select_from(WorkoutEntry))
+                mine = db.scalar(select(func.count()).where(WorkoutEntry.user_id == user["id"]))
+                rows = len(client.get("/api/workouts", headers=headers).json())
+            return hot, mine, rows, database_bytes(engine)
+
+        # Misma compactación antes y después, para comparar tamaños
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        before_sizes, before = sizes(), measure()
+
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            result = archive_workouts(db, cutoff)
+            archive_s = time.perf_counter() - start
+            stats = archive_stats(db)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+
+        after_sizes, after = sizes(), measure()
+
+    print(f"{args.users} usuarios, {args.years:g} años, {dataset.workouts} entrenamientos; "
+          f"horizonte {args.horizon_days} días (antes de {cutoff:%Y-%m-%d}), ARCHIVE_RAW={args.raw}")
+    print(f"archivado: {result['archived']} filas de {result['users']} usuarios en {archive_s:.1f} s "
+          f"({result['archived'] / archive_s:.0f} filas/s); {stats['archived_months']} meses, "
+          f"{stats['archived_records']} récords")
+    print(f"{'':<36}{'antes':>12}{'después':>12}")
+    print(f"{'filas en workout_entries':<36}{before_sizes[0]:>12}{after_sizes[0]:>12}")
+    print(f"{'filas del usuario medido':<36}{before_sizes[1]:>12}{after_sizes[1]:>12}")
+    print(f"{'base SQLite (tras VACUUM)':<36}{before_sizes[3] / 1e6:>9.1f} MB{after_sizes[3] / 1e6:>9.1f} MB")
+    if args.raw == "file":
+        print(f"{'archivos .gtc.gz':<36}{'':>12}{archive_bytes() / 1e6:>9.1f} MB")
+    print(f"{'entrenamientos en /api/workouts':<36}{before_sizes[2]:>12}{after_sizes[2]:>12}")
+    for label, _ in requests:
+        print(f"{label:<36}{before[label]:>9.2f} ms{after[label]:>9.2f} ms")
+    if args.raw != "none" and before_sizes[2] != after_sizes[2]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,87 @@
+"""
+Benchmark de importación: filas/segundo con POST /api/workouts (una por request)
+frente a POST /api/workouts/bulk (JSON, CSV y NDJSON).
+
+Corre la app en proceso sobre una base SQLite temporal.
+
+Uso (desde backend/):
+    python benchmarks/bench_bulk_import.py --rows 5000 --single-rows 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_import.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def synthetic_rows(exercise_id: int, count: int):
+    return [
+        {
+            "exercise_id": exercise_id,
+            "weight": 40 + (i % 60),
+            "repetitions": 5 + (i % 8),
+            "sets": 3,
+            "date": f"20{10 + i % 14:02d}-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def login(client: TestClient):
+    user = {"email": "import@example.com", "password": "importar123", "name": "Importador"}
+    client.post("/api/auth/register", json=user)
+    token = client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    exercise = client.post("/api/exercises", json={"name": "Press de Banca", "muscle_group": "Pecho"}, headers=headers).json()
+    return headers, exercise["id"]
+
+
+def report(label: str, rows: int, elapsed: float):
+    print(f"{label:<28}{rows:>8} filas  {elapsed:7.2f}s  {rows / elapsed:10.0f} filas/s")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--single-rows", type=int, default=300, help="filas para el camino de a una")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        headers, exercise_id = login(client)
+
+        rows = synthetic_rows(exercise_id, args.single_rows)
+        start = time.perf_counter()
+        for row in rows:
+            client.post("/api/workouts", json=row, headers=headers)
+        report("POST /api/workouts x N", len(rows), time.perf_counter() - start)
+
+        rows = synthetic_rows(exercise_id, args.rows)
+        start = time.perf_counter()
+        result = client.post("/api/workouts/bulk", json=rows, headers=headers).json()
+        report("bulk JSON", result["inserted"], time.perf_counter() - start)
+
+        csv_body = "exercise_id,weight,repetitions,sets,date\n" + "".join(
+            f"{r['exercise_id']},{r['weight']},{r['repetitions']},{r['sets']},{r['date']}\n" for r in rows
+        )
+        start = time.perf_counter()
+        result = client.post("/api/workouts/bulk", content=csv_body, headers={**headers, "Content-Type": "text/csv"}).json()
+        report("bulk CSV", result["inserted"], time.perf_counter() - start)
+
+        ndjson_body = "".join(json.dumps(r) + "\n" for r in rows)
+        start = time.perf_counter()
+        result = client.post("/api/workouts/bulk", content=ndjson_body, headers={**headers, "Content-Type": "application/x-ndjson"}).json()
+        report("bulk NDJSON", result["inserted"], time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,110 @@
+"""
+Benchmark de compresión de respuestas: tamaño transferido y costo de CPU por
+request de /api/workouts y /api/progress/{exercise_id} con cada codificación y
+nivel, y el ahorro de servir variantes ya comprimidas desde la caché.
+
+Los cuerpos se obtienen de la app en proceso (TestClient) sobre una base
+SQLite temporal; la compresión se mide aparte para aislar su costo.
+
+Uso (desde backend/):
+    python benchmarks/bench_compression.py --workouts 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_compression.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import main
+from auth import create_access_token
+from compression import brotli
+from database import engine
+from models import Exercise, User, WorkoutEntry
+from summaries import rebuild_summaries
+
+
+def prepare(workouts: int) -> dict:
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, email="gzip@example.com", hashed_password="x", name="Gzip"))
+        conn.execute(insert(Exercise).values(id=1, name="Sentadilla", description="Barra alta", muscle_group="Piernas", user_id=1))
+        conn.execute(insert(WorkoutEntry), [
+            {"user_id": 1, "exercise_id": 1, "weight": 60 + (i * 7) % 80 + 2.5 * (i % 2), "repetitions": 5 + i % 6,
+             "sets": 3 + i % 3, "notes": "buena técnica" if i % 9 == 0 else None, "date": now - timedelta(hours=13 * i)}
+            for i in range(workouts)
+        ])
+        rebuild_summaries(conn)
+    token = create_access_token({"sub": "1", "email": "gzip@example.com", "name": "Gzip"})
+    return {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+
+
+def gzip_compress(level: int):
+    def run(body: bytes) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    return run
+
+
+def measure(body: bytes, compress, repeat: int):
+    compressed = compress(body)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compress(body)
+        samples.append((time.perf_counter() - start) * 1000)
+    return len(compressed), statistics.median(samples)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workouts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    headers = prepare(args.workouts)
+    client = TestClient(main.app)
+    payloads = {
+        "/api/workouts": client.get("/api/workouts", headers=headers).content,
+        "/api/progress/1": client.get("/api/progress/1", headers=headers).content,
+        "/api/progress/1?buckets=50": client.get("/api/progress/1?buckets=50", headers=headers).content,
+    }
+
+    codecs = [(f"gzip -{level}", gzip_compress(level)) for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [(f"br q{quality}", lambda body, q=quality: brotli.compress(body, quality=q)) for quality in (1, 4, 11)]
+    else:
+        print("brotli no está instalado: solo gzip")
+
+    print(f"{'respuesta':<30}{'codificación':<14}{'bytes':>10} {'ratio':>7} {'CPU/request':>13}")
+    for url, body in payloads.items():
+        print(f"{url:<30}{'identity':<14}{len(body):>10} {1:>7.2f} {'-':>13}")
+        for label, compress in codecs:
+            size, ms = measure(body, compress, args.repeat)
+            print(f"{'':<30}{label:<14}{size:>10} {size / len(body):>7.2f} {ms:>10.2f} ms")
+
+    # Request completo con la variante ya guardada frente a comprimir cada vez
+    compressed_headers = {**headers, "Accept-Encoding": "gzip"}
+    for label, request_headers in (("sin comprimir", headers), ("gzip", compressed_headers)):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            client.get("/api/workouts", headers=request_headers).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"GET /api/workouts {label:<14}{statistics.median(samples):10.2f} ms")
+    print("(con RESPONSE_CACHE_MAX_BYTES > 0 los aciertos reutilizan la variante comprimida)")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,80 @@
+"""
+Prueba de carga de escrituras concurrentes sobre SQLite.
+
+Compara el engine sin ajustes (journal DELETE, synchronous FULL, como antes de
+database.create_db_engine) contra el engine configurado (WAL, synchronous
+NORMAL, mmap y busy_timeout). Cada escritura es una transacción propia, igual
+que POST /api/workouts.
+
+Uso (desde backend/):
+    python benchmarks/bench_concurrent_writes.py --threads 8 --writes 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import create_db_engine
+from models import Base, User, Exercise, WorkoutEntry
+
+
+def prepare_engine(tune_sqlite: bool):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_writes.db")
+    engine = create_db_engine(f"sqlite:///{db_path}", tune_sqlite=tune_sqlite)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="bench@example.com", hashed_password="x", name="Bench"))
+        db.add(Exercise(id=1, name="Press de Banca", muscle_group="Pecho"))
+        db.commit()
+    return engine, Session
+
+
+def run(tune_sqlite: bool, threads: int, writes: int):
+    engine, Session = prepare_engine(tune_sqlite)
+    errors = []
+
+    def worker():
+        for i in range(writes):
+            try:
+                with Session() as db:
+                    db.add(WorkoutEntry(user_id=1, exercise_id=1, weight=60 + i % 20, repetitions=8, sets=4, date=datetime.utcnow()))
+                    db.commit()
+            except OperationalError as exc:
+                errors.append(exc)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    committed = threads * writes - len(errors)
+    return committed / elapsed, committed, len(errors), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="escrituras por hilo")
+    args = parser.parse_args()
+
+    print(f"{args.threads} hilos x {args.writes} escrituras")
+    for label, tune in (("antes (sin PRAGMAs)", False), ("después (WAL + NORMAL)", True)):
+        rate, committed, failed, elapsed = run(tune, args.threads, args.writes)
+        print(f"{label:<24}{rate:8.0f} escrituras/s  ({committed} ok, {failed} errores, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark de events.py: miles de conexiones SSE ociosas abiertas contra la app
+ASGI (sin sockets) y lo que cuesta entregarles los cambios.
+
+Mide la memoria por conexión ociosa, la latencia desde el commit hasta que el
+evento llega a las conexiones del usuario (con todas las demás abiertas), el
+fan-out a muchas conexiones de un mismo usuario y cuánto agrega la captura de
+eventos al commit de un entrenamiento con y sin conexiones abiertas.
+
+Uso (desde backend/):
+    python benchmarks/bench_events.py --connections 5000 --fanout 1000 --writes 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_events.db')}"
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LEADERBOARD_REFRESH_SECONDS", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+os.environ.setdefault("EVENTS_SYNC_SECONDS", "0")
+os.environ.setdefault("EVENTS_HEARTBEAT_SECONDS", "3600")
+os.environ["EVENTS_MAX_CONNECTIONS"] = "1000000"
+
+
+class Connection:
+    """Un cliente SSE: mensajes ASGI en memoria en lugar de un socket"""
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.token = token
+        self.status = None
+        self.opened = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.waiting = None
+        self.task = None
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if b"event: ready" in body:
+                self.opened.set()
+            elif self.waiting is not None and b"workout.created" in body:
+                waiting, self.waiting = self.waiting, None
+                waiting.set_result(time.perf_counter())
+            if not message.get("more_body", False):
+                self.opened.set()
+
+    def open(self) -> None:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/api/events", "raw_path": b"/api/events", "root_path": "",
+            "query_string": f"token={self.token}".encode(), "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        }
+        self.task = asyncio.ensure_future(self.app(scope, self.receive, self.send))
+
+    def expect(self) -> asyncio.Future:
+        self.waiting = asyncio.get_running_loop().create_future()
+        return self.waiting
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def write_workout(user_id: int, exercise_id: int) -> float:
+    """Commit de un entrenamiento como el de POST /api/workouts; devuelve el instante previo"""
+    from database import SessionLocal
+    from models import WorkoutEntry
+
+    with SessionLocal() as db:
+        db.add(WorkoutEntry(user_id=user_id, exercise_id=exercise_id, weight=60, repetitions=8, sets=3))
+        start = time.perf_counter()
+        db.commit()
+        return start
+
+
+def commit_ms(user_id: int, exercise_id: int, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = write_workout(user_id, exercise_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def open_all(connections) -> float:
+    start = time.perf_counter()
+    for index in range(0, len(connections), 500):
+        batch = connections[index:index + 500]
+        for connection in batch:
+            connection.open()
+        await asyncio.gather(*(connection.opened.wait() for connection in batch))
+    failed = [connection.status for connection in connections if connection.status != 200]
+    if failed:
+        raise SystemExit(f"{len(failed)} conexiones rechazadas (status {failed[0]})")
+    return time.perf_counter() - start
+
+
+async def deliver(loop, connections, user_id: int, exercise_id: int):
+    """Latencia hasta la última de las conexiones del usuario"""
+    waits = [connection.expect() for connection in connections]
+    start = await loop.run_in_executor(None, write_workout, user_id, exercise_id)
+    arrivals = await asyncio.wait_for(asyncio.gather(*waits), 30)
+    return (max(arrivals) - start) * 1000
+
+
+async def run(args) -> None:
+    from sqlalchemy import insert
+
+    import main
+    from auth import create_access_token
+    from database import engine
+    from events import broker
+    from models import Exercise, User
+
+    with engine.begin() as conn:
+        conn.execute(insert(Exercise), [{"id": 1, "name": "Press de Banca", "muscle_group": "Pecho", "user_id": None}])
+        conn.execute(insert(User), [
+            {"id": user_id, "email": f"user{user_id}@example.com", "hashed_password": "x", "name": f"Usuario {user_id}"}
+            for user_id in range(1, args.users + 2)
+        ])
+    fanout_user = args.users + 1
+    tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in range(1, args.users + 2)}
+    loop = asyncio.get_running_loop()
+
+    # Conexiones ociosas repartidas entre usuarios (hasta el límite por usuario)
+    idle = [Connection(main.app, tokens[1 + index % args.users]) for index in range(args.connections)]
+    # La memoria se mide sobre una muestra: tracemalloc hace mucho más lenta la apertura
+    sample = min(args.memory_sample, len(idle) // 2)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await open_all(idle[:sample])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    per_connection = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / sample
+    open_s = await open_all(idle[sample:])
+    opened = len(idle) - sample
+
+    quiet_ms = commit_ms(fanout_user, 1, args.repeat)
+
+    users_with = {}
+    for index, connection in enumerate(idle):
+        users_with.setdefault(1 + index % args.users, []).append(connection)
+    latencies = []
+    for write in range(args.writes):
+        user_id = 1 + write % args.users
+        latencies.append(await deliver(loop, users_with[user_id], user_id, 1))
+
+    subscribed_ms = commit_ms(1, 1, args.repeat)
+
+    # Fan-out: muchas conexiones de un mismo usuario (el límite por usuario se sube solo acá)
+    broker.max_per_user = args.fanout
+    fanout = [Connection(main.app, tokens[fanout_user]) for _ in range(args.fanout)]
+    await open_all(fanout)
+    fanout_ms = [await deliver(loop, fanout, fanout_user, 1) for _ in range(max(1, args.writes // 20))]
+
+    stats = broker.stats()
+    for connection in idle + fanout:
+        connection.disconnected.set()
+    await asyncio.wait([connection.task for connection in idle + fanout], timeout=30)
+    remaining = broker.stats()["connections"]
+
+    print(f"{args.connections} conexiones ociosas de {args.users} usuarios; fan-out a {args.fanout} conexiones")
+    print(f"{f'abrir {opened} conexiones':<44}{open_s * 1000:>10.0f} ms  ({opened / open_s:.0f}/s)")
+    print(f"{'memoria por conexión ociosa':<44}{per_connection / 1024:>10.1f} KiB")
+    print(f"{'inicio del commit → evento (p50)':<44}{statistics.median(latencies):>10.2f} ms")
+    print(f"{'inicio del commit → evento (p99)':<44}{percentile(latencies, 0.99):>10.2f} ms")
+    print(f"{f'ídem, en {args.fanout} conexiones (p50)':<44}{statistics.median(fanout_ms):>10.2f} ms")
+    print(f"{'commit sin conexiones del usuario':<44}{quiet_ms:>10.2f} ms")
+    print(f"{'commit con conexiones del usuario':<44}{subscribed_ms:>10.2f} ms")
+    print(f"eventos publicados {stats['published']}, entregados {stats['delivered']}, desbordes {stats['overflows']}")
+    print(f"conexiones abiertas al terminar: {remaining}")
+    if stats["overflows"] or remaining:
+        sys.exit(1)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=2000, help="Usuarios entre los que se reparten las conexiones")
+    parser.add_argument("--fanout", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--memory-sample", type=int, default=500, help="Conexiones abiertas con tracemalloc")
+    args = parser.parse_args()
+    per_user = -(-args.connections // args.users)
+    os.environ["EVENTS_MAX_CONNECTIONS_PER_USER"] = str(per_user)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,89 @@
+"""
+Benchmark de exportación: tiempo al primer byte, tiempo total, tamaño y pico de
+memoria (tracemalloc) de cada formato, frente a materializar la lista completa
+como hacía GET /api/workouts.
+
+Uso (desde backend/):
+    python benchmarks/bench_export.py --rows 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import contains_eager, sessionmaker
+
+from database import create_db_engine
+from export import export_stream
+from models import Base, Exercise, User, WorkoutEntry
+from schemas import WorkoutEntryResponse
+
+
+def prepare(rows: int):
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_export.db')}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="export@example.com", hashed_password="x", name="Export"))
+        db.add(Exercise(id=1, name="Sentadillas", muscle_group="Piernas"))
+        start = datetime(2015, 1, 1)
+        for offset in range(0, rows, 10000):
+            db.execute(insert(WorkoutEntry), [
+                {"user_id": 1, "exercise_id": 1, "weight": 60 + i % 40, "repetitions": 5 + i % 6, "sets": 4,
+                 "date": start + timedelta(hours=i), "notes": None}
+                for i in range(offset, min(rows, offset + 10000))
+            ])
+        db.commit()
+    return Session
+
+
+def measure(label, make_stream):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for part in make_stream():
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(part)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22}{first_byte * 1000:9.1f} ms {total:8.2f} s {size / 1e6:9.1f} MB {peak / 1e6:9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    Session = prepare(args.rows)
+    print(f"{args.rows} filas")
+    print(f"{'formato':<22}{'1er byte':>12} {'total':>10} {'tamaño':>12} {'memoria':>12}")
+
+    def full_list():
+        # Lo que hacía GET /api/workouts: todas las filas como modelos Pydantic
+        with Session() as db:
+            workouts = db.scalars(
+                select(WorkoutEntry).join(WorkoutEntry.exercise).options(contains_eager(WorkoutEntry.exercise))
+            ).all()
+            body = "[" + ",".join(WorkoutEntryResponse.model_validate(w).model_dump_json() for w in workouts) + "]"
+            yield body.encode()
+
+    measure("lista completa (JSON)", full_list)
+    for format in ("csv", "ndjson", "columnar"):
+        for gzip in (False, True):
+            def stream(format=format, gzip=gzip):
+                with Session() as db:
+                    yield from export_stream(db, 1, format, gzip=gzip)
+            measure(f"{format}{' + gzip' if gzip else ''}", stream)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de jobs.py: cuánto ocupa el request una importación grande en línea
+frente a encolarla (202) y cuánto tarda el trabajo en terminar, más el
+rendimiento de la cola con muchos trabajos vacíos (el costo propio de la
+cola: INSERT, reserva y resultado) y la deduplicación por clave.
+
+Uso (desde backend/):
+    python benchmarks/bench_jobs.py --rows 20000 --jobs 200 --workers 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_jobs.db')}"
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LEADERBOARD_REFRESH_SECONDS", "0")
+
+
+def wait_for(client, url: str, headers: dict, timeout: float = 300) -> dict:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        body = client.get(url, headers=headers).json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        time.sleep(0.1)
+    raise TimeoutError(url)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    os.environ["JOB_WORKERS"] = str(args.workers)
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import SessionLocal
+    from jobs import enqueue, job_handler, job_runner
+    from models import Exercise, Job
+
+    @job_handler("bench_noop")
+    def noop(db, payload):
+        return {"index": payload["index"]}
+
+    with SessionLocal() as db:
+        db.add(Exercise(name="Press de Banca", muscle_group="Pecho", user_id=None))
+        db.commit()
+    main.catalog.load()
+
+    with TestClient(main.app) as client:
+        user = {"email": "jobs@example.com", "password": "bench-jobs-1", "name": "Jobs"}
+        client.post("/api/auth/register", json=user)
+        token = client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        rows = [
+            {"exercise_id": 1, "weight": 40 + index % 60, "repetitions": 8, "sets": 3,
+             "date": f"20{10 + index % 14}-{1 + index % 12:02d}-{1 + index % 28:02d}T18:00:00"}
+            for index in range(args.rows)
+        ]
+
+        start = time.perf_counter()
+        inline = client.post("/api/workouts/bulk", json=rows, headers=headers).json()
+        inline_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        accepted = client.post("/api/workouts/bulk?background=true", json=rows, headers={**headers, "Idempotency-Key": "bench"})
+        accepted_ms = (time.perf_counter() - start) * 1000
+        duplicate = client.post("/api/workouts/bulk?background=true", json=rows, headers={**headers, "Idempotency-Key": "bench"})
+        finished = wait_for(client, accepted.headers["location"], headers)
+        background_ms = (time.perf_counter() - start) * 1000
+
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            ids = [enqueue(db, "bench_noop", {"index": index})[0].id for index in range(args.jobs)]
+            while db.query(Job).filter(Job.id.in_(ids), Job.status.in_(("queued", "running"))).count():
+                time.sleep(0.05)
+            queue_s = time.perf_counter() - start
+
+    print(f"importación de {args.rows} filas, {args.workers} workers")
+    print(f"{'en línea (request bloqueado)':<42}{inline_ms:>10.0f} ms  {inline['inserted']} insertadas")
+    print(f"{'encolada (hasta el 202)':<42}{accepted_ms:>10.0f} ms  ({inline_ms / accepted_ms:.0f}x menos)")
+    print(f"{'encolada (hasta terminar)':<42}{background_ms:>10.0f} ms  {finished['result']['inserted']} insertadas")
+    print(f"{f'{args.jobs} trabajos vacíos (encolar + correr)':<42}{queue_s * 1000:>10.0f} ms  ({args.jobs / queue_s:.0f} trabajos/s)")
+    same = duplicate.json()["id"] == accepted.json()["id"]
+    print(f"Idempotency-Key repetido: {'mismo trabajo' if same else 'TRABAJO DUPLICADO'}; procesados {job_runner.processed}")
+    if not same or finished["status"] != "succeeded":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark de serialización: ORM + Pydantic (json_body) frente al camino
+rápido de fast_json.py (tuplas de columnas + orjson), para /api/workouts y
+/api/progress/{exercise_id}.
+
+Mide consulta + serialización sin pasar por HTTP, sobre una base SQLite
+temporal, y verifica que ambos caminos produzcan los mismos bytes.
+
+Uso (desde backend/):
+    python benchmarks/bench_json_serialization.py --workouts 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar los módulos de la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_json.db')}"
+
+from sqlalchemy import insert
+
+from database import SessionLocal, engine
+from fast_json import WORKOUT_COLUMNS, orjson, progress_stats_json, workouts_json
+from http_cache import json_body
+from models import Base, Exercise, User, WorkoutEntry
+from progress import compute_progress_stats
+from queries import workouts_select
+from schemas import ProgressStats, WorkoutEntryResponse
+from summaries import rebuild_summaries
+
+
+def prepare(workouts: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, email="json@example.com", hashed_password="x", name="JSON"))
+        conn.execute(insert(Exercise).values(id=1, name="Press banca", description="Barra", muscle_group="Pecho", user_id=1))
+        conn.execute(insert(WorkoutEntry), [
+            {"user_id": 1, "exercise_id": 1, "weight": 40 + i % 60 + 0.5, "repetitions": 6 + i % 8, "sets": 3,
+             "notes": "serie pesada" if i % 7 == 0 else None, "date": now - timedelta(hours=i)}
+            for i in range(workouts)
+        ])
+        rebuild_summaries(conn)
+
+
+def measure(label: str, render, repeat: int) -> bytes:
+    body = render()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<40}{len(body):>10} {statistics.median(samples):10.1f} ms {min(samples):10.1f} ms")
+    return body
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workouts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if orjson is None:
+        sys.exit("orjson no está instalado (pip install -r requirements.txt)")
+
+    prepare(args.workouts)
+    db = SessionLocal()
+    exercise = db.get(Exercise, 1)
+
+    def workouts_pydantic():
+        db.expunge_all()
+        return json_body(List[WorkoutEntryResponse], db.scalars(workouts_select(1)).all())
+
+    def workouts_fast():
+        return workouts_json(db.execute(workouts_select(1, columns=WORKOUT_COLUMNS)).all())
+
+    def progress_pydantic():
+        return json_body(ProgressStats, compute_progress_stats(db, 1, exercise))
+
+    def progress_fast():
+        return compute_progress_stats(db, 1, exercise, build=progress_stats_json)
+
+    print(f"{args.workouts} entrenamientos")
+    print(f"{'camino':<40}{'bytes':>10} {'p50':>13} {'min':>13}")
+    pairs = [
+        ("/api/workouts", workouts_pydantic, workouts_fast),
+        ("/api/progress/{id}", progress_pydantic, progress_fast),
+    ]
+    for name, slow, fast in pairs:
+        expected = measure(f"{name} ORM + Pydantic", slow, args.repeat)
+        body = measure(f"{name} columnas + orjson", fast, args.repeat)
+        assert body == expected, f"{name}: las respuestas difieren"
+    db.close()
+
+
+if __name__ == "__main__":
+    main_bench()
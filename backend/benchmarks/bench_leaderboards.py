@@ -0,0 +1,152 @@
+"""
+Benchmark de leaderboards.py: top N y percentil de un usuario leídos de los
+rankings precalculados frente a calcularlos en cada request recorriendo
+workout_entries de todos los usuarios.
+
+También mide la actualización completa, la incremental (solo usuarios con
+cambios) y el error del percentil del sketch frente al exacto.
+
+Uso (desde backend/):
+    python benchmarks/bench_leaderboards.py --users 5000 --workouts-per-user 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_leaderboards.db')}"
+
+from sqlalchemy import Float, cast, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from database import engine
+from leaderboards import (
+    build_leaderboard, entry_select, refresh_leaderboards, sketch_select, state_select, top_select
+)
+from models import Base, Exercise, User, WorkoutEntry
+from records import E1RM_MAX_REPS, rebuild_records
+
+EXERCISES = [("Press Banca", "Pecho"), ("Sentadilla", "Piernas"), ("Peso Muerto", "Espalda"), ("Press Militar", "Hombros")]
+
+
+def prepare(users: int, per_user: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    end = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Exercise), [
+            {"id": index, "name": name, "muscle_group": group, "user_id": None}
+            for index, (name, group) in enumerate(EXERCISES, start=1)
+        ])
+        conn.execute(insert(User), [
+            {"id": user_id, "email": f"user{user_id}@example.com", "hashed_password": "x", "name": f"Usuario {user_id}"}
+            for user_id in range(1, users + 1)
+        ])
+        batch = []
+        for user_id in range(1, users + 1):
+            strength = rnd.lognormvariate(0, 0.3)
+            for index in range(per_user):
+                batch.append({
+                    "user_id": user_id, "exercise_id": rnd.randint(1, len(EXERCISES)),
+                    "date": end - timedelta(days=per_user - index, hours=rnd.randint(0, 12)),
+                    "weight": round(60 * strength * rnd.uniform(0.6, 1.1) / 2.5) * 2.5,
+                    "repetitions": rnd.choice((3, 5, 8, 10, 12)), "sets": rnd.randint(3, 5),
+                })
+                if len(batch) == 10_000:
+                    conn.execute(insert(WorkoutEntry), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(WorkoutEntry), batch)
+        rebuild_records(conn)
+
+
+def naive_leaderboard(db: Session, exercise_id: int, user_id: int, limit: int):
+    """Lo que haría cada request sin rankings: agregar workout_entries de todos los usuarios"""
+    w = WorkoutEntry
+    best = (
+        select(w.user_id, func.max(w.weight * (1 + cast(w.repetitions, Float) / 30)).label("value"))
+        .where(w.exercise_id == exercise_id, w.weight > 0, w.repetitions > 0, w.repetitions <= E1RM_MAX_REPS)
+        .group_by(w.user_id)
+        .subquery()
+    )
+    top = db.execute(select(best.c.user_id, best.c.value).order_by(best.c.value.desc()).limit(limit)).all()
+    own = db.scalar(select(best.c.value).where(best.c.user_id == user_id))
+    below = db.scalar(select(func.count()).select_from(best).where(best.c.value <= own))
+    users = db.scalar(select(func.count()).select_from(best))
+    return top, 100 * below / users
+
+
+def precomputed_leaderboard(db: Session, exercise_id: int, user_id: int, limit: int) -> dict:
+    top = db.execute(top_select(exercise_id, "e1rm", limit)).all()
+    sketch = db.execute(sketch_select(exercise_id, "e1rm")).first()
+    own_value = db.scalar(entry_select(exercise_id, "e1rm", user_id))
+    return build_leaderboard(exercise_id, "e1rm", top, sketch, own_value, user_id, db.scalar(state_select()))
+
+
+def timed(function, repeat: int):
+    result = function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--workouts-per-user", type=int, default=200)
+    parser.add_argument("--dirty", type=int, default=50, help="Usuarios con cambios para la actualización incremental")
+    parser.add_argument("--samples", type=int, default=30, help="Usuarios para medir el error del percentil")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    prepare(args.users, args.workouts_per_user, args.seed)
+    print(f"{args.users} usuarios × {args.workouts_per_user} entrenamientos en {len(EXERCISES)} ejercicios globales")
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        refresh_leaderboards(conn, full=True)
+    full_ms = (time.perf_counter() - start) * 1000
+
+    rnd = random.Random(args.seed)
+    with engine.begin() as conn:
+        conn.execute(update(User).where(User.id.in_(rnd.sample(range(1, args.users + 1), args.dirty)))
+                     .values(data_version=User.data_version + 1))
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        result = refresh_leaderboards(conn)
+    incremental_ms = (time.perf_counter() - start) * 1000
+
+    errors = []
+    with Session(engine) as db:
+        naive, naive_ms = timed(lambda: naive_leaderboard(db, 1, 1, 10), max(1, args.repeat // 4))
+        board, board_ms = timed(lambda: precomputed_leaderboard(db, 1, 1, 10), args.repeat)
+        same_top = [round(row.value, 6) for row in naive[0]] == [round(entry["value"], 6) for entry in board["entries"]]
+        for user_id in rnd.sample(range(1, args.users + 1), args.samples):
+            _, exact = naive_leaderboard(db, 2, user_id, 1)
+            estimate = precomputed_leaderboard(db, 2, user_id, 1)["you"]["percentile"]
+            errors.append(abs(exact - estimate))
+
+    print(f"{'actualización completa':<40}{full_ms:>10.0f} ms")
+    incremental_label = f"actualización incremental ({result['users']} usuarios)"
+    print(f"{incremental_label:<40}{incremental_ms:>10.0f} ms")
+    print(f"{'top 10 + percentil, agregando':<40}{naive_ms:>10.1f} ms")
+    print(f"{'top 10 + percentil, precalculado':<40}{board_ms:>10.2f} ms  ({naive_ms / board_ms:.0f}x)")
+    print(f"{'error del percentil (puntos)':<40}{statistics.mean(errors):>10.2f} medio, {max(errors):.2f} máximo")
+    print(f"top 10 {'igual' if same_top else 'DISTINTO'} al calculado desde workout_entries")
+    if not same_top:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
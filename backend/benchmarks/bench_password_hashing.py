@@ -0,0 +1,65 @@
+"""
+Benchmark de logins/segundo (verificación bcrypt) por núcleo.
+
+Lanza --logins verificaciones concurrentes contra PasswordHasher, igual que
+POST /api/auth/login, para cada costo de bcrypt y tipo de pool. Las que superan
+--max-pending se rechazan (503 en la API) y se cuentan aparte.
+
+Uso (desde backend/):
+    python benchmarks/bench_password_hashing.py --rounds 10 12 --workers 1 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+import passwords
+from passwords import PasswordHasher
+
+
+async def run_logins(hasher: PasswordHasher, hashed: str, logins: int):
+    async def one_login():
+        try:
+            await hasher.verify_and_update("contraseña123", hashed)
+            return True
+        except HTTPException:
+            return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_login() for _ in range(logins)))
+    return sum(results), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--executor", choices=["thread", "process"], nargs="+", default=["thread", "process"])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'pool':>8} {'workers':>7} {'logins/s':>9} {'por núcleo':>10} {'rechazados':>10}")
+    for rounds in args.rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hashed = context.hash("contraseña123")
+        # Mismo costo que el hash para que no se dispare el rehash en el benchmark
+        passwords.pwd_context = context
+        for executor in args.executor:
+            for workers in args.workers:
+                hasher = PasswordHasher(executor, workers, args.max_pending)
+                ok, elapsed = asyncio.run(run_logins(hasher, hashed, args.logins))
+                hasher.shutdown()
+                rate = ok / elapsed
+                cores = min(workers, os.cpu_count() or 1)
+                print(f"{rounds:>6} {executor:>8} {workers:>7} {rate:>9.1f} {rate / cores:>10.1f} {args.logins - ok:>10}")
+
+
+if __name__ == "__main__":
+    main()
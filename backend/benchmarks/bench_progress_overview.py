@@ -0,0 +1,96 @@
+"""
+Benchmark del dashboard: GET /api/progress/overview frente a una llamada a
+GET /api/progress/{exercise_id} por ejercicio (lo que hacía el frontend).
+
+Corre la app en proceso (TestClient) sobre una base SQLite temporal, así se
+mide también el costo de cada request HTTP.
+
+Uso (desde backend/):
+    python benchmarks/bench_progress_overview.py --exercises 20 --workouts 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_overview.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import main
+from auth import create_access_token
+from database import engine
+from models import Exercise, User, WorkoutEntry
+from summaries import rebuild_summaries
+
+MUSCLE_GROUPS = ["Pecho", "Espalda", "Piernas", "Hombros", "Cardio", "Abdomen"]
+
+
+def prepare(exercises: int, workouts: int) -> dict:
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, email="overview@example.com", hashed_password="x", name="Overview"))
+        conn.execute(insert(Exercise), [
+            {"id": index, "name": f"Ejercicio {index}", "muscle_group": MUSCLE_GROUPS[index % len(MUSCLE_GROUPS)], "user_id": 1}
+            for index in range(1, exercises + 1)
+        ])
+        for exercise_id in range(1, exercises + 1):
+            conn.execute(insert(WorkoutEntry), [
+                {"user_id": 1, "exercise_id": exercise_id, "weight": 40 + i % 30, "repetitions": 8 + i % 5, "sets": 3,
+                 "time_minutes": 20 + i % 15, "date": now - timedelta(hours=6 * i + exercise_id)}
+                for i in range(workouts)
+            ])
+        rebuild_summaries(conn)
+    token = create_access_token({"sub": "1", "email": "overview@example.com", "name": "Overview"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def measure(label: str, render, repeat: int):
+    render()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        requests = render()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34}{requests:>9} {statistics.median(samples):10.1f} ms {max(samples):10.1f} ms")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exercises", type=int, default=20)
+    parser.add_argument("--workouts", type=int, default=500, help="entrenamientos por ejercicio")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    headers = prepare(args.exercises, args.workouts)
+    client = TestClient(main.app)
+    exercise_ids = list(range(1, args.exercises + 1))
+
+    def fan_out(buckets=None):
+        params = {"buckets": buckets} if buckets else {}
+        for exercise_id in exercise_ids:
+            client.get(f"/api/progress/{exercise_id}", params=params, headers=headers).raise_for_status()
+        return len(exercise_ids)
+
+    def overview(**params):
+        client.get("/api/progress/overview", params=params, headers=headers).raise_for_status()
+        return 1
+
+    print(f"{args.exercises} ejercicios x {args.workouts} entrenamientos")
+    print(f"{'render del dashboard':<34}{'requests':>9} {'p50':>13} {'max':>13}")
+    measure("N x /api/progress/{id}", fan_out, args.repeat)
+    measure("N x /api/progress/{id}?buckets=20", lambda: fan_out(20), args.repeat)
+    measure("overview", overview, args.repeat)
+    measure("overview + sparklines (20 puntos)", lambda: overview(sparkline_points=20), args.repeat)
+
+
+if __name__ == "__main__":
+    main_bench()
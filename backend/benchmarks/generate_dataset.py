@@ -0,0 +1,303 @@
+"""
+Generador de datasets grandes (cientos de miles de usuarios, cientos de
+millones de entrenamientos) para pruebas de escala.
+
+El historial se genera vectorizado con NumPy, por lotes de usuarios (shards)
+en varios procesos. Cada shard usa su propia semilla derivada de --seed y de su
+número, así que el resultado es el mismo con cualquier cantidad de procesos.
+La carga la hace el proceso principal, una transacción por shard:
+- PostgreSQL: COPY ... FROM STDIN (CSV que arman los workers)
+- SQLite: executemany con las filas ya formateadas
+
+Al terminar recalcula progress_summaries y personal_records y sube users.data_version.
+
+Uso (desde backend/; toma DATABASE_URL del entorno):
+    python benchmarks/generate_dataset.py --users 100000 --years 3 --workers 8 --seed 1
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+
+from data_versions import bump_data_version
+from database import engine
+from models import Base, Exercise, User
+from passwords import hash_password
+from seed_data import PREDEFINED_EXERCISES
+from records import rebuild_records
+from summaries import rebuild_summaries
+from synthetic_data import STRENGTH_PROFILES, SYNTHETIC_PASSWORD
+
+# Índices de grupo muscular usados en los arrays; los que no tienen perfil usan DEFAULT_PROFILE
+MUSCLE_GROUPS = list(STRENGTH_PROFILES) + ["Cardio", "Abdomen"]
+CARDIO = MUSCLE_GROUPS.index("Cardio")
+ABDOMEN = MUSCLE_GROUPS.index("Abdomen")
+DEFAULT_PROFILE = (20, 0.2)
+BASE_WEIGHT = np.array([STRENGTH_PROFILES.get(group, DEFAULT_PROFILE)[0] for group in MUSCLE_GROUPS], dtype=float)
+WEEKLY_GAIN = np.array([STRENGTH_PROFILES.get(group, DEFAULT_PROFILE)[1] for group in MUSCLE_GROUPS], dtype=float)
+
+MAX_ROUTINE = 10          # ejercicios del catálogo en la rutina de cada usuario (entre 6 y 10)
+MAX_PER_SESSION = 5       # ejercicios por sesión (entre 3 y 5)
+REPETITION_CHOICES = np.array([5, 6, 8, 8, 10, 10, 12])
+
+COPY_COLUMNS = ("user_id", "exercise_id", "weight", "repetitions", "sets", "time_minutes", "distance_km", "date", "created_at")
+
+
+@dataclass
+class ShardTask:
+    index: int
+    first_user_id: int
+    users: int
+    # (usuarios, ejercicios propios por usuario)
+    custom_ids: np.ndarray
+    custom_groups: np.ndarray
+    catalog_ids: np.ndarray
+    catalog_groups: np.ndarray
+    weeks: int
+    sessions_per_week: int
+    start: np.datetime64
+    seed: int
+    dialect: str
+
+
+def group_code(muscle_group: str) -> int:
+    return MUSCLE_GROUPS.index(muscle_group) if muscle_group in MUSCLE_GROUPS else MUSCLE_GROUPS.index("Funcional")
+
+
+def generate_shard(task: ShardTask) -> dict:
+    """Historial de un lote de usuarios como arrays columnares (NaN / -1 = NULL)"""
+    rng = np.random.default_rng([task.seed, task.index])
+    users = task.users
+
+    # Rutina: 6-10 ejercicios del catálogo al azar más los propios, con un nivel de fuerza por ejercicio
+    routine_size = rng.integers(6, MAX_ROUTINE + 1, users)
+    picks = np.argsort(rng.random((users, len(task.catalog_ids))), axis=1)[:, :MAX_ROUTINE]
+    routine_ids = np.hstack([task.catalog_ids[picks], task.custom_ids])
+    routine_groups = np.hstack([task.catalog_groups[picks], task.custom_groups])
+    valid = np.hstack([
+        np.arange(MAX_ROUTINE) < routine_size[:, None],
+        np.ones(task.custom_ids.shape, dtype=bool),
+    ])
+    strength = rng.uniform(0.6, 1.6, routine_ids.shape)
+
+    # Cada sesión elige 3-5 ejercicios distintos de la rutina
+    sessions = task.weeks * task.sessions_per_week
+    keys = np.where(valid[:, None, :], rng.random((users, sessions, routine_ids.shape[1])), 2.0)
+    order = np.argsort(keys, axis=2)[:, :, :MAX_PER_SESSION]
+    per_session = rng.integers(3, MAX_PER_SESSION + 1, (users, sessions))
+    session_hours = rng.integers(7, 21, (users, sessions))
+    user_index, session_index, slot = np.nonzero(np.arange(MAX_PER_SESSION) < per_session[..., None])
+    routine_index = order[user_index, session_index, slot]
+
+    exercise_ids = routine_ids[user_index, routine_index]
+    groups = routine_groups[user_index, routine_index]
+    level = strength[user_index, routine_index]
+    week = session_index // task.sessions_per_week
+    day = (session_index % task.sessions_per_week) * 7 // task.sessions_per_week
+    minutes = (week * 7 + day) * 1440 + session_hours[user_index, session_index] * 60 + slot * 12
+    dates = task.start + minutes.astype("timedelta64[m]")
+
+    rows = len(user_index)
+    cardio = groups == CARDIO
+    abdomen = groups == ABDOMEN
+    lifting = ~(cardio | abdomen)
+
+    # Fuerza: progresión lineal semanal con ruido y una semana de descarga cada 8
+    base = BASE_WEIGHT[groups]
+    deload = np.where(week % 8 == 7, 0.85, 1.0)
+    weight = (base * level + WEEKLY_GAIN[groups] * week) * deload + rng.normal(0, 1, rows) * base * 0.03
+    weight = np.where(lifting, np.round(np.maximum(2.5, weight) / 2.5) * 2.5, np.nan)
+
+    core_reps = np.maximum(5, (15 + 0.1 * week + rng.normal(0, 3, rows)).astype(np.int64))
+    repetitions = np.where(lifting, rng.choice(REPETITION_CHOICES, rows), np.where(abdomen, core_reps, -1))
+    sets = np.where(lifting, rng.integers(3, 6, rows), np.where(abdomen, rng.integers(2, 5, rows), -1))
+
+    # Cardio: más tiempo con las semanas y un ritmo de 5.5-8 min/km
+    time_minutes = np.round(np.maximum(10.0, rng.normal(25 + 0.15 * week, 5)), 1)
+    distance_km = np.where(cardio, np.round(time_minutes / rng.uniform(5.5, 8.0, rows), 2), np.nan)
+    time_minutes = np.where(cardio, time_minutes, np.nan)
+
+    columns = {
+        "user_id": task.first_user_id + user_index,
+        "exercise_id": exercise_ids,
+        "weight": weight,
+        "repetitions": repetitions,
+        "sets": sets,
+        "time_minutes": time_minutes,
+        "distance_km": distance_km,
+        "date": dates,
+    }
+    if task.dialect == "postgresql":
+        return {"rows": rows, "csv": csv_payload(columns)}
+    return {"rows": rows, "tuples": sqlite_rows(columns)}
+
+
+def text_column(values: np.ndarray, null: Optional[np.ndarray] = None) -> list:
+    strings = values.astype(str)
+    if null is not None:
+        strings = np.where(null, "", strings)
+    return strings.tolist()
+
+
+def formatted_dates(dates: np.ndarray) -> list:
+    # Mismo formato que usa SQLAlchemy para DateTime en SQLite (y válido para PostgreSQL)
+    return np.char.replace(np.datetime_as_string(dates.astype("datetime64[us]"), unit="us"), "T", " ").tolist()
+
+
+def csv_payload(columns: dict) -> bytes:
+    """Filas CSV para COPY: los campos vacíos sin comillas son NULL"""
+    dates = formatted_dates(columns["date"])
+    fields = [
+        text_column(columns["user_id"]),
+        text_column(columns["exercise_id"]),
+        text_column(columns["weight"], np.isnan(columns["weight"])),
+        text_column(columns["repetitions"], columns["repetitions"] < 0),
+        text_column(columns["sets"], columns["sets"] < 0),
+        text_column(columns["time_minutes"], np.isnan(columns["time_minutes"])),
+        text_column(columns["distance_km"], np.isnan(columns["distance_km"])),
+        dates,
+        dates,
+    ]
+    return ("\n".join(",".join(row) for row in zip(*fields)) + "\n").encode()
+
+
+def nullable(values: np.ndarray, null: np.ndarray) -> list:
+    objects = values.astype(object)
+    objects[null] = None
+    return objects.tolist()
+
+
+def sqlite_rows(columns: dict) -> list:
+    dates = formatted_dates(columns["date"])
+    return list(zip(
+        columns["user_id"].tolist(),
+        columns["exercise_id"].tolist(),
+        nullable(columns["weight"], np.isnan(columns["weight"])),
+        nullable(columns["repetitions"], columns["repetitions"] < 0),
+        nullable(columns["sets"], columns["sets"] < 0),
+        nullable(columns["time_minutes"], np.isnan(columns["time_minutes"])),
+        nullable(columns["distance_km"], np.isnan(columns["distance_km"])),
+        dates,
+        dates,
+    ))
+
+
+def load_shard(connection, shard: dict, dialect: str) -> None:
+    column_list = ", ".join(COPY_COLUMNS)
+    if dialect == "postgresql":
+        import io
+        cursor = connection.connection.dbapi_connection.cursor()
+        cursor.copy_expert(f"COPY workout_entries ({column_list}) FROM STDIN WITH (FORMAT csv)", io.BytesIO(shard["csv"]))
+        cursor.close()
+    else:
+        placeholders = ", ".join("?" for _ in COPY_COLUMNS)
+        connection.exec_driver_sql(f"INSERT INTO workout_entries ({column_list}) VALUES ({placeholders})", shard["tuples"])
+
+
+def prepare_users(connection, users: int, custom_exercises: int, seed: int, dialect: str):
+    """Catálogo, usuarios y ejercicios propios con ids explícitos (los workers los necesitan de antemano)"""
+    existing = set(connection.scalars(select(Exercise.name).where(Exercise.user_id.is_(None))))
+    missing = [dict(exercise, user_id=None) for exercise in PREDEFINED_EXERCISES if exercise["name"] not in existing]
+    if missing:
+        connection.execute(insert(Exercise), missing)
+    catalog = connection.execute(
+        select(Exercise.id, Exercise.muscle_group).where(Exercise.user_id.is_(None)).order_by(Exercise.id)
+    ).all()
+    catalog_ids = np.array([row.id for row in catalog])
+    catalog_groups = np.array([group_code(row.muscle_group) for row in catalog])
+
+    first_user_id = (connection.scalar(select(func.max(User.id))) or 0) + 1
+    hashed_password = hash_password(SYNTHETIC_PASSWORD)
+    for start in range(0, users, 10000):
+        connection.execute(insert(User), [
+            {"id": first_user_id + index, "email": f"user{index}.s{seed}@bench.example.com",
+             "name": f"Usuario {index}", "hashed_password": hashed_password}
+            for index in range(start, min(users, start + 10000))
+        ])
+
+    rng = np.random.default_rng([seed, 2 ** 31])
+    lifting_groups = np.array([group_code(group) for group in STRENGTH_PROFILES])
+    custom_groups = rng.choice(lifting_groups, (users, custom_exercises))
+    first_exercise_id = (connection.scalar(select(func.max(Exercise.id))) or 0) + 1
+    custom_ids = first_exercise_id + np.arange(users * custom_exercises).reshape(users, custom_exercises)
+    for start in range(0, users, 10000):
+        connection.execute(insert(Exercise), [
+            {"id": int(custom_ids[index, slot]), "name": f"Personalizado {slot}", "description": None,
+             "muscle_group": MUSCLE_GROUPS[custom_groups[index, slot]], "user_id": first_user_id + index}
+            for index in range(start, min(users, start + 10000)) for slot in range(custom_exercises)
+        ])
+
+    if dialect == "postgresql":
+        # Los ids explícitos no avanzan las secuencias
+        for table in ("users", "exercises"):
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+            ))
+    return first_user_id, catalog_ids, catalog_groups, custom_ids, custom_groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--custom-exercises", type=int, default=2, help="ejercicios propios por usuario")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--sessions-per-week", type=int, default=3)
+    parser.add_argument("--shard-size", type=int, default=500, help="usuarios por lote (y por transacción)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="último día del historial (fijarlo para que dos corridas den los mismos datos)")
+    args = parser.parse_args()
+
+    dialect = engine.dialect.name
+    weeks = int(args.years * 52)
+    start = np.datetime64(datetime.combine(args.end_date, datetime.min.time()) - timedelta(weeks=weeks), "m")
+    Base.metadata.create_all(bind=engine)
+
+    began = time.perf_counter()
+    with engine.begin() as connection:
+        first_user_id, catalog_ids, catalog_groups, custom_ids, custom_groups = prepare_users(
+            connection, args.users, args.custom_exercises, args.seed, dialect
+        )
+    print(f"{args.users} usuarios creados ({time.perf_counter() - began:.1f} s)")
+
+    tasks = [
+        ShardTask(
+            index=index, first_user_id=first_user_id + offset, users=min(args.shard_size, args.users - offset),
+            custom_ids=custom_ids[offset:offset + args.shard_size], custom_groups=custom_groups[offset:offset + args.shard_size],
+            catalog_ids=catalog_ids, catalog_groups=catalog_groups, weeks=weeks,
+            sessions_per_week=args.sessions_per_week, start=start, seed=args.seed, dialect=dialect,
+        )
+        for index, offset in enumerate(range(0, args.users, args.shard_size))
+    ]
+
+    total = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        # imap conserva el orden: los ids de los entrenamientos no dependen de los procesos
+        for number, shard in enumerate(pool.imap(generate_shard, tasks), start=1):
+            with engine.begin() as connection:
+                load_shard(connection, shard, dialect)
+            total += shard["rows"]
+            elapsed = time.perf_counter() - began
+            print(f"  lote {number}/{len(tasks)}: {total} entrenamientos ({total / elapsed:,.0f} filas/s)")
+
+    with engine.begin() as connection:
+        rebuild_summaries(connection)
+        rebuild_records(connection)
+        bump_data_version(connection)
+    print(f"Listo: {args.users} usuarios y {total} entrenamientos en {time.perf_counter() - began:.1f} s "
+          f"(contraseña: {SYNTHETIC_PASSWORD})")
+
+
+if __name__ == "__main__":
+    main()
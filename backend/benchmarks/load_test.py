@@ -0,0 +1,408 @@
+"""
+Prueba de carga reproducible de la API completa.
+
+Genera datos sintéticos (synthetic_data.py) en una base SQLite temporal y
+corre la app en proceso con httpx.ASGITransport (sin red), con tráfico mixto
+realista: login, listados, registrar series, ver progreso, editar, importar,
+exportar... Cada nivel de concurrencia es un grupo de clientes simultáneos que
+ejecutan --requests requests en total.
+
+Reporta throughput, latencias p50/p95/p99 (total y por operación) y el pico de
+RSS del proceso. Con --baseline guarda los resultados en JSON la primera vez y
+en las siguientes los compara: si el throughput baja o el p95 sube más que
+--tolerance, termina con código 1.
+
+Uso (desde backend/):
+    python benchmarks/load_test.py --users 20 --years 1 --concurrency 1,8,32
+    python benchmarks/load_test.py --baseline benchmarks/baselines/load_test.json
+    python benchmarks/load_test.py --baseline benchmarks/baselines/load_test.json --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# La base temporal y la configuración se fijan antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("ADMIN_TOKEN", "load-test-admin")
+
+import httpx
+
+import main
+from database import engine
+from synthetic_data import generate_dataset
+
+ADMIN_TOKEN = os.environ["ADMIN_TOKEN"]
+
+
+class Session:
+    """Estado de un cliente simulado: su usuario, token y lo que fue creando"""
+
+    def __init__(self, client: httpx.AsyncClient, user: dict, exercise_ids: list, catalog_ids: list, rnd: random.Random):
+        self.client = client
+        self.user = user
+        self.exercise_ids = exercise_ids
+        self.catalog_ids = catalog_ids
+        self.rnd = rnd
+        self.headers = {}
+        self.workout_ids = []
+        self.custom_exercise_ids = []
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        return await self.client.request(method, url, headers=headers, **kwargs)
+
+    def workout_payload(self) -> dict:
+        return {
+            "exercise_id": self.rnd.choice(self.exercise_ids),
+            "weight": round(self.rnd.uniform(20, 120) / 2.5) * 2.5,
+            "repetitions": self.rnd.choice((5, 8, 10, 12)),
+            "sets": self.rnd.randint(3, 5),
+            "date": datetime.utcnow().isoformat(),
+        }
+
+
+async def op_login(session: Session):
+    response = await session.request("POST", "/api/auth/login", json={
+        "email": session.user["email"], "password": session.user["password"]
+    })
+    if response.status_code == 200:
+        session.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return response
+
+
+async def op_register(session: Session):
+    suffix = f"{session.user['id']}-{session.rnd.getrandbits(48):x}"
+    return await session.request("POST", "/api/auth/register", json={
+        "email": f"new-{suffix}@bench.example.com", "password": "bench-password-1", "name": "Nuevo"
+    })
+
+
+async def op_me(session: Session):
+    return await session.request("GET", "/api/auth/me")
+
+
+async def op_list_exercises(session: Session):
+    return await session.request("GET", "/api/exercises")
+
+
+async def op_list_workouts(session: Session):
+    params = {"limit": 50}
+    if session.rnd.random() < 0.3:
+        params["exercise_id"] = session.rnd.choice(session.exercise_ids)
+    response = await session.request("GET", "/api/workouts", params=params)
+    cursor = response.headers.get("x-next-cursor")
+    if cursor and session.rnd.random() < 0.3:
+        response = await session.request("GET", "/api/workouts", params={**params, "cursor": cursor})
+    return response
+
+
+async def op_log_set(session: Session):
+    response = await session.request("POST", "/api/workouts", json=session.workout_payload())
+    if response.status_code == 200:
+        session.workout_ids.append(response.json()["id"])
+    return response
+
+
+async def op_update_workout(session: Session):
+    if not session.workout_ids:
+        return await op_log_set(session)
+    workout_id = session.rnd.choice(session.workout_ids)
+    return await session.request("PUT", f"/api/workouts/{workout_id}", json={"repetitions": session.rnd.randint(5, 15)})
+
+
+async def op_delete_workout(session: Session):
+    if not session.workout_ids:
+        return await op_log_set(session)
+    workout_id = session.workout_ids.pop(session.rnd.randrange(len(session.workout_ids)))
+    return await session.request("DELETE", f"/api/workouts/{workout_id}")
+
+
+async def op_view_progress(session: Session):
+    params = {"buckets": 100} if session.rnd.random() < 0.5 else {}
+    return await session.request("GET", f"/api/progress/{session.rnd.choice(session.exercise_ids)}", params=params)
+
+
+async def op_overview(session: Session):
+    return await session.request("GET", "/api/progress/overview", params={"sparkline_points": 20})
+
+
+async def op_records(session: Session):
+    params = {"exercise_id": session.rnd.choice(session.exercise_ids)} if session.rnd.random() < 0.5 else {}
+    return await session.request("GET", "/api/records", params=params)
+
+
+async def op_analytics(session: Session):
+    view = session.rnd.choice(("volume", "trends", "workload"))
+    return await session.request("GET", f"/api/analytics/{view}")
+
+
+async def op_leaderboard(session: Session):
+    metric = session.rnd.choice(("e1rm", "weekly_volume"))
+    return await session.request("GET", f"/api/leaderboards/{session.rnd.choice(session.catalog_ids)}", params={"metric": metric})
+
+
+async def op_exercise_churn(session: Session):
+    """Crear, renombrar y borrar un ejercicio propio"""
+    if session.custom_exercise_ids and session.rnd.random() < 0.5:
+        exercise_id = session.custom_exercise_ids.pop()
+        if session.rnd.random() < 0.5:
+            return await session.request("PUT", f"/api/exercises/{exercise_id}", json={"name": f"Renombrado {exercise_id}"})
+        return await session.request("DELETE", f"/api/exercises/{exercise_id}")
+    response = await session.request("POST", "/api/exercises", json={
+        "name": f"Ejercicio {session.rnd.getrandbits(32):x}", "muscle_group": "Funcional"
+    })
+    if response.status_code == 200:
+        session.custom_exercise_ids.append(response.json()["id"])
+    return response
+
+
+async def op_bulk_import(session: Session):
+    rows = [session.workout_payload() for _ in range(50)]
+    return await session.request("POST", "/api/workouts/bulk", json=rows)
+
+
+async def op_bulk_enqueue(session: Session):
+    """Importación encolada (202) y una consulta de su estado"""
+    rows = [session.workout_payload() for _ in range(50)]
+    response = await session.request("POST", "/api/workouts/bulk", params={"background": "true"}, json=rows)
+    if response.status_code != 202:
+        return response
+    return await session.request("GET", response.headers["location"])
+
+
+async def op_export(session: Session):
+    return await session.request("GET", "/api/workouts/export", params={"format": session.rnd.choice(("csv", "ndjson"))})
+
+
+async def op_cache_stats(session: Session):
+    return await session.request("GET", "/api/cache/stats")
+
+
+async def op_metrics(session: Session):
+    return await session.request("GET", "/metrics")
+
+
+async def op_refresh_catalog(session: Session):
+    return await session.request("POST", "/api/admin/catalog/refresh", headers={"X-Admin-Token": ADMIN_TOKEN})
+
+
+# Mezcla de tráfico: (operación, peso)
+TRAFFIC_MIX = (
+    (op_view_progress, 22),
+    (op_list_workouts, 18),
+    (op_log_set, 18),
+    (op_list_exercises, 12),
+    (op_overview, 8),
+    (op_records, 4),
+    (op_analytics, 4),
+    (op_leaderboard, 3),
+    (op_login, 4),
+    (op_me, 4),
+    (op_update_workout, 3),
+    (op_delete_workout, 2),
+    (op_exercise_churn, 3),
+    (op_bulk_import, 1),
+    (op_bulk_enqueue, 1),
+    (op_export, 1),
+    (op_register, 1),
+    (op_cache_stats, 1),
+    (op_metrics, 1),
+    (op_refresh_catalog, 1),
+)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_level(client: httpx.AsyncClient, dataset, concurrency: int, total_requests: int, seed: int) -> dict:
+    operations = [operation for operation, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    remaining = total_requests
+
+    async def worker(index: int):
+        nonlocal remaining
+        rnd = random.Random(seed * 1000 + index)
+        user = dataset.users[index % len(dataset.users)]
+        session = Session(client, user, dataset.exercises_by_user[user["id"]], dataset.catalog_ids, rnd)
+        await op_login(session)
+        while remaining > 0:
+            remaining -= 1
+            operation = rnd.choices(operations, weights)[0]
+            start = time.perf_counter()
+            response = await operation(session)
+            latencies[operation.__name__[3:]].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[operation.__name__[3:]] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "concurrency": concurrency,
+        "requests": len(all_latencies),
+        "errors": sum(errors.values()),
+        "seconds": elapsed,
+        "throughput_rps": len(all_latencies) / elapsed,
+        **summarize(all_latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "operations": {
+            name: {**summarize(values), "errors": errors.get(name, 0)} for name, values in sorted(latencies.items())
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regresiones frente al baseline: throughput más bajo o p95 más alto que la tolerancia"""
+    regressions = []
+    for level, current in results["levels"].items():
+        previous = baseline["levels"].get(level)
+        if previous is None:
+            continue
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"c={level}: throughput {current['throughput_rps']:.1f} req/s (baseline {previous['throughput_rps']:.1f})"
+            )
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"c={level}: p95 {current['p95_ms']:.1f} ms (baseline {previous['p95_ms']:.1f})")
+    return regressions
+
+
+def print_level(result: dict) -> None:
+    print(
+        f"\nconcurrencia {result['concurrency']}: {result['requests']} requests en {result['seconds']:.1f} s, "
+        f"{result['throughput_rps']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+        f"p99 {result['p99_ms']:.1f} ms, errores {result['errors']}, pico RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    print(f"  {'operación':<18}{'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'errores':>8}")
+    for name, stats in result["operations"].items():
+        print(
+            f"  {name:<18}{stats['count']:>6} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+            f"{stats['p99_ms']:>7.1f}ms {stats['errors']:>8}"
+        )
+
+
+async def run(args) -> dict:
+    main.Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    dataset = generate_dataset(
+        engine, users=args.users, custom_exercises=args.custom_exercises, years=args.years,
+        sessions_per_week=args.sessions_per_week, seed=args.seed
+    )
+    print(f"Datos: {len(dataset.users)} usuarios, {dataset.workouts} entrenamientos "
+          f"({time.perf_counter() - start:.1f} s, semilla {args.seed})")
+
+    # ASGITransport no corre los eventos de inicio (catálogo, hilos de rankings y de trabajos)
+    await main.app.router.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    levels = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            for concurrency in args.concurrency:
+                result = await run_level(client, dataset, concurrency, args.requests, args.seed)
+                print_level(result)
+                levels[str(concurrency)] = result
+    finally:
+        await main.app.router.shutdown()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "db_mode": main.DB_MODE,
+            "args": {key: value for key, value in vars(args).items() if key not in ("baseline", "update_baseline")},
+        },
+        "levels": levels,
+    }
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--custom-exercises", type=int, default=2, help="ejercicios propios por usuario")
+    parser.add_argument("--years", type=float, default=1.0, help="años de historial por usuario")
+    parser.add_argument("--sessions-per-week", type=int, default=3)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="requests por nivel de concurrencia")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="guardar los resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de referencia: se crea si no existe, si no se compara")
+    parser.add_argument("--update-baseline", action="store_true", help="reemplazar el baseline con esta corrida")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="variación aceptada frente al baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if not args.baseline:
+        return
+    if args.update_baseline or not os.path.exists(args.baseline):
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nBaseline guardado en {args.baseline}")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    print(f"\nComparación con el baseline ({baseline['meta']['commit']}, tolerancia {args.tolerance:.0%}):")
+    if regressions:
+        for regression in regressions:
+            print(f"  ❌ {regression}")
+        sys.exit(1)
+    print("  ✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main_bench()
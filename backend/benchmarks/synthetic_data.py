@@ -0,0 +1,137 @@
+"""
+Datos sintéticos reproducibles para los benchmarks: usuarios, ejercicios
+(el catálogo de seed_data.py más algunos personalizados por usuario) y años de
+historial con progresión de cargas.
+
+La misma semilla genera siempre los mismos datos. Todos los usuarios tienen la
+contraseña SYNTHETIC_PASSWORD y el email user{n}@bench.example.com.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+
+from data_versions import bump_data_version
+from leaderboards import refresh_leaderboards
+from models import Exercise, User, WorkoutEntry
+from passwords import hash_password
+from seed_data import PREDEFINED_EXERCISES
+from records import rebuild_records
+from summaries import rebuild_summaries
+
+SYNTHETIC_PASSWORD = "bench-password-1"
+INSERT_CHUNK_SIZE = 5000
+
+# Carga inicial (kg) y progreso semanal por grupo muscular
+STRENGTH_PROFILES = {
+    "Pecho": (50, 0.5),
+    "Espalda": (60, 0.6),
+    "Piernas": (80, 0.9),
+    "Hombros": (30, 0.3),
+    "Brazos": (15, 0.15),
+    "Funcional": (20, 0.2),
+}
+
+
+@dataclass
+class SyntheticDataset:
+    users: List[dict] = field(default_factory=list)
+    # user_id -> ids de ejercicios que usa (predefinidos y propios)
+    exercises_by_user: Dict[int, List[int]] = field(default_factory=dict)
+    # ids del catálogo (user_id NULL), los únicos con ranking
+    catalog_ids: List[int] = field(default_factory=list)
+    workouts: int = 0
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.example.com"
+
+
+def workout_row(rnd: random.Random, user_id: int, exercise: dict, week: float, date: datetime) -> dict:
+    """Una serie con progresión lineal por semana, ruido y alguna semana de descarga"""
+    group = exercise["muscle_group"]
+    row = {"user_id": user_id, "exercise_id": exercise["id"], "date": date, "sets": None, "weight": None,
+           "repetitions": None, "time_minutes": None, "distance_km": None, "notes": None}
+    deload = 0.85 if int(week) % 8 == 7 else 1.0
+    if group == "Cardio":
+        row["time_minutes"] = round(max(10.0, rnd.gauss(25 + week * 0.15, 5)), 1)
+        row["distance_km"] = round(row["time_minutes"] / rnd.uniform(5.5, 8.0), 2)
+    elif group == "Abdomen":
+        row["repetitions"] = max(5, int(rnd.gauss(15 + week * 0.1, 3)))
+        row["sets"] = rnd.randint(2, 4)
+    else:
+        base, weekly = STRENGTH_PROFILES.get(group, (20, 0.2))
+        weight = (base * exercise["strength"] + weekly * week) * deload + rnd.gauss(0, base * 0.03)
+        row["weight"] = round(max(2.5, weight) / 2.5) * 2.5
+        row["repetitions"] = rnd.choice((5, 6, 8, 8, 10, 10, 12))
+        row["sets"] = rnd.randint(3, 5)
+    if rnd.random() < 0.05:
+        row["notes"] = rnd.choice(("Buena sesión", "Cansado", "Nuevo récord", "Técnica a mejorar"))
+    return row
+
+
+def generate_dataset(engine, users: int = 20, custom_exercises: int = 2, years: float = 1.0,
+                     sessions_per_week: int = 3, seed: int = 42) -> SyntheticDataset:
+    rnd = random.Random(seed)
+    dataset = SyntheticDataset()
+    hashed_password = hash_password(SYNTHETIC_PASSWORD)
+    now = datetime.utcnow().replace(microsecond=0)
+    weeks = int(years * 52)
+
+    with engine.begin() as conn:
+        existing = {row.name for row in conn.execute(select(Exercise.name).where(Exercise.user_id.is_(None)))}
+        missing = [dict(exercise, user_id=None) for exercise in PREDEFINED_EXERCISES if exercise["name"] not in existing]
+        if missing:
+            conn.execute(insert(Exercise), missing)
+        catalog = [
+            {"id": row.id, "muscle_group": row.muscle_group}
+            for row in conn.execute(select(Exercise.id, Exercise.muscle_group).where(Exercise.user_id.is_(None)))
+        ]
+        dataset.catalog_ids = [exercise["id"] for exercise in catalog]
+
+        conn.execute(insert(User), [
+            {"email": user_email(index), "name": f"Usuario {index}", "hashed_password": hashed_password}
+            for index in range(users)
+        ])
+        user_ids = conn.execute(
+            select(User.id, User.email).where(User.email.like("%@bench.example.com")).order_by(User.id)
+        ).all()
+
+        batch = []
+        for user_id, email in user_ids:
+            dataset.users.append({"id": user_id, "email": email, "password": SYNTHETIC_PASSWORD})
+            own = []
+            for index in range(custom_exercises):
+                group = rnd.choice(list(STRENGTH_PROFILES))
+                exercise_id = conn.execute(insert(Exercise).values(
+                    name=f"Personalizado {index} ({email})", description=None, muscle_group=group, user_id=user_id
+                ).returning(Exercise.id)).scalar_one()
+                own.append({"id": exercise_id, "muscle_group": group})
+            # Cada usuario entrena una rutina fija de 6-10 ejercicios con su propio nivel de fuerza
+            routine = [dict(exercise, strength=rnd.uniform(0.6, 1.6)) for exercise in rnd.sample(catalog, rnd.randint(6, 10))]
+            routine += [dict(exercise, strength=rnd.uniform(0.6, 1.6)) for exercise in own]
+            dataset.exercises_by_user[user_id] = [exercise["id"] for exercise in routine]
+
+            start = now - timedelta(weeks=weeks)
+            for week in range(weeks):
+                for session in range(sessions_per_week):
+                    day = start + timedelta(weeks=week, days=session * 7 // sessions_per_week, hours=rnd.randint(7, 20))
+                    for exercise in rnd.sample(routine, min(len(routine), rnd.randint(3, 5))):
+                        batch.append(workout_row(rnd, user_id, exercise, week, day))
+                        if len(batch) >= INSERT_CHUNK_SIZE:
+                            conn.execute(insert(WorkoutEntry), batch)
+                            dataset.workouts += len(batch)
+                            batch = []
+        if batch:
+            conn.execute(insert(WorkoutEntry), batch)
+            dataset.workouts += len(batch)
+
+        # Los inserts Core no pasan por los listeners: se recalculan los derivados
+        rebuild_summaries(conn)
+        rebuild_records(conn)
+        bump_data_version(conn)
+        # El load test no levanta el hilo de rankings: se calculan una vez para leer datos reales
+        refresh_leaderboards(conn, full=True)
+    return dataset
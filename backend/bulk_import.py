@@ -0,0 +1,200 @@
+"""
+Importación masiva de entrenamientos (JSON, CSV o NDJSON).
+
+Las filas se validan con el mismo esquema que POST /api/workouts, el acceso a
+los ejercicios se verifica con una consulta IN por bloque (solo para ids aún no
+vistos) y las inserciones se hacen por bloques con executemany dentro de una
+única transacción. Las filas inválidas no detienen la importación: se
+devuelven con su número y sus errores.
+
+El INSERT masivo no dispara los listeners del ORM, así que los resúmenes de
+progreso de los ejercicios tocados y la versión de datos del usuario se
+actualizan una vez al final.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models import Exercise, WorkoutEntry
+from catalog import catalog
+from data_versions import bump_data_version
+from events import queue_resync
+from schemas import BulkImportResult, BulkImportRowError, WorkoutEntryCreate
+from records import rebuild_records
+from summaries import rebuild_summaries
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "50000"))
+
+CSV_FIELDS = ["exercise_id", "weight", "repetitions", "sets", "time_minutes", "distance_km", "date", "notes"]
+
+
+async def iterate(rows: Iterable) -> AsyncIterator:
+    for row in rows:
+        yield row
+
+
+def parse_json_rows(body: bytes):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of workouts")
+    return enumerate(data, start=1)
+
+
+def parse_csv_rows(text: str):
+    reader = csv.DictReader(io.StringIO(text))
+    for row_number, row in enumerate(reader, start=1):
+        # Las celdas vacías equivalen a campos no enviados
+        yield row_number, {
+            field: value for field, value in row.items()
+            if field in CSV_FIELDS and value not in (None, "")
+        }
+
+
+async def parse_ndjson_rows(request: Request):
+    """Lee el cuerpo línea por línea a medida que llega"""
+    row_number = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                row_number += 1
+                yield row_number, line
+    if buffer.strip():
+        yield row_number + 1, buffer
+
+
+async def request_rows(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """Filas del request según su Content-Type"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/x-ndjson":
+        async for row_number, line in parse_ndjson_rows(request):
+            try:
+                yield row_number, json.loads(line)
+            except ValueError:
+                yield row_number, None
+    elif content_type == "text/csv":
+        text = (await request.body()).decode("utf-8-sig")
+        async for row in iterate(parse_csv_rows(text)):
+            yield row
+    elif content_type == "multipart/form-data":
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a CSV file in the 'file' field")
+        text = (await upload.read()).decode("utf-8-sig")
+        async for row in iterate(parse_csv_rows(text)):
+            yield row
+    else:
+        async for row in iterate(parse_json_rows(await request.body())):
+            yield row
+
+
+class BulkImporter:
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.accessible_exercises: Set[int] = set()
+        self.checked_exercises: Set[int] = set()
+        self.imported_exercises: Set[int] = set()
+        self.inserted = 0
+        self.errors: List[BulkImportRowError] = []
+        self.max_date = datetime.utcnow() + timedelta(days=1)
+
+    def validate(self, row_number: int, data) -> Optional[dict]:
+        """Valida una fila; devuelve los valores a insertar o registra el error"""
+        if not isinstance(data, dict):
+            self.errors.append(BulkImportRowError(row=row_number, errors=["Row must be a JSON object"]))
+            return None
+        try:
+            workout = WorkoutEntryCreate(**data)
+        except ValidationError as exc:
+            self.errors.append(BulkImportRowError(
+                row=row_number,
+                errors=[f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+            ))
+            return None
+
+        workout_date = workout.date or datetime.utcnow()
+        if workout_date > self.max_date:
+            self.errors.append(BulkImportRowError(
+                row=row_number, errors=["Workout date cannot be more than 1 day in the future"]
+            ))
+            return None
+
+        values = workout.dict()
+        values.update(user_id=self.user_id, date=workout_date, created_at=datetime.utcnow())
+        return values
+
+    def check_exercises(self, exercise_ids: Set[int]) -> None:
+        """Una sola consulta IN para los ejercicios personalizados que todavía no se verificaron"""
+        unchecked = exercise_ids - self.checked_exercises
+        predefined = {exercise_id for exercise_id in unchecked if catalog.get(exercise_id) is not None}
+        self.accessible_exercises.update(predefined)
+        self.checked_exercises.update(predefined)
+        unchecked -= predefined
+        if not unchecked:
+            return
+        accessible = self.db.scalars(
+            select(Exercise.id).where(Exercise.id.in_(unchecked), Exercise.user_id == self.user_id)
+        )
+        self.accessible_exercises.update(accessible)
+        self.checked_exercises.update(unchecked)
+
+    def insert_chunk(self, rows: List[Tuple[int, dict]]) -> None:
+        self.check_exercises({values["exercise_id"] for _, values in rows})
+
+        mappings = []
+        for row_number, values in rows:
+            if values["exercise_id"] in self.accessible_exercises:
+                mappings.append(values)
+            else:
+                self.errors.append(BulkImportRowError(
+                    row=row_number, errors=["Exercise not found or you don't have access to it"]
+                ))
+        if mappings:
+            # executemany: una sola sentencia INSERT para todo el bloque
+            self.db.execute(insert(WorkoutEntry), mappings)
+            self.inserted += len(mappings)
+            self.imported_exercises.update(values["exercise_id"] for values in mappings)
+
+    def import_rows(self, rows: Iterable[Tuple[int, object]]) -> None:
+        """Recorrido completo sin el request (trabajos en segundo plano, ver jobs.py)"""
+        chunk = []
+        for row_number, data in rows:
+            values = self.validate(row_number, data)
+            if values is not None:
+                chunk.append((row_number, values))
+            if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                self.insert_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.insert_chunk(chunk)
+        self.finish()
+
+    def finish(self) -> None:
+        """Lo que los listeners del ORM harían por cada fila, una sola vez por importación"""
+        if not self.inserted:
+            return
+        connection = self.db.connection()
+        rebuild_summaries(connection, user_id=self.user_id, exercise_ids=self.imported_exercises)
+        rebuild_records(connection, user_id=self.user_id, exercise_ids=self.imported_exercises)
+        bump_data_version(connection, self.user_id)
+        queue_resync(self.db, self.user_id, "bulk_import")
+
+    def result(self) -> BulkImportResult:
+        self.errors.sort(key=lambda error: error.row)
+        return BulkImportResult(inserted=self.inserted, failed=len(self.errors), errors=self.errors)
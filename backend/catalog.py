@@ -0,0 +1,138 @@
+"""
+Catálogo de ejercicios predefinidos (user_id NULL) en memoria del proceso.
+
+El catálogo es el mismo para todos los usuarios y casi nunca cambia, así que se
+carga una vez (al iniciar la app) como una tupla inmutable y se comparte entre
+requests sin locks. Se recarga:
+- al confirmar una transacción de este proceso que modificó un ejercicio global
+- con POST /api/admin/catalog/refresh (p. ej. después de correr seed_data.py)
+- pasados CATALOG_REFRESH_SECONDS, para que otros workers terminen viéndolo
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from database import SessionLocal
+from models import Exercise
+
+# 0 desactiva la recarga periódica
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class CatalogExercise:
+    id: int
+    name: str
+    description: Optional[str]
+    muscle_group: str
+    user_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    exercises: Tuple[CatalogExercise, ...]
+    by_id: Mapping[int, CatalogExercise]
+    loaded_at: float
+
+
+def global_exercises_select():
+    return select(Exercise).where(Exercise.user_id.is_(None)).order_by(Exercise.id)
+
+
+class ExerciseCatalog:
+    def __init__(self, refresh_seconds: float = CATALOG_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.refreshes = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def load(self, db: Optional[Session] = None) -> CatalogSnapshot:
+        """Lee el catálogo y reemplaza la instantánea de una sola vez"""
+        own_session = db is None
+        db = SessionLocal() if own_session else db
+        try:
+            exercises = tuple(
+                CatalogExercise(
+                    id=exercise.id,
+                    name=exercise.name,
+                    description=exercise.description,
+                    muscle_group=exercise.muscle_group
+                )
+                for exercise in db.scalars(global_exercises_select())
+            )
+        finally:
+            if own_session:
+                db.close()
+        snapshot = CatalogSnapshot(
+            exercises=exercises,
+            by_id=MappingProxyType({exercise.id: exercise for exercise in exercises}),
+            loaded_at=time.monotonic()
+        )
+        self._snapshot = snapshot
+        self._stale = False
+        self.refreshes += 1
+        return snapshot
+
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        expired = (
+            snapshot is not None and self.refresh_seconds > 0
+            and time.monotonic() - snapshot.loaded_at > self.refresh_seconds
+        )
+        if snapshot is None or self._stale or expired:
+            with self._lock:
+                # Otro hilo pudo haberlo recargado mientras se esperaba el lock
+                if self._snapshot is snapshot:
+                    snapshot = self.load()
+                else:
+                    snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def exercises(self) -> Tuple[CatalogExercise, ...]:
+        return self.snapshot().exercises
+
+    def get(self, exercise_id: int) -> Optional[CatalogExercise]:
+        return self.snapshot().by_id.get(exercise_id)
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "exercises": len(snapshot.exercises) if snapshot else 0,
+            "refreshes": self.refreshes,
+            "age_seconds": time.monotonic() - snapshot.loaded_at if snapshot else None,
+        }
+
+
+catalog = ExerciseCatalog()
+
+
+@event.listens_for(Exercise, "after_insert")
+@event.listens_for(Exercise, "after_update")
+@event.listens_for(Exercise, "after_delete")
+def mark_catalog_changed(mapper, connection, target):
+    session = object_session(target)
+    if target.user_id is None and session is not None:
+        session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_catalog_after_commit(session):
+    # Recién después del commit los demás pueden leer el cambio
+    if session.info.pop("catalog_changed", False):
+        catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_catalog_change(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,154 @@
+"""
+Verifica que ninguna consulta de la API haga un recorrido completo de tabla.
+
+Levanta la app sobre una base SQLite temporal, ejecuta todos los endpoints de
+main.py, captura cada sentencia SQL emitida y corre EXPLAIN QUERY PLAN sobre
+ella. Termina con código 1 si algún plan recorre completa una tabla.
+
+Uso (desde backend/):
+    python check_query_plans.py
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+
+# La base temporal se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}"
+# La actualización de los rankings recorre users a propósito (en segundo plano, no por request)
+os.environ["LEADERBOARD_REFRESH_SECONDS"] = "0"
+# Los trabajos se procesan de forma explícita para capturar también sus consultas
+os.environ["JOB_WORKERS"] = "0"
+os.environ["ADMIN_TOKEN"] = "query-plans"
+os.environ["ARCHIVE_DIR"] = tempfile.mkdtemp()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import archive
+import main
+from database import SessionLocal, engine
+from events import broker, stream_data_version
+from models import Base, Exercise
+
+# "SCAN t" recorre toda la tabla; "SCAN t USING INDEX i" recorre todo el índice.
+# Los accesos puntuales aparecen como "SEARCH t USING ..."
+SCAN_PATTERN = re.compile(r"\bSCAN (?:TABLE )?(\w+)")
+
+
+def seed_catalog():
+    db = SessionLocal()
+    db.add(Exercise(name="Press de Banca", muscle_group="Pecho", user_id=None))
+    db.add(Exercise(name="Correr", muscle_group="Cardio", user_id=None))
+    db.commit()
+    db.close()
+
+
+def subscribe_events(user_id: int):
+    """Conexión SSE simulada: las escrituras emiten también las consultas de events.py"""
+    stream_data_version(SessionLocal, user_id)
+
+    async def subscribe():
+        return broker.subscribe(user_id)
+
+    return asyncio.new_event_loop().run_until_complete(subscribe())
+
+
+def exercise_endpoints(client: TestClient):
+    """Recorre todos los endpoints para que emitan sus consultas"""
+    user = {"email": "plan@example.com", "password": "planes123", "name": "Plan"}
+    client.post("/api/auth/register", json=user)
+    token = client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    subscription = subscribe_events(user_id)
+    client.get("/api/exercises", headers=headers)
+    exercise = client.post("/api/exercises", json={"name": "Remo Propio", "muscle_group": "Espalda"}, headers=headers).json()
+    client.put(f"/api/exercises/{exercise['id']}", json={"description": "Con barra"}, headers=headers)
+
+    # Entrenamientos viejos que pasan al archivo antes de las lecturas
+    for date in ("2015-03-02T10:00:00", "2015-04-06T10:00:00"):
+        client.post("/api/workouts", json={"exercise_id": 1, "weight": 40, "repetitions": 5, "date": date}, headers=headers)
+    client.post("/api/admin/archive", params={"user_id": user_id}, headers={"X-Admin-Token": "query-plans"})
+    main.job_runner.run_pending()
+    workout = client.post("/api/workouts", json={"exercise_id": exercise["id"], "weight": 60, "repetitions": 8, "sets": 4}, headers=headers).json()
+    client.post("/api/workouts", json={"exercise_id": 2, "distance_km": 5}, headers=headers)
+    first_page = client.get("/api/workouts?limit=1", headers=headers)
+    client.get("/api/workouts", params={"limit": 1, "cursor": first_page.headers.get("X-Next-Cursor", "")}, headers=headers)
+    client.get("/api/workouts?muscle_group=Cardio&date_from=2000-01-01T00:00:00", headers=headers)
+    client.get("/api/workouts?format=ndjson", headers=headers)
+    # Lecturas del archivo en archivos mensuales (solo se consulta workout_archive_months)
+    archive.ARCHIVE_RAW = "file"
+    client.get("/api/workouts?limit=1", headers=headers)
+    client.get("/api/workouts?muscle_group=Pecho&exercise_id=1&date_from=2000-01-01T00:00:00", headers=headers)
+    archive.ARCHIVE_RAW = "table"
+    client.get(f"/api/progress/{exercise['id']}", headers=headers)
+    client.get("/api/progress/1?buckets=2", headers=headers)
+    client.get("/api/workouts/export?format=csv", headers=headers)
+    client.get(f"/api/progress/{exercise['id']}?buckets=2", headers=headers)
+    client.get("/api/progress/overview?sparkline_points=5", headers=headers)
+    client.get("/api/records", headers=headers)
+    client.get("/api/analytics/volume?period=month", headers=headers)
+    client.get("/api/analytics/trends", headers=headers)
+    client.get("/api/analytics/workload?metric=time", headers=headers)
+    client.get("/api/leaderboards/1", headers=headers)
+    client.get("/api/leaderboards/1?metric=weekly_volume&limit=100", headers=headers)
+    job = client.post("/api/workouts/bulk?background=true", json=[{"exercise_id": 1, "weight": 50}],
+                      headers={**headers, "Idempotency-Key": "plan"}).json()
+    client.post("/api/workouts/bulk?background=true", json=[], headers={**headers, "Idempotency-Key": "plan"})
+    main.job_runner.run_pending()
+    client.get(f"/api/jobs/{job['id']}", headers=headers)
+    client.get("/api/jobs?status=succeeded", headers=headers)
+    client.get(f"/api/records?exercise_id={exercise['id']}&record_type=max_reps", headers=headers)
+    client.put(f"/api/workouts/{workout['id']}", json={"weight": 65}, headers=headers)
+    client.delete(f"/api/exercises/{exercise['id']}", headers=headers)
+    client.delete(f"/api/workouts/{workout['id']}", headers=headers)
+    client.delete(f"/api/exercises/{exercise['id']}", headers=headers)
+    broker.unsubscribe(subscription)
+
+
+def main_check():
+    seed_catalog()
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            return
+        captured.append((statement, parameters))
+
+    with TestClient(main.app) as client:
+        exercise_endpoints(client)
+
+    tables = set(Base.metadata.tables)
+    failures = []
+    seen = set()
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            details = [row[-1] for row in plan]
+            scans = [
+                detail for detail in details
+                if (match := SCAN_PATTERN.search(detail)) and match.group(1) in tables
+            ]
+            if scans:
+                failures.append((statement, details))
+
+    print(f"Consultas analizadas: {len(seen)}")
+    if failures:
+        for statement, details in failures:
+            print("\n❌ Recorrido completo de tabla:")
+            print(f"   {' '.join(statement.split())}")
+            for detail in details:
+                print(f"   -> {detail}")
+        sys.exit(1)
+    print("✅ Todas las consultas usan índices")
+
+
+if __name__ == "__main__":
+    main_check()
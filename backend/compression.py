@@ -0,0 +1,258 @@
+"""
+Compresión de respuestas (gzip y, si está instalado, brotli) según Accept-Encoding.
+
+- CompressionMiddleware comprime las respuestas de la app a partir de
+  COMPRESSION_MIN_SIZE bytes, también las que van en streaming (exportación).
+  Se omiten las que ya traen Content-Encoding, los tipos no textuales y la
+  exportación con ?gzip=true (application/gzip).
+- Las respuestas de http_cache.py llegan ya comprimidas: cada CachedResponse
+  guarda sus variantes, así un acierto de la caché (o un progreso sin cambios)
+  no se vuelve a comprimir.
+
+Los contadores (bytes ahorrados y tiempo de CPU por respuesta) se ven en
+/api/cache/stats. Benchmark: python benchmarks/bench_compression.py
+"""
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Las respuestas más chicas no compensan el costo (y el overhead del formato)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 11 es el máximo pero demasiado lento para comprimir en cada request
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Preferencia del servidor cuando el cliente acepta varias con el mismo q
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class CompressionStats:
+    """Contadores por codificación, compartidos por el middleware y http_cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, seconds: float) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "precompressed_hits": 0}
+            )
+            counters["responses"] += 1
+            counters["bytes_in"] += bytes_in
+            counters["bytes_out"] += bytes_out
+            counters["cpu_seconds"] += seconds
+
+    def record_hit(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        """Respuesta servida desde una variante ya comprimida (sin CPU de compresión)"""
+        self.record(encoding, bytes_in, bytes_out, 0.0)
+        with self._lock:
+            self._counters[encoding]["precompressed_hits"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "enabled": COMPRESSION_ENABLED,
+                "min_size": COMPRESSION_MIN_SIZE,
+                "encodings": list(ENCODINGS),
+            }
+            for encoding, counters in self._counters.items():
+                responses = counters["responses"]
+                compressed = responses - counters["precompressed_hits"]
+                stats[encoding] = {
+                    **counters,
+                    "bytes_saved": counters["bytes_in"] - counters["bytes_out"],
+                    "ratio": counters["bytes_out"] / counters["bytes_in"] if counters["bytes_in"] else 1.0,
+                    "cpu_ms_per_compression": counters["cpu_seconds"] * 1000 / compressed if compressed else 0.0,
+                }
+            return stats
+
+
+compression_stats = CompressionStats()
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Elige la codificación según Accept-Encoding (con sus q), o None para enviar sin comprimir"""
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    # SSE (events.py): eventos chicos y conexiones que duran horas; un compresor por conexión no compensa
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    start = time.perf_counter()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip_compress(body)
+    compression_stats.record(encoding, len(body), len(compressed), time.perf_counter() - start)
+    return compressed
+
+
+def gzip_compress(body: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Compresión incremental para respuestas en streaming"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        start = time.perf_counter()
+        if self.encoding == "br":
+            data = self._compressor.process(chunk)
+            data += self._compressor.finish() if final else self._compressor.flush()
+        else:
+            data = self._compressor.compress(chunk)
+            # Cada bloque se envía completo para que el cliente lo procese sin esperar al final
+            data += self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        self.seconds += time.perf_counter() - start
+        self.bytes_in += len(chunk)
+        self.bytes_out += len(data)
+        if final:
+            compression_stats.record(self.encoding, self.bytes_in, self.bytes_out, self.seconds)
+        return data
+
+
+def header_value(headers, name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def vary_accept_encoding(vary: Optional[str]) -> str:
+    if not vary:
+        return "Accept-Encoding"
+    if "accept-encoding" in vary.lower():
+        return vary
+    return f"{vary}, Accept-Encoding"
+
+
+def weak_etag(etag: str) -> str:
+    # El cuerpo comprimido ya no es idéntico byte a byte al original
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """Middleware ASGI; las respuestas se comprimen en el loop, como GZipMiddleware de Starlette"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(header_value(scope["headers"], b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = header_value(headers, b"content-type") or ""
+                if (header_value(headers, b"content-encoding") is not None or not is_compressible(content_type)
+                        or message["status"] < 200 or message["status"] in (204, 304)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Se decide con el primer bloque del cuerpo
+                    start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None and not more_body:
+                # Cuerpo completo en un solo mensaje
+                passthrough = True
+                if len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send(message)
+                    return
+                body = compress(body, encoding)
+                headers = self.compressed_headers(start_message["headers"], encoding)
+                headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            if compressor is None:
+                compressor = StreamCompressor(encoding)
+                await send({**start_message, "headers": self.compressed_headers(start_message["headers"], encoding)})
+            await send({"type": "http.response.body", "body": compressor.compress(body, not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def compressed_headers(headers, encoding: str):
+        result = []
+        for key, value in headers:
+            name = key.lower()
+            if name == b"content-length":
+                continue  # El largo final no se conoce de antemano
+            if name == b"etag":
+                value = weak_etag(value.decode("latin-1")).encode("latin-1")
+            if name == b"vary":
+                continue
+            result.append((key, value))
+        result += [(b"content-encoding", encoding.encode()), (b"vary", vary_accept_encoding(header_value(headers, b"vary")).encode())]
+        return result
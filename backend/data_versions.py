@@ -0,0 +1,81 @@
+"""
+Versión de los datos de cada usuario (users.data_version).
+
+Cualquier alta, edición o borrado de entrenamientos o ejercicios incrementa la
+versión del usuario dueño en la misma transacción; un cambio en el catálogo
+global (ejercicios sin user_id) incrementa la de todos. http_cache.py la usa
+para los ETags y como parte de la clave de la caché de respuestas.
+
+lock_user_data toma en PostgreSQL el bloqueo de esa misma fila antes de
+mantener las tablas derivadas (summaries.py, records.py): así las escrituras
+de un usuario se serializan y un recálculo no pisa el incremento de otra
+transacción que todavía no ve (READ COMMITTED).
+"""
+from typing import Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Exercise, User, WorkoutEntry
+
+# connection.info: usuarios ya bloqueados en la transacción actual
+LOCKED_USERS_KEY = "locked_users"
+
+
+def bump_data_version(connection: Connection, user_id: Optional[int] = None) -> None:
+    """Incrementa la versión de un usuario, o la de todos si user_id es None"""
+    users = User.__table__
+    stmt = update(users).values(data_version=users.c.data_version + 1)
+    if user_id is not None:
+        stmt = stmt.where(users.c.id == user_id)
+    # Sentencia Core: no dispara los listeners de User (caché de auth)
+    connection.execute(stmt)
+
+
+def lock_user_data(connection: Connection, user_id: Optional[int] = None) -> None:
+    """Bloquea la fila del usuario (o todas si user_id es None) hasta el fin de la transacción"""
+    # SQLite serializa las escrituras: no hace falta
+    if connection.dialect.name != "postgresql":
+        return
+    transaction = connection.get_transaction()
+    locked = connection.info.get(LOCKED_USERS_KEY)
+    if locked is None or locked[0] is not transaction:
+        locked = (transaction, set())
+        connection.info[LOCKED_USERS_KEY] = locked
+    if user_id in locked[1] or None in locked[1]:
+        return
+    stmt = select(User.id).with_for_update()
+    if user_id is not None:
+        stmt = stmt.where(User.id == user_id)
+    connection.execute(stmt).all()
+    if transaction is not None:
+        locked[1].add(user_id)
+
+
+def data_version_select(user_id: int):
+    return select(User.data_version).where(User.id == user_id)
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    return db.scalar(data_version_select(user_id)) or 0
+
+
+async def get_data_version_async(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(data_version_select(user_id)) or 0
+
+
+@event.listens_for(WorkoutEntry, "after_insert")
+@event.listens_for(WorkoutEntry, "after_update")
+@event.listens_for(WorkoutEntry, "after_delete")
+def bump_after_workout_change(mapper, connection, target):
+    bump_data_version(connection, target.user_id)
+
+
+@event.listens_for(Exercise, "after_insert")
+@event.listens_for(Exercise, "after_update")
+@event.listens_for(Exercise, "after_delete")
+def bump_after_exercise_change(mapper, connection, target):
+    # Los ejercicios predefinidos los ven todos los usuarios
+    bump_data_version(connection, target.user_id)
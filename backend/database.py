@@ -1,5 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
@@ -9,12 +11,76 @@ load_dotenv()
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_DB_PATH = f"sqlite:///{os.path.join(BACKEND_DIR, 'gym_tracker.db')}"
 
-DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_DB_PATH)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+def resolve_database_url(url: str) -> str:
+    """Normaliza DATABASE_URL: rutas SQLite relativas al directorio backend y esquema postgres://"""
+    if url.startswith("postgres://"):
+        # Heroku/Railway publican postgres://, que SQLAlchemy 2 ya no acepta
+        return "postgresql://" + url[len("postgres://"):]
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database and parsed.database != ":memory:":
+        if not os.path.isabs(parsed.database):
+            # Evita que cada proceso cree su propia base según el directorio de trabajo
+            return parsed.set(database=os.path.join(BACKEND_DIR, parsed.database)).render_as_string(hide_password=False)
+    return url
+
+
+DATABASE_URL = resolve_database_url(os.getenv("DATABASE_URL", DEFAULT_DB_PATH))
+
+# Pool de conexiones (ignorado para SQLite en memoria)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Caché de sentencias SQL compiladas por SQLAlchemy
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# PRAGMAs aplicados a cada conexión SQLite
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def engine_kwargs(url) -> dict:
+    """Opciones de pool y caché comunes a los engines sync y async"""
+    is_sqlite = url.get_backend_name() == "sqlite"
+    kwargs = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not (is_sqlite and url.database in (None, "", ":memory:")):
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+def create_db_engine(database_url: str = DATABASE_URL, tune_sqlite: bool = True):
+    """Crea el engine de la aplicación con la configuración de pool del entorno"""
+    url = make_url(database_url)
+    db_engine = create_engine(database_url, **engine_kwargs(url))
+    if url.get_backend_name() == "sqlite" and tune_sqlite:
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -24,3 +90,55 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Modo de acceso a datos de los endpoints de ejercicios, entrenamientos y progreso:
+# "sync" (threadpool de FastAPI) o "async" (AsyncSession con aiosqlite/asyncpg)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(database_url: str = DATABASE_URL) -> str:
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}")
+    url = url.set(drivername=driver)
+    if driver == "postgresql+asyncpg":
+        # Caché de sentencias preparadas del lado de asyncpg
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+    return url.render_as_string(hide_password=False)
+
+
+def create_async_db_engine(database_url: str = DATABASE_URL, tune_sqlite: bool = True):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(async_database_url(database_url))
+    kwargs = engine_kwargs(url)
+    kwargs.pop("connect_args", None)
+    if "pool_size" in kwargs and url.get_backend_name() == "sqlite":
+        # aiosqlite usa NullPool por defecto: una conexión nueva por request
+        kwargs["poolclass"] = AsyncAdaptedQueuePool
+    db_engine = create_async_engine(url, **kwargs)
+    if url.get_backend_name() == "sqlite" and tune_sqlite:
+        event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine()
+    # Sin expire_on_commit: en async no se pueden recargar atributos de forma implícita
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
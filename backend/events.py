@@ -0,0 +1,486 @@
+"""
+Eventos en vivo por usuario (Server-Sent Events en GET /api/events).
+
+Cuando un endpoint confirma una transacción que creó, editó o borró
+entrenamientos, los clientes conectados de ese usuario reciben el cambio
+(workout.created / workout.updated / workout.deleted) y las estadísticas de
+progress_summaries de los ejercicios afectados (progress.updated), en lugar de
+volver a pedir /api/workouts y /api/progress/{exercise_id} completos.
+
+- Los cambios se juntan en session.info con listeners del ORM y se publican en
+  after_commit; un rollback los descarta. Si el usuario no tiene conexiones
+  abiertas en este proceso no se hace nada (ni consultas extra).
+- El pub/sub es en memoria del proceso: cada conexión tiene una cola acotada
+  (EVENTS_QUEUE_SIZE). Si un cliente no lee a tiempo se descartan sus eventos
+  pendientes y recibe un único "resync" para que vuelva a pedir los datos.
+- Cada evento lleva la data_version del usuario después del cambio. Con varios
+  workers, un hilo compara cada EVENTS_SYNC_SECONDS la versión de los usuarios
+  conectados con la última publicada y manda "resync" si otro proceso
+  modificó sus datos. Como una transacción local adelanta la versión
+  informada, antes de su primer cambio se lee la versión: si ya era mayor que
+  la informada, el evento pasa a ser "resync".
+- Las importaciones masivas mandan "resync" en lugar de una fila por evento,
+  igual que cambiar el grupo muscular de un ejercicio (cambia la métrica de
+  todo su progreso).
+
+Benchmark: python benchmarks/bench_events.py
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from data_versions import data_version_select
+from models import Exercise, ProgressSummary, User, WorkoutEntry
+
+logger = logging.getLogger(__name__)
+
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "true").lower() == "true"
+# Eventos pendientes por conexión antes de pasar a "resync"
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_MAX_CONNECTIONS_PER_USER = int(os.getenv("EVENTS_MAX_CONNECTIONS_PER_USER", "5"))
+EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "10000"))
+# Comentario ": ping" para que proxies y balanceadores no corten la conexión
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# 0 desactiva la revisión de cambios hechos por otros procesos (un solo worker)
+EVENTS_SYNC_SECONDS = float(os.getenv("EVENTS_SYNC_SECONDS", "5"))
+# Duración máxima de una conexión; el cliente reconecta solo (y puede caer en otro worker). 0 = sin límite
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "3600"))
+# Milisegundos que espera EventSource antes de reconectar
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+
+PENDING_KEY = "live_events"
+SYNC_CHUNK = 500
+
+event_ids = itertools.count(1)
+
+
+def encode(data: dict) -> str:
+    return json.dumps(data, separators=(",", ":"), default=lambda value: value.isoformat())
+
+
+def format_event(kind: str, data: dict) -> bytes:
+    """Bloque SSE listo para enviar; se arma una vez y se comparte entre conexiones"""
+    return f"id: {next(event_ids)}\nevent: {kind}\ndata: {encode(data)}\n\n".encode()
+
+
+HEARTBEAT = b": ping\n\n"
+
+
+# ---------------------------------------------------------------------------
+# Pub/sub en memoria
+# ---------------------------------------------------------------------------
+
+class Subscription:
+    """Una conexión abierta: cola acotada en el loop que la atiende"""
+    __slots__ = ("user_id", "loop", "queue", "dropped")
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def push(self, frame: Optional[bytes]) -> bool:
+        """Encola un evento (None cierra el stream); solo desde el loop de la conexión"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        # El cliente no lee a tiempo: lo pendiente ya no sirve, que vuelva a pedir los datos
+        while not self.queue.empty():
+            if self.queue.get_nowait() is None:
+                frame = None
+            self.dropped += 1
+        self.queue.put_nowait(frame if frame is None else format_event("resync", {"reason": "overflow"}))
+        return False
+
+
+class EventBroker:
+    def __init__(
+        self,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+        max_per_user: int = EVENTS_MAX_CONNECTIONS_PER_USER,
+        max_connections: int = EVENTS_MAX_CONNECTIONS
+    ):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self.max_connections = max_connections
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._versions: Dict[int, int] = {}
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, user_id: int) -> bool:
+        # Lectura sin lock: en el peor caso se pierde un evento de una conexión que recién abre
+        return user_id in self._subscribers
+
+    def has_any(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Registra una conexión del loop actual; 429/503 si se superan los límites"""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            if len(subscribers) >= self.max_per_user:
+                raise HTTPException(status_code=429, detail="Too many open event streams for this user")
+            if self._connections >= self.max_connections:
+                raise HTTPException(status_code=503, detail="Too many open event streams")
+            subscribers.add(subscription)
+            self._subscribers[user_id] = subscribers
+            self._connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            self._connections -= 1
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+                self._versions.pop(subscription.user_id, None)
+
+    def note_version(self, user_id: int, data_version: int) -> bool:
+        """Registra la versión ya informada al usuario; False si no era nueva"""
+        with self._lock:
+            if user_id not in self._subscribers or data_version <= self._versions.get(user_id, -1):
+                return False
+            self._versions[user_id] = data_version
+            return True
+
+    def known_version(self, user_id: int) -> int:
+        """Última versión informada al usuario; -1 si no hay"""
+        with self._lock:
+            return self._versions.get(user_id, -1)
+
+    def subscribed_versions(self) -> Dict[int, int]:
+        with self._lock:
+            return {user_id: self._versions.get(user_id, -1) for user_id in self._subscribers}
+
+    def publish(self, user_id: int, frames: List[bytes]) -> int:
+        """Entrega los eventos a las conexiones del usuario; se puede llamar desde cualquier hilo"""
+        with self._lock:
+            subscribers = tuple(self._subscribers.get(user_id, ()))
+        if not subscribers or not frames:
+            return 0
+        self.published += len(frames)
+        # Un solo aviso por loop (normalmente hay uno) aunque el usuario tenga varias conexiones
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription]] = {}
+        for subscription in subscribers:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, targets in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, targets, frames)
+            except RuntimeError:
+                # Loop cerrado (la app se está deteniendo)
+                pass
+        return len(subscribers)
+
+    def _deliver(self, subscriptions: List[Subscription], frames: List[bytes]) -> None:
+        for subscription in subscriptions:
+            for frame in frames:
+                if subscription.push(frame):
+                    self.delivered += 1
+                else:
+                    self.overflows += 1
+                    break
+
+    def close_all(self) -> None:
+        """Termina los streams abiertos (al detener la app)"""
+        with self._lock:
+            subscriptions = [subscription for subscribers in self._subscribers.values() for subscription in subscribers]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, None)
+            except RuntimeError:
+                pass
+
+    async def stream(self, subscription: Subscription, data_version: int):
+        """Cuerpo de la respuesta SSE: "ready", los eventos de la cola y heartbeats"""
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n".encode() + format_event("ready", {"data_version": data_version})
+            queue = subscription.queue
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + EVENTS_MAX_STREAM_SECONDS if EVENTS_MAX_STREAM_SECONDS > 0 else None
+            while True:
+                timeout = EVENTS_HEARTBEAT_SECONDS
+                if deadline is not None:
+                    timeout = min(timeout, deadline - loop.time())
+                    if timeout <= 0:
+                        return
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                # Lo que se acumuló mientras tanto sale en un solo envío
+                frames = [frame]
+                while frame is not None and not queue.empty():
+                    frame = queue.get_nowait()
+                    frames.append(frame)
+                if frames[-1] is None:
+                    if len(frames) > 1:
+                        yield b"".join(frames[:-1])
+                    return
+                yield b"".join(frames)
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            users = len(self._subscribers)
+            connections = self._connections
+        return {
+            "connections": connections,
+            "users": users,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+broker = EventBroker()
+
+
+def stream_data_version(session_factory, user_id: int) -> Optional[int]:
+    """Versión inicial del stream; None si el usuario ya no existe"""
+    with session_factory() as db:
+        return db.scalar(data_version_select(user_id))
+
+
+# ---------------------------------------------------------------------------
+# Captura de cambios en la sesión
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PendingChanges:
+    """Cambios de un usuario en la transacción en curso"""
+    events: List[Tuple[str, dict]] = field(default_factory=list)
+    progress: Dict[int, Optional[dict]] = field(default_factory=dict)
+    data_version: int = 0
+    # Versión antes del primer cambio de la transacción
+    base_version: Optional[int] = None
+    resync: Optional[str] = None
+
+
+def pending_changes(session: Session, user_id: int) -> PendingChanges:
+    return session.info.setdefault(PENDING_KEY, {}).setdefault(user_id, PendingChanges())
+
+
+def workout_delta(workout: WorkoutEntry) -> dict:
+    # Mismos campos que WorkoutEntryResponse, sin el ejercicio anidado (el cliente ya lo tiene)
+    return {
+        "id": workout.id,
+        "exercise_id": workout.exercise_id,
+        "weight": workout.weight,
+        "repetitions": workout.repetitions,
+        "sets": workout.sets,
+        "time_minutes": workout.time_minutes,
+        "distance_km": workout.distance_km,
+        "date": workout.date,
+        "notes": workout.notes,
+    }
+
+
+def progress_delta(exercise_id: int, summary) -> dict:
+    if summary is None:
+        return {"exercise_id": exercise_id, "total_sessions": 0, "max_primary": None, "avg_primary": None,
+                "last_primary": None, "last_date": None, "last_workout_id": None}
+    return {
+        "exercise_id": exercise_id,
+        "total_sessions": summary.total_sessions,
+        "max_primary": summary.max_primary,
+        "avg_primary": summary.primary_sum / summary.primary_count if summary.primary_count else None,
+        "last_primary": summary.last_primary,
+        "last_date": summary.last_date,
+        "last_workout_id": summary.last_workout_id,
+    }
+
+
+def capture(target: WorkoutEntry, kind: str, data: dict, exercise_ids) -> None:
+    if not broker.has_subscribers(target.user_id):
+        return
+    session = object_session(target)
+    if session is None:
+        return
+    changes = pending_changes(session, target.user_id)
+    changes.events.append((kind, data))
+    changes.progress.update(dict.fromkeys(exercise_ids))
+
+
+@event.listens_for(WorkoutEntry, "after_insert")
+def capture_created(mapper, connection, target):
+    capture(target, "workout.created", workout_delta(target), (target.exercise_id,))
+
+
+@event.listens_for(WorkoutEntry, "after_update")
+def capture_updated(mapper, connection, target):
+    # Si cambió de ejercicio también cambian las estadísticas del anterior
+    previous = inspect(target).attrs.exercise_id.history.deleted
+    capture(target, "workout.updated", workout_delta(target), (target.exercise_id, *previous))
+
+
+@event.listens_for(WorkoutEntry, "after_delete")
+def capture_deleted(mapper, connection, target):
+    capture(target, "workout.deleted", {"id": target.id, "exercise_id": target.exercise_id}, (target.exercise_id,))
+
+
+def queue_resync(session: Session, user_id: int, reason: str) -> None:
+    """Para cambios hechos con sentencias Core (p. ej. importaciones masivas)"""
+    if not broker.has_subscribers(user_id):
+        return
+    changes = pending_changes(session, user_id)
+    changes.resync = reason
+    changes.data_version = session.scalar(data_version_select(user_id)) or 0
+
+
+@event.listens_for(Exercise, "after_update")
+def capture_exercise_updated(mapper, connection, target):
+    # summaries.py recalcula el progreso con la nueva métrica principal: el cliente vuelve a pedirlo
+    if target.user_id is None or not inspect(target).attrs.muscle_group.history.has_changes():
+        return
+    session = object_session(target)
+    if session is not None:
+        queue_resync(session, target.user_id, "exercise")
+
+
+def progress_rows_select(user_id: int, exercise_ids):
+    s = ProgressSummary
+    return select(
+        s.exercise_id, s.total_sessions, s.primary_count, s.primary_sum,
+        s.max_primary, s.last_primary, s.last_date, s.last_workout_id
+    ).where(s.user_id == user_id, s.exercise_id.in_(exercise_ids))
+
+
+@event.listens_for(Session, "before_flush")
+def read_version_before_flush(session, flush_context, instances):
+    # Antes de que data_versions.py la incremente: la diferencia con la informada es de otro proceso
+    if not broker.has_any():
+        return
+    user_ids = {
+        obj.user_id for obj in itertools.chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, WorkoutEntry) and broker.has_subscribers(obj.user_id)
+    }
+    for user_id in user_ids:
+        changes = pending_changes(session, user_id)
+        if changes.base_version is None:
+            changes.base_version = session.connection().scalar(data_version_select(user_id)) or 0
+
+
+@event.listens_for(Session, "after_flush")
+def read_progress_after_flush(session, flush_context):
+    # Después del flush los listeners de summaries.py y data_versions.py ya escribieron
+    pending = session.info.get(PENDING_KEY)
+    if not pending:
+        return
+    connection = session.connection()
+    for user_id, changes in pending.items():
+        if changes.progress:
+            exercise_ids = list(changes.progress)
+            summaries = {row.exercise_id: row for row in connection.execute(progress_rows_select(user_id, exercise_ids))}
+            changes.progress = {
+                exercise_id: progress_delta(exercise_id, summaries.get(exercise_id)) for exercise_id in exercise_ids
+            }
+        changes.data_version = connection.scalar(data_version_select(user_id)) or 0
+
+
+@event.listens_for(Session, "after_commit")
+def publish_after_commit(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    for user_id, changes in pending.items():
+        version = changes.data_version
+        known = broker.known_version(user_id)
+        broker.note_version(user_id, version)
+        if changes.resync is None and changes.base_version is not None and 0 <= known < changes.base_version:
+            # Otro proceso cambió los datos y esta versión tapa ese cambio para VersionWatcher
+            changes.resync = "external"
+        if changes.resync is not None:
+            frames = [format_event("resync", {"reason": changes.resync, "data_version": version})]
+        else:
+            frames = [format_event(kind, {**data, "data_version": version}) for kind, data in changes.events]
+            frames.extend(
+                format_event("progress.updated", {**progress, "data_version": version})
+                for progress in changes.progress.values() if progress is not None
+            )
+        broker.publish(user_id, frames)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# Cambios hechos por otros procesos
+# ---------------------------------------------------------------------------
+
+def versions_select(user_ids):
+    return select(User.id, User.data_version).where(User.id.in_(user_ids))
+
+
+class VersionWatcher:
+    """Hilo que manda "resync" a los usuarios conectados cuyos datos cambió otro proceso"""
+
+    def __init__(self, engine, sync_seconds: float = EVENTS_SYNC_SECONDS, events: EventBroker = broker):
+        self.engine = engine
+        self.sync_seconds = sync_seconds
+        self.broker = events
+        self.resyncs = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        known = self.broker.subscribed_versions()
+        user_ids = list(known)
+        changed = 0
+        with self.engine.connect() as connection:
+            for start in range(0, len(user_ids), SYNC_CHUNK):
+                for user_id, version in connection.execute(versions_select(user_ids[start:start + SYNC_CHUNK])):
+                    # -1: conexión nueva; su "ready" ya lleva la versión actual
+                    if known[user_id] < 0 or version <= known[user_id]:
+                        self.broker.note_version(user_id, version)
+                        continue
+                    if self.broker.note_version(user_id, version):
+                        self.broker.publish(user_id, [format_event("resync", {"reason": "external", "data_version": version})])
+                        changed += 1
+        self.resyncs += changed
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sync_seconds):
+            if not self.broker.has_any():
+                continue
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("No se pudieron revisar las versiones de los usuarios conectados")
+
+    def start(self) -> None:
+        if not EVENTS_ENABLED or self.sync_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="events-version-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,252 @@
+"""
+Exportación en streaming del historial de entrenamientos.
+
+Las filas se leen de un cursor (yield_per) en bloques de EXPORT_CHUNK_SIZE y se
+serializan bloque a bloque, así la memoria no depende del tamaño del historial.
+Los entrenamientos archivados (archive.py) se intercalan en orden de fecha.
+
+Formatos:
+- csv / ndjson: una fila por entrenamiento, con el ejercicio unido.
+- columnar: binario compacto para análisis (ver COLUMNAR_MAGIC):
+
+    "GTC1" | uint32 largo del esquema | esquema JSON {"columns": [{"name", "type"}]}
+    bloques: uint32 filas (0 = fin), y por cada columna:
+        bitmap de nulos (1 bit por fila, 1 = tiene valor)
+        int32 / int64 / float64 / timestamp (int64, microsegundos UTC): n valores little-endian
+        str: n+1 offsets uint32 + bytes UTF-8
+        dict: uint32 entradas + (entradas+1) offsets uint32 + bytes UTF-8 + n códigos uint32
+
+Con gzip=true la salida se comprime de forma incremental.
+"""
+import csv
+import heapq
+import io
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+from itertools import chain, islice
+from typing import BinaryIO, Iterable, Iterator, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Exercise, WorkoutEntry
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+COLUMNAR_MAGIC = b"GTC1"
+
+# (nombre, tipo columnar, columna)
+EXPORT_COLUMNS = [
+    ("id", "int64", WorkoutEntry.id),
+    ("date", "timestamp", WorkoutEntry.date),
+    ("exercise_id", "int32", WorkoutEntry.exercise_id),
+    # Se repiten en casi todas las filas: diccionario por bloque
+    ("exercise_name", "dict", Exercise.name),
+    ("muscle_group", "dict", Exercise.muscle_group),
+    ("weight", "float64", WorkoutEntry.weight),
+    ("repetitions", "int32", WorkoutEntry.repetitions),
+    ("sets", "int32", WorkoutEntry.sets),
+    ("time_minutes", "float64", WorkoutEntry.time_minutes),
+    ("distance_km", "float64", WorkoutEntry.distance_km),
+    ("notes", "str", WorkoutEntry.notes),
+]
+EXPORT_FIELDS = [name for name, _, _ in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "columnar": "application/octet-stream",
+}
+EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "columnar": "gtc"}
+
+EPOCH = datetime(1970, 1, 1)
+
+COLUMNAR_TYPECODES = {"int32": "i", "int64": "q", "timestamp": "q", "float64": "d"}
+
+
+def export_select(user_id: int):
+    return (
+        select(*(column for _, _, column in EXPORT_COLUMNS))
+        .join(Exercise, Exercise.id == WorkoutEntry.exercise_id)
+        .where(WorkoutEntry.user_id == user_id)
+        .order_by(WorkoutEntry.date, WorkoutEntry.id)
+    )
+
+
+def export_chunks(db: Session, user_id: int, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """Bloques de tuplas leídos del cursor sin materializar el historial"""
+    from archive import iter_archived  # archive.py usa el formato columnar de este módulo
+
+    result = db.execute(export_select(user_id).execution_options(yield_per=chunk_size))
+    archived = iter_archived(db, user_id, descending=False)
+    first = next(archived, None)
+    if first is None:
+        for partition in result.partitions():
+            yield partition
+        return
+    # Con entrenamientos archivados se intercalan por (date, id)
+    merged = heapq.merge(
+        result, (workout.export_row() for workout in chain([first], archived)), key=lambda row: (row[1], row[0])
+    )
+    while chunk := list(islice(merged, chunk_size)):
+        yield chunk
+
+
+def csv_stream(chunks: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in chunks:
+        for row in rows:
+            writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else ("" if value is None else value)
+                for value in row
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Solo encabezado si no hay filas
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_stream(chunks: Iterable[list]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield "".join(
+            json.dumps({
+                name: value.isoformat() if isinstance(value, datetime) else value
+                for name, value in zip(EXPORT_FIELDS, row)
+            }, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+def to_microseconds(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // (datetime.resolution)
+
+
+def encode_columnar_block(rows: List[tuple]) -> bytes:
+    parts = [struct.pack("<I", len(rows))]
+    for index, (_, kind, _) in enumerate(EXPORT_COLUMNS):
+        values = [row[index] for row in rows]
+        bitmap = bytearray((len(values) + 7) // 8)
+        for position, value in enumerate(values):
+            if value is not None:
+                bitmap[position >> 3] |= 1 << (position & 7)
+        parts.append(bytes(bitmap))
+
+        if kind == "str":
+            parts.append(encode_strings(values))
+        elif kind == "dict":
+            codes = {}
+            for value in values:
+                if value is not None and value not in codes:
+                    codes[value] = len(codes)
+            parts.append(struct.pack("<I", len(codes)))
+            parts.append(encode_strings(list(codes)))
+            parts.append(little_endian(array("I", (0 if v is None else codes[v] for v in values))))
+        elif kind == "int32":
+            parts.append(little_endian(array("i", (0 if v is None else v for v in values))))
+        elif kind == "float64":
+            parts.append(little_endian(array("d", (0.0 if v is None else v for v in values))))
+        elif kind == "timestamp":
+            parts.append(little_endian(array("q", (0 if v is None else to_microseconds(v) for v in values))))
+        else:
+            parts.append(little_endian(array("q", (0 if v is None else v for v in values))))
+    return b"".join(parts)
+
+
+def encode_strings(values: list) -> bytes:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        if value is not None:
+            blob += value.encode()
+        offsets.append(len(blob))
+    return little_endian(offsets) + bytes(blob)
+
+
+def read_strings(stream: BinaryIO, count: int) -> List[str]:
+    offsets = array("I")
+    offsets.frombytes(stream.read(4 * (count + 1)))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    blob = stream.read(offsets[-1])
+    return [blob[offsets[i]:offsets[i + 1]].decode() for i in range(count)]
+
+
+def read_array(stream: BinaryIO, typecode: str, count: int) -> list:
+    values = array(typecode)
+    values.frombytes(stream.read(values.itemsize * count))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return list(values)
+
+
+def little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def columnar_stream(chunks: Iterable[list]) -> Iterator[bytes]:
+    schema = json.dumps({"columns": [{"name": name, "type": kind} for name, kind, _ in EXPORT_COLUMNS]}).encode()
+    yield COLUMNAR_MAGIC + struct.pack("<I", len(schema)) + schema
+    for rows in chunks:
+        yield encode_columnar_block(rows)
+    yield struct.pack("<I", 0)
+
+
+def read_columnar(stream: BinaryIO) -> Iterator[dict]:
+    """Lector de referencia del formato columnar: devuelve un dict de columnas por bloque"""
+    if stream.read(4) != COLUMNAR_MAGIC:
+        raise ValueError("Not a GTC1 stream")
+    (schema_length,) = struct.unpack("<I", stream.read(4))
+    columns = json.loads(stream.read(schema_length))["columns"]
+    while True:
+        (count,) = struct.unpack("<I", stream.read(4))
+        if count == 0:
+            return
+        block = {}
+        for column in columns:
+            bitmap = stream.read((count + 7) // 8)
+            present = [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(count)]
+            if column["type"] == "str":
+                values = read_strings(stream, count)
+            elif column["type"] == "dict":
+                (entries,) = struct.unpack("<I", stream.read(4))
+                dictionary = read_strings(stream, entries)
+                values = [dictionary[code] if ok else None for code, ok in zip(read_array(stream, "I", count), present)]
+            else:
+                values = read_array(stream, COLUMNAR_TYPECODES[column["type"]], count)
+            block[column["name"]] = [value if ok else None for value, ok in zip(values, present)]
+        yield block
+
+
+def gzip_stream(parts: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for part in parts:
+        compressed = compressor.compress(part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+STREAMS = {"csv": csv_stream, "ndjson": ndjson_stream, "columnar": columnar_stream}
+
+
+def export_stream(db: Session, user_id: int, format: str, gzip: bool = False) -> Iterator[bytes]:
+    stream = STREAMS[format](export_chunks(db, user_id))
+    return gzip_stream(stream) if gzip else stream
+
+
+def export_filename(format: str, gzip: bool = False) -> str:
+    name = f"gym_tracker_export.{EXTENSIONS[format]}"
+    return f"{name}.gz" if gzip else name
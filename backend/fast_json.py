@@ -0,0 +1,126 @@
+"""
+Serialización rápida (opcional) de /api/workouts y /api/progress/{exercise_id}.
+
+Con FAST_JSON=true esas respuestas se arman desde tuplas de columnas (sin
+hidratar objetos ORM ni construir modelos Pydantic) y se codifican con orjson.
+Los dicts siguen el orden de campos de schemas.py y los floats se convierten
+igual que lo haría Pydantic, así que los bytes son los mismos que con
+json_body(). La única diferencia posible son floats >= 1e16 ("1e20" en vez de
+"1e+20"), fuera del rango que aceptan las validaciones de entrada.
+
+El cuerpo pasa igual por http_cache.store_response (ETag y caché de respuestas).
+Benchmark: python benchmarks/bench_json_serialization.py
+"""
+import logging
+import os
+
+from models import Exercise, WorkoutEntry
+from progress import ArchivedPoint, build_progress_stats
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON=true pero orjson no está instalado; se usa la serialización con Pydantic")
+    FAST_JSON = False
+
+
+# Columnas de WorkoutEntryResponse (y su ExerciseResponse anidado) en orden
+WORKOUT_COLUMNS = (
+    WorkoutEntry.id,
+    WorkoutEntry.exercise_id,
+    WorkoutEntry.weight,
+    WorkoutEntry.repetitions,
+    WorkoutEntry.sets,
+    WorkoutEntry.time_minutes,
+    WorkoutEntry.distance_km,
+    WorkoutEntry.date,
+    WorkoutEntry.notes,
+    Exercise.name.label("exercise_name"),
+    Exercise.description.label("exercise_description"),
+    Exercise.muscle_group.label("exercise_muscle_group"),
+    Exercise.user_id.label("exercise_user_id"),
+)
+
+
+def optional_float(value):
+    return None if value is None else float(value)
+
+
+def workout_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "exercise_id": row.exercise_id,
+        "weight": optional_float(row.weight),
+        "repetitions": row.repetitions,
+        "sets": row.sets,
+        "time_minutes": optional_float(row.time_minutes),
+        "distance_km": optional_float(row.distance_km),
+        "date": row.date,
+        "notes": row.notes,
+        "exercise": {
+            "id": row.exercise_id,
+            "name": row.exercise_name,
+            "description": row.exercise_description,
+            "muscle_group": row.exercise_muscle_group,
+            "user_id": row.exercise_user_id,
+        },
+    }
+
+
+def workouts_json(rows) -> bytes:
+    """Equivalente a json_body(List[WorkoutEntryResponse], workouts) para filas de WORKOUT_COLUMNS"""
+    return orjson.dumps([workout_dict(row) for row in rows])
+
+
+def progress_point_dict(row, bucketed: bool) -> dict:
+    # Mismas claves (y en el mismo orden) que ProgressDataPoint
+    if bucketed:
+        return {
+            "date": row.date.isoformat(),
+            "weight": None,
+            "reps": None,
+            "sets": None,
+            "time_minutes": None,
+            "distance_km": None,
+            "primary_metric": float(row.primary_avg),
+            "primary_label": row.primary_label,
+            "primary_min": optional_float(row.primary_min),
+            "primary_max": optional_float(row.primary_max),
+            "samples": row.samples,
+        }
+    return {
+        "date": row.date.isoformat(),
+        "weight": optional_float(row.weight),
+        "reps": row.repetitions,
+        "sets": row.sets,
+        "time_minutes": optional_float(row.time_minutes),
+        "distance_km": optional_float(row.distance_km),
+        "primary_metric": float(row.primary_metric),
+        "primary_label": row.primary_label,
+        "primary_min": None,
+        "primary_max": None,
+        "samples": None,
+    }
+
+
+def progress_stats_json(config: dict, stats, rows, bucketed: bool) -> bytes:
+    """Builder para compute_progress_stats: devuelve el JSON de ProgressStats"""
+    if stats is None or not stats.total_sessions or not stats.primary_count:
+        # Casos vacíos: sin filas, el camino normal ya es barato
+        return orjson.dumps(build_progress_stats(config, stats, rows, bucketed).model_dump())
+    return orjson.dumps({
+        "max_primary": float(stats.max_primary),
+        "avg_primary": float(stats.avg_primary),
+        "last_primary": float(stats.last_primary),
+        "total_sessions": stats.total_sessions,
+        "primary_metric_name": config['name'],
+        "primary_metric_unit": config['unit'],
+        "progress_data": [progress_point_dict(row, bucketed or isinstance(row, ArchivedPoint)) for row in rows],
+    })
@@ -0,0 +1,142 @@
+"""
+Caché HTTP de las lecturas por usuario: ETags, GET condicionales y una caché
+LRU opcional de respuestas serializadas.
+
+El ETag se deriva del usuario, la versión de sus datos (data_versions.py), la
+ruta y los parámetros, así que se calcula sin tocar los datos: si coincide con
+If-None-Match se responde 304 sin consultar ni serializar nada. La caché de
+respuestas usa la misma clave; una escritura sube la versión y las entradas
+viejas simplemente dejan de pedirse hasta que el LRU las desaloja.
+
+Cada respuesta guarda además sus variantes comprimidas (compression.py), que
+llevan un ETag con sufijo por codificación ("...-gzip", "...-br").
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from cache import LRUCache
+from compression import COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, compress, compression_stats, negotiate_encoding
+
+# 0 desactiva la caché de respuestas (los ETags siguen activos)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "0"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+# Cambiarlo si cambia el formato de las respuestas, para invalidar los ETags de los clientes
+ETAG_FORMAT_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    # codificación -> cuerpo comprimido, se completa a medida que los clientes las piden
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+
+response_cache = (
+    LRUCache(
+        "http_responses",
+        RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+        sizeof=lambda cached: cached.size
+    )
+    if RESPONSE_CACHE_MAX_BYTES > 0 else None
+)
+
+
+def response_key(request: Request, user_id: int, version: int) -> tuple:
+    params = tuple(sorted(request.query_params.multi_items()))
+    return user_id, request.url.path, params, version
+
+
+def make_etag(key: tuple) -> str:
+    digest = hashlib.sha256(repr((ETAG_FORMAT_VERSION, key)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(request: Request, etag: str) -> Optional[str]:
+    """El ETag de If-None-Match que corresponde a esta versión (con cualquier codificación), o None"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return etag
+    for candidate in header.split(","):
+        # If-None-Match usa comparación débil: W/"x" equivale a "x"
+        candidate = candidate.strip()
+        strong = candidate.removeprefix("W/")
+        if strong == etag or any(strong == encoded_etag(etag, encoding) for encoding in ("gzip", "br")):
+            return candidate
+    return None
+
+
+def encoded_body(cached: CachedResponse, encoding: str, key: tuple) -> bytes:
+    body = cached.variants.get(encoding)
+    if body is not None:
+        compression_stats.record_hit(encoding, len(cached.body), len(body))
+        return body
+    body = cached.variants[encoding] = compress(cached.body, encoding)
+    if response_cache is not None:
+        # Se vuelve a guardar para que el LRU cuente el tamaño de la variante
+        response_cache.set(key, cached)
+    return body
+
+
+def build_response(request: Request, cached: CachedResponse, key: tuple) -> Response:
+    body, encoding = cached.body, None
+    headers = {**cached.headers, "Cache-Control": "private, no-cache"}
+    if COMPRESSION_ENABLED and len(body) >= COMPRESSION_MIN_SIZE:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            body = encoded_body(cached, encoding, key)
+            headers["Content-Encoding"] = encoding
+    headers["ETag"] = encoded_etag(make_etag(key), encoding)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_response(request: Request, user_id: int, version: int) -> Optional[Response]:
+    """304 si el cliente ya tiene esta versión, la respuesta guardada si hay, o None"""
+    key = response_key(request, user_id, version)
+    etag = etag_matches(request, make_etag(key))
+    if etag is not None:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return build_response(request, cached, key)
+    return None
+
+
+def store_response(request: Request, user_id: int, version: int, body: bytes,
+                   headers: Optional[Dict[str, str]] = None) -> Response:
+    key = response_key(request, user_id, version)
+    cached = CachedResponse(body=body, headers=headers or {})
+    if response_cache is not None:
+        response_cache.set(key, cached)
+    return build_response(request, cached, key)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def json_body(annotation, data: Any) -> bytes:
+    """Serializa como lo haría response_model (los objetos ORM se leen por atributos)"""
+    adapter = type_adapter(annotation)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
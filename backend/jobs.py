@@ -0,0 +1,416 @@
+"""
+Trabajos en segundo plano, persistidos en la tabla jobs.
+
+Las operaciones largas (importaciones grandes, recálculos de derivados) se
+encolan y el request responde 202 con el id del trabajo en lugar de ocupar un
+worker hasta que terminan. Cada proceso de la app corre JOB_WORKERS hilos que
+toman trabajos de la tabla, así que sobreviven a reinicios y se reparten entre
+workers:
+- se reservan con un UPDATE condicional; run_after pasa a ser el vencimiento
+  de la reserva (JOB_LEASE_SECONDS), que se renueva cada JOB_HEARTBEAT_SECONDS
+  mientras el handler corre; si el proceso muere otro lo retoma
+- los errores se reintentan hasta max_attempts con espera exponencial desde
+  JOB_RETRY_SECONDS; PermanentJobError falla sin reintentar
+- con una clave (key) solo puede haber un trabajo pendiente o en curso: encolar
+  otro con la misma clave devuelve el existente
+
+Un trabajo puede correr más de una vez (reintentos, reserva vencida), así que
+cada handler debe ser idempotente; los de este módulo hacen todo en una
+transacción.
+
+Uso (desde backend/):
+    python jobs.py work     # procesa trabajos sin levantar la API
+    python jobs.py list     # últimos trabajos
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Job
+from schemas import JobResponse
+
+logger = logging.getLogger(__name__)
+
+# Hilos por proceso; 0 desactiva el procesamiento en la app (queda `python jobs.py work`)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", "5"))
+# Un trabajo que no termina en este tiempo se considera abandonado y se retoma
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "900"))
+# Cada cuánto un trabajo en curso renueva su reserva (debe ser menor que JOB_LEASE_SECONDS)
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 3)))
+# Los trabajos terminados se borran pasado este tiempo
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE = (QUEUED, RUNNING)
+FINISHED = (SUCCEEDED, FAILED)
+JOB_STATUS_PATTERN = f"^({'|'.join(ACTIVE + FINISHED)})$"
+
+HANDLERS: Dict[str, Callable[[Session, dict], Optional[dict]]] = {}
+
+
+class PermanentJobError(Exception):
+    """Error que no se resuelve reintentando (datos inválidos, handler inexistente)"""
+
+
+def job_handler(kind: str):
+    """Registra la función que ejecuta los trabajos de un tipo: handler(db, payload) -> resultado JSON"""
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Encolado y lectura
+# ---------------------------------------------------------------------------
+
+def active_job_select(key: str):
+    return select(Job).where(Job.key == key, Job.status.in_(ACTIVE))
+
+
+def enqueue(db: Session, kind: str, payload: dict, user_id: Optional[int] = None, key: Optional[str] = None,
+            max_attempts: int = JOB_MAX_ATTEMPTS) -> Tuple[Job, bool]:
+    """Encola y confirma un trabajo; devuelve (trabajo, creado) y el existente si la clave ya está activa"""
+    if key is not None:
+        existing = db.scalar(active_job_select(key))
+        if existing is not None:
+            return existing, False
+    job = Job(
+        kind=kind, key=key, status=QUEUED, user_id=user_id, payload=json.dumps(payload),
+        attempts=0, max_attempts=max_attempts, run_after=datetime.utcnow(), created_at=datetime.utcnow()
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro request encoló la misma clave entre la consulta y el INSERT
+        db.rollback()
+        existing = db.scalar(active_job_select(key)) if key is not None else None
+        if existing is None:
+            raise
+        return existing, False
+    job_runner.notify()
+    return job, True
+
+
+def job_response(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": json.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+    }
+
+
+def accepted_response(job: Job) -> JSONResponse:
+    """202 con el estado del trabajo y su URL"""
+    body = JobResponse(**job_response(job)).model_dump(mode="json")
+    return JSONResponse(status_code=202, content=body, headers={"Location": f"/api/jobs/{job.id}"})
+
+
+def user_jobs_select(user_id: int, status: Optional[str] = None, limit: int = 20):
+    """Últimos trabajos del usuario, por el índice (user_id, id)"""
+    stmt = select(Job).where(Job.user_id == user_id)
+    if status is not None:
+        stmt = stmt.where(Job.status == status)
+    return stmt.order_by(Job.id.desc()).limit(limit)
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+def claim_job(db: Session, worker_id: str, now: datetime) -> Optional[Job]:
+    """Reserva el próximo trabajo pendiente (o con la reserva vencida) para este worker"""
+    while True:
+        candidate = db.execute(
+            select(Job.id).where(Job.status.in_(ACTIVE), Job.run_after <= now).order_by(Job.run_after, Job.id).limit(1)
+        ).first()
+        if candidate is None:
+            return None
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == candidate.id, Job.status.in_(ACTIVE), Job.run_after <= now)
+            .values(status=RUNNING, locked_by=worker_id, attempts=Job.attempts + 1, started_at=now,
+                    run_after=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if claimed.rowcount == 0:
+            continue  # Lo tomó otro worker
+        job = db.get(Job, candidate.id, populate_existing=True)
+        if job.attempts > job.max_attempts:
+            # Volvió por reserva vencida después del último intento
+            finish_job(db, job, worker_id, FAILED, error="Job lease expired on its last attempt")
+            continue
+        return job
+
+
+def renew_lease(db: Session, job_id: int, worker_id: str, now: datetime) -> bool:
+    """Extiende la reserva de un trabajo en curso; False si ya no es de este worker"""
+    renewed = db.execute(
+        update(Job).where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(run_after=now + timedelta(seconds=JOB_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return renewed.rowcount > 0
+
+
+class LeaseHeartbeat:
+    """Renueva la reserva en un hilo mientras el handler corre, así un trabajo largo no se retoma"""
+
+    def __init__(self, session_factory, job_id: int, worker_id: str, interval: float = JOB_HEARTBEAT_SECONDS):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with self.session_factory() as db:
+                    if not renew_lease(db, self.job_id, self.worker_id, datetime.utcnow()):
+                        logger.warning("El trabajo %s ya no está reservado por %s", self.job_id, self.worker_id)
+                        return
+            except Exception:
+                # Con SQLite el handler puede tener el lock de escritura: se reintenta en el próximo latido
+                logger.exception("No se pudo renovar la reserva del trabajo %s", self.job_id)
+
+
+def finish_job(db: Session, job: Job, worker_id: str, status: str, result: Optional[dict] = None,
+               error: Optional[str] = None, retry_at: Optional[datetime] = None) -> None:
+    """Guarda el resultado si la reserva sigue siendo de este worker"""
+    values = {"status": status, "error": error, "locked_by": None}
+    if status == QUEUED:
+        values["run_after"] = retry_at
+    else:
+        values.update(result=json.dumps(result) if result is not None else None, finished_at=datetime.utcnow())
+    db.execute(
+        update(Job).where(Job.id == job.id, Job.status == RUNNING, Job.locked_by == worker_id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def run_job(session_factory, job_id: int, worker_id: str) -> None:
+    with session_factory() as db:
+        job = db.get(Job, job_id)
+        handler = HANDLERS.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"Unknown job kind: {job.kind}")
+            with LeaseHeartbeat(session_factory, job.id, worker_id), session_factory() as work_db:
+                result = handler(work_db, json.loads(job.payload))
+        except PermanentJobError as exc:
+            finish_job(db, job, worker_id, FAILED, error=str(exc))
+        except Exception as exc:
+            logger.exception("El trabajo %s (%s) falló en el intento %s", job.id, job.kind, job.attempts)
+            if job.attempts < job.max_attempts:
+                delay = JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+                finish_job(db, job, worker_id, QUEUED, error=str(exc), retry_at=datetime.utcnow() + timedelta(seconds=delay))
+            else:
+                finish_job(db, job, worker_id, FAILED, error=str(exc))
+        else:
+            finish_job(db, job, worker_id, SUCCEEDED, result=result)
+
+
+def purge_jobs(db: Session, now: datetime, retention_seconds: float = JOB_RETENTION_SECONDS) -> int:
+    deleted = db.execute(
+        delete(Job).where(Job.status.in_(FINISHED), Job.finished_at < now - timedelta(seconds=retention_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return deleted.rowcount
+
+
+class JobRunner:
+    """Pool de hilos que procesa la tabla jobs"""
+
+    def __init__(self, session_factory=None, workers: int = JOB_WORKERS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.processed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def sessions(self):
+        if self.session_factory is None:
+            from database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory
+
+    def notify(self) -> None:
+        """Despierta a los hilos de este proceso (un trabajo recién encolado)"""
+        self._wake.set()
+
+    def run_pending(self, worker_id: Optional[str] = None) -> int:
+        """Procesa trabajos hasta vaciar la cola; devuelve cuántos corrió"""
+        worker_id = worker_id or f"{self._prefix}:{threading.get_ident()}"
+        count = 0
+        while not self._stop.is_set():
+            with self.sessions()() as db:
+                job = claim_job(db, worker_id, datetime.utcnow())
+                job_id = job.id if job is not None else None
+            if job_id is None:
+                break
+            run_job(self.sessions(), job_id, worker_id)
+            count += 1
+            self.processed += 1
+        return count
+
+    def maybe_purge(self) -> None:
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        with self.sessions()() as db:
+            purge_jobs(db, datetime.utcnow())
+
+    def _run(self, index: int) -> None:
+        worker_id = f"{self._prefix}:{index}"
+        while not self._stop.is_set():
+            try:
+                if self.run_pending(worker_id) == 0 and index == 0:
+                    self.maybe_purge()
+            except Exception:
+                logger.exception("Error en el worker de trabajos %s", worker_id)
+            self._wake.wait(JOB_POLL_SECONDS)
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(index,), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+job_runner = JobRunner()
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+
+@job_handler("bulk_import")
+def run_bulk_import(db: Session, payload: dict) -> dict:
+    from bulk_import import BulkImporter
+
+    importer = BulkImporter(db, payload["user_id"])
+    importer.import_rows(payload["rows"])
+    db.commit()
+    return importer.result().model_dump()
+
+
+@job_handler("rebuild_summaries")
+def run_rebuild_summaries(db: Session, payload: dict) -> dict:
+    from data_versions import bump_data_version
+    from summaries import rebuild_summaries
+
+    connection = db.connection()
+    count = rebuild_summaries(connection, user_id=payload.get("user_id"))
+    bump_data_version(connection, payload.get("user_id"))
+    db.commit()
+    return {"summaries": count}
+
+
+@job_handler("rebuild_records")
+def run_rebuild_records(db: Session, payload: dict) -> dict:
+    from data_versions import bump_data_version
+    from records import rebuild_records
+
+    connection = db.connection()
+    count = rebuild_records(connection, user_id=payload.get("user_id"))
+    bump_data_version(connection, payload.get("user_id"))
+    db.commit()
+    return {"records": count}
+
+
+@job_handler("refresh_leaderboards")
+def run_refresh_leaderboards(db: Session, payload: dict) -> dict:
+    from leaderboards import refresh_leaderboards
+
+    result = refresh_leaderboards(db.connection(), full=payload.get("full", False))
+    db.commit()
+    if result is None:
+        return {"skipped": True}
+    return {"users": result["users"], "rankings": result["rankings"], "refreshed_at": result["refreshed_at"].isoformat()}
+
+
+@job_handler("archive_workouts")
+def run_archive_workouts(db: Session, payload: dict) -> dict:
+    from archive import archive_cutoff, archive_workouts
+
+    # Cada usuario se confirma por separado: un reintento sigue con lo que falte
+    return archive_workouts(db, archive_cutoff(payload["horizon_days"]), user_id=payload.get("user_id"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trabajos en segundo plano")
+    parser.add_argument("command", choices=["work", "list"])
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    if args.command == "list":
+        with SessionLocal() as db:
+            for job in db.scalars(select(Job).order_by(Job.id.desc()).limit(args.limit)):
+                print(f"{job.id:>6}  {job.kind:<22}{job.status:<11}{job.attempts}/{job.max_attempts}  {job.error or ''}")
+        return
+
+    runner = JobRunner(SessionLocal, workers=args.workers)
+    runner.start()
+    print(f"Procesando trabajos con {args.workers} hilos (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()
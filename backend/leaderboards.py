@@ -0,0 +1,383 @@
+"""
+Rankings por ejercicio global (user_id NULL) precalculados.
+
+Ordenar a todos los usuarios recorriendo workout_entries en cada request no
+escala, así que los rankings se guardan en tablas que se actualizan en segundo
+plano cada LEADERBOARD_REFRESH_SECONDS:
+- leaderboard_entries: valor de cada usuario por (ejercicio, métrica); el
+  índice (exercise_id, metric, value, user_id) da el top N sin ordenar
+- leaderboard_sketches: LEADERBOARD_SKETCH_SIZE + 1 cuantiles por ranking, para
+  calcular el percentil de un usuario con dos lecturas por clave primaria
+- leaderboard_users: data_version de cada usuario ya incluida; solo se
+  recalculan los usuarios cuya versión cambió y los sketches de los rankings
+  que tocaron
+
+Métricas:
+- e1rm: mejor 1RM estimado (Epley), leído de personal_records
+- weekly_volume: volumen (peso × reps × series) de la semana actual (lunes UTC)
+
+Cada proceso revisa el estado cada LEADERBOARD_REFRESH_SECONDS /
+LEADERBOARD_POLL_DIVISOR segundos y solo uno actualiza (UPDATE condicional de
+leaderboard_state), así que los datos tienen como mucho
+LEADERBOARD_REFRESH_SECONDS + un intervalo de revisión + lo que dure la
+actualización de antigüedad.
+
+Uso (desde backend/):
+    python leaderboards.py refresh          # actualiza los usuarios con cambios
+    python leaderboards.py refresh --full   # recalcula todos los rankings
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    Exercise, LeaderboardEntry, LeaderboardSketch, LeaderboardState, LeaderboardUser,
+    PersonalRecord, ProgressSummary, User, WorkoutEntry
+)
+
+logger = logging.getLogger(__name__)
+
+# 0 desactiva la actualización en segundo plano (queda `python leaderboards.py refresh`)
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+LEADERBOARD_POLL_DIVISOR = 10
+# Resolución del percentil: 100 cuantiles = 1 punto de percentil
+LEADERBOARD_SKETCH_SIZE = int(os.getenv("LEADERBOARD_SKETCH_SIZE", "100"))
+LEADERBOARD_REFRESH_CHUNK = int(os.getenv("LEADERBOARD_REFRESH_CHUNK", "500"))
+LEADERBOARD_MAX_LIMIT = 100
+
+METRIC_UNITS = {
+    "e1rm": "kg",
+    "weekly_volume": "kg",
+}
+METRIC_PATTERN = f"^({'|'.join(METRIC_UNITS)})$"
+STATE_ID = 1
+
+entry_table = LeaderboardEntry.__table__
+sketch_table = LeaderboardSketch.__table__
+version_table = LeaderboardUser.__table__
+state_table = LeaderboardState.__table__
+
+
+def week_start_of(moment: datetime) -> datetime:
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def poll_seconds() -> float:
+    return max(1.0, LEADERBOARD_REFRESH_SECONDS / LEADERBOARD_POLL_DIVISOR)
+
+
+def max_staleness_seconds() -> Optional[float]:
+    """Antigüedad máxima esperada de los rankings (sin contar lo que dura la actualización)"""
+    if LEADERBOARD_REFRESH_SECONDS <= 0:
+        return None
+    return LEADERBOARD_REFRESH_SECONDS + poll_seconds()
+
+
+# ---------------------------------------------------------------------------
+# Cálculo por usuario
+# ---------------------------------------------------------------------------
+
+def user_values(connection: Connection, user_ids: List[int], week_start: datetime) -> List[dict]:
+    """Filas de leaderboard_entries de los usuarios, con índices por usuario"""
+    r = PersonalRecord
+    e1rm = connection.execute(
+        select(r.user_id, r.exercise_id, r.value)
+        .join(Exercise, Exercise.id == r.exercise_id)
+        .where(r.user_id.in_(user_ids), r.record_type == "e1rm_epley", r.weight == 0, Exercise.user_id.is_(None))
+    )
+    rows = [
+        {"exercise_id": row.exercise_id, "metric": "e1rm", "user_id": row.user_id, "value": row.value, "period_start": None}
+        for row in e1rm
+    ]
+
+    w = WorkoutEntry
+    volume = connection.execute(
+        select(w.user_id, w.exercise_id, func.sum(w.weight * w.repetitions * w.sets).label("value"))
+        .join(Exercise, Exercise.id == w.exercise_id)
+        .where(
+            w.user_id.in_(user_ids), w.date >= week_start, w.date < week_start + timedelta(days=7),
+            Exercise.user_id.is_(None)
+        )
+        .group_by(w.user_id, w.exercise_id)
+    )
+    rows.extend(
+        {"exercise_id": row.exercise_id, "metric": "weekly_volume", "user_id": row.user_id,
+         "value": float(row.value), "period_start": week_start}
+        for row in volume if row.value
+    )
+    return rows
+
+
+def replace_users(connection: Connection, versions: Dict[int, int], week_start: datetime) -> Set[Tuple[int, str]]:
+    """Reemplaza las filas de los usuarios y devuelve los rankings que cambiaron"""
+    user_ids = list(versions)
+    c = entry_table.c
+    touched = {
+        (row.exercise_id, row.metric)
+        for row in connection.execute(select(c.exercise_id, c.metric).where(c.user_id.in_(user_ids)))
+    }
+    rows = user_values(connection, user_ids, week_start)
+    touched.update((row["exercise_id"], row["metric"]) for row in rows)
+
+    connection.execute(delete(entry_table).where(c.user_id.in_(user_ids)))
+    if rows:
+        connection.execute(insert(entry_table), rows)
+    connection.execute(delete(version_table).where(version_table.c.user_id.in_(user_ids)))
+    connection.execute(insert(version_table), [
+        {"user_id": user_id, "data_version": version} for user_id, version in versions.items()
+    ])
+    return touched
+
+
+# ---------------------------------------------------------------------------
+# Sketches de percentiles
+# ---------------------------------------------------------------------------
+
+def sketch_quantiles(values: np.ndarray, size: int = LEADERBOARD_SKETCH_SIZE) -> List[float]:
+    return np.quantile(values, np.linspace(0, 1, size + 1)).tolist()
+
+
+def rebuild_sketch(connection: Connection, exercise_id: int, metric: str, now: datetime) -> None:
+    c = entry_table.c
+    values = np.fromiter(
+        connection.execute(select(c.value).where(c.exercise_id == exercise_id, c.metric == metric)).scalars(),
+        dtype=np.float64
+    )
+    key = (sketch_table.c.exercise_id == exercise_id, sketch_table.c.metric == metric)
+    connection.execute(delete(sketch_table).where(*key))
+    if len(values):
+        connection.execute(insert(sketch_table).values(
+            exercise_id=exercise_id, metric=metric, users=len(values),
+            quantiles=json.dumps(sketch_quantiles(values)), refreshed_at=now
+        ))
+
+
+def percentile(quantiles: List[float], value: float) -> float:
+    """Porcentaje de la cohorte con un valor menor o igual, interpolado entre cuantiles"""
+    position = bisect_right(quantiles, value)
+    if position == 0:
+        return 0.0
+    if position == len(quantiles):
+        return 100.0
+    low, high = quantiles[position - 1], quantiles[position]
+    return 100 * (position - 1 + (value - low) / (high - low)) / (len(quantiles) - 1)
+
+
+def estimated_rank(users: int, percent: float) -> int:
+    return min(users, max(1, 1 + round(users * (100 - percent) / 100)))
+
+
+# ---------------------------------------------------------------------------
+# Actualización
+# ---------------------------------------------------------------------------
+
+def claim_refresh(connection: Connection, now: datetime, min_age_seconds: float) -> Optional[datetime]:
+    """
+    Reserva la actualización si la anterior tiene al menos min_age_seconds;
+    devuelve la week_start anterior (o now si es la primera) o None si otro
+    proceso la hizo hace poco o la está haciendo.
+    """
+    s = state_table.c
+    state = connection.execute(select(s.refreshed_at, s.week_start).where(s.id == STATE_ID)).first()
+    if state is None:
+        connection.execute(insert(state_table).values(id=STATE_ID, refreshed_at=now, week_start=None))
+        return now
+    claimed = connection.execute(
+        update(state_table)
+        .where(s.id == STATE_ID, or_(s.refreshed_at.is_(None), s.refreshed_at <= now - timedelta(seconds=min_age_seconds)))
+        .values(refreshed_at=now)
+    )
+    if claimed.rowcount == 0:
+        return None
+    return state.week_start or now
+
+
+def dirty_versions(connection: Connection, full: bool = False) -> Dict[int, int]:
+    """data_version actual de los usuarios cuyos rankings están desactualizados"""
+    stmt = select(User.id, User.data_version)
+    if not full:
+        stmt = stmt.outerjoin(LeaderboardUser, LeaderboardUser.user_id == User.id).where(or_(
+            LeaderboardUser.data_version.is_(None), LeaderboardUser.data_version != User.data_version
+        ))
+    return {row.id: row.data_version for row in connection.execute(stmt)}
+
+
+def roll_week(connection: Connection, week_start: datetime) -> Tuple[Set[int], Set[Tuple[int, str]]]:
+    """Vacía weekly_volume de otras semanas; devuelve usuarios a recalcular y rankings tocados"""
+    c = entry_table.c
+    touched = {
+        (row.exercise_id, "weekly_volume")
+        for row in connection.execute(select(sketch_table.c.exercise_id).where(sketch_table.c.metric == "weekly_volume"))
+    }
+    connection.execute(delete(entry_table).where(c.metric == "weekly_volume", c.period_start != week_start))
+    # Entrenamientos con fecha de la nueva semana cargados antes del cambio
+    users = set(connection.execute(
+        select(ProgressSummary.user_id).where(ProgressSummary.last_date >= week_start).distinct()
+    ).scalars())
+    return users, touched
+
+
+def refresh_leaderboards(connection: Connection, now: Optional[datetime] = None, full: bool = False,
+                         min_age_seconds: float = 0) -> Optional[dict]:
+    """Actualiza los rankings en la transacción de connection; None si otro proceso la tiene reservada"""
+    now = now or datetime.utcnow()
+    previous_week = claim_refresh(connection, now, min_age_seconds)
+    if previous_week is None:
+        return None
+    week_start = week_start_of(now)
+
+    versions = dirty_versions(connection, full)
+    touched: Set[Tuple[int, str]] = set()
+    if full:
+        touched.update((row.exercise_id, row.metric) for row in connection.execute(
+            select(sketch_table.c.exercise_id, sketch_table.c.metric)
+        ))
+    if previous_week != week_start or full:
+        rolled_users, rolled = roll_week(connection, week_start)
+        touched |= rolled
+        if rolled_users - versions.keys():
+            versions.update(
+                (row.id, row.data_version) for row in connection.execute(
+                    select(User.id, User.data_version).where(User.id.in_(list(rolled_users - versions.keys())))
+                )
+            )
+
+    user_ids = list(versions)
+    for start in range(0, len(user_ids), LEADERBOARD_REFRESH_CHUNK):
+        chunk = user_ids[start:start + LEADERBOARD_REFRESH_CHUNK]
+        touched |= replace_users(connection, {user_id: versions[user_id] for user_id in chunk}, week_start)
+    for exercise_id, metric in sorted(touched):
+        rebuild_sketch(connection, exercise_id, metric, now)
+
+    connection.execute(update(state_table).where(state_table.c.id == STATE_ID).values(week_start=week_start))
+    return {"users": len(user_ids), "rankings": len(touched), "refreshed_at": now}
+
+
+class LeaderboardRefresher:
+    """Hilo que revisa periódicamente si toca actualizar los rankings"""
+
+    def __init__(self, engine, refresh_seconds: float = LEADERBOARD_REFRESH_SECONDS):
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.refreshes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[dict]:
+        try:
+            with self.engine.begin() as connection:
+                result = refresh_leaderboards(connection, min_age_seconds=self.refresh_seconds)
+        except IntegrityError:
+            # Otro proceso creó el estado a la vez; se reintenta en la próxima revisión
+            return None
+        if result is not None:
+            self.refreshes += 1
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("No se pudieron actualizar los rankings")
+            self._stop.wait(poll_seconds())
+
+    def start(self) -> None:
+        if self.refresh_seconds <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="leaderboard-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+def top_select(exercise_id: int, metric: str, limit: int):
+    """Top N recorriendo el índice del ranking hacia atrás (empates: user_id mayor primero)"""
+    c = LeaderboardEntry
+    return (
+        select(c.user_id, User.name, c.value)
+        .join(User, User.id == c.user_id)
+        .where(c.exercise_id == exercise_id, c.metric == metric)
+        .order_by(c.value.desc(), c.user_id.desc())
+        .limit(limit)
+    )
+
+
+def entry_select(exercise_id: int, metric: str, user_id: int):
+    c = LeaderboardEntry
+    return select(c.value).where(c.exercise_id == exercise_id, c.metric == metric, c.user_id == user_id)
+
+
+def sketch_select(exercise_id: int, metric: str):
+    s = LeaderboardSketch
+    return select(s.users, s.quantiles, s.refreshed_at).where(s.exercise_id == exercise_id, s.metric == metric)
+
+
+def state_select():
+    return select(LeaderboardState.refreshed_at).where(LeaderboardState.id == STATE_ID)
+
+
+def build_leaderboard(exercise_id: int, metric: str, top: Iterable, sketch, own_value: Optional[float],
+                      user_id: int, refreshed_at: Optional[datetime]) -> dict:
+    entries, rank, previous = [], 0, None
+    for position, row in enumerate(top, start=1):
+        if row.value != previous:
+            rank, previous = position, row.value
+        entries.append({"rank": rank, "user_id": row.user_id, "name": row.name, "value": row.value})
+
+    you = None
+    if own_value is not None and sketch is not None:
+        own_rank = next((entry["rank"] for entry in entries if entry["user_id"] == user_id), None)
+        percent = percentile(json.loads(sketch.quantiles), own_value)
+        you = {
+            "value": own_value,
+            "percentile": round(percent, 1),
+            "rank": own_rank or estimated_rank(sketch.users, percent),
+            "rank_is_estimate": own_rank is None,
+        }
+    return {
+        "exercise_id": exercise_id,
+        "metric": metric,
+        "unit": METRIC_UNITS[metric],
+        "users": sketch.users if sketch is not None else 0,
+        "refreshed_at": refreshed_at,
+        "max_staleness_seconds": max_staleness_seconds(),
+        "entries": entries,
+        "you": you,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de los rankings")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument("--full", action="store_true", help="Recalcular todos los usuarios")
+    args = parser.parse_args()
+
+    from database import engine
+
+    with engine.begin() as connection:
+        result = refresh_leaderboards(connection, full=args.full)
+    print(f"✅ {result['users']} usuarios y {result['rankings']} rankings actualizados")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,61 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, status, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from itertools import islice
 from typing import List, Optional
-import jwt
-from passlib.context import CryptContext
+import heapq
 import os
 from dotenv import load_dotenv
-import time
-from collections import defaultdict
+import math
 
-from database import get_db, engine
-from models import Base, User, Exercise, WorkoutEntry
-
-# FORZAR la base de datos correcta
-import os
-BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
-CORRECTED_DATABASE_URL = f"sqlite:///{os.path.join(BACKEND_DIR, 'gym_tracker.db')}"
-print(f"FORCED DATABASE_URL: {CORRECTED_DATABASE_URL}")
-
-# Recrear engine con la URL correcta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-engine = create_engine(
-    CORRECTED_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+from analytics import compute_trends, compute_volume, compute_workload, load_history
+from archive import (
+    ARCHIVE_HORIZON_DAYS, ARCHIVE_RAW, ArchiveConflict, archived_page, archived_sessions_select, iter_archived,
+    merge_workouts, recover_files, workout_order
+)
+from auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, Principal, access_token_claims, create_access_token,
+    decode_access_token, get_current_user, require_admin, user_not_found
+)
+from bulk_import import BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ROWS, BulkImporter, request_rows
+from cache import cache_stats
+from compression import COMPRESSION_ENABLED, CompressionMiddleware, compression_stats
+from catalog import catalog
+from data_versions import get_data_version
+from database import DB_MODE, SessionLocal, get_db, engine
+from events import EVENTS_ENABLED, VersionWatcher, broker, stream_data_version
+from export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_filename, export_stream
+from fast_json import FAST_JSON, WORKOUT_COLUMNS, progress_stats_json, workouts_json
+from http_cache import cached_response, json_body, store_response
+from jobs import JOB_STATUS_PATTERN, accepted_response, enqueue, job_response, job_runner, user_jobs_select
+from leaderboards import (
+    LEADERBOARD_MAX_LIMIT, METRIC_PATTERN, LeaderboardRefresher, build_leaderboard, entry_select,
+    sketch_select, state_select, top_select
+)
+from metrics import (
+    METRICS_ENABLED, PROFILE_HEADER_ENABLED, PROFILE_SAMPLE_RATE, MetricsMiddleware, instrument_sync_calls,
+    render_metrics
+)
+from models import Base, Job, User, Exercise, WorkoutEntry
+from overview import compute_overview
+from passwords import password_hasher
+from progress import compute_progress_stats
+from rate_limit import RATE_LIMIT_ENABLED, create_rate_limiter
+from records import RECORD_TYPE_PATTERN, record_rows, records_select
+from queries import (
+    WORKOUTS_STREAM_CHUNK_SIZE, custom_exercises_select, encode_workouts_cursor, own_exercise_select,
+    workouts_select
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 from schemas import (
     UserCreate, UserLogin, UserResponse, Token,
     ExerciseCreate, ExerciseUpdate, ExerciseResponse,
     WorkoutEntryCreate, WorkoutEntryUpdate, WorkoutEntryResponse,
-    ProgressStats
+    ProgressStats, ProgressOverview, BulkImportResult, JobResponse, PersonalRecordResponse,
+    VolumeAnalytics, TrendAnalytics, WorkloadAnalytics, Leaderboard
 )
 
 load_dotenv()
@@ -49,31 +65,45 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Gym Tracker API", version="1.0.0")
 
-# Rate limiting simple
-request_counts = defaultdict(list)
+# Rate limiting (token bucket por IP, usuario y ruta; ver rate_limit.py)
+rate_limiter = create_rate_limiter()
+
+def request_user_id(request: Request) -> Optional[int]:
+    """Id del usuario si el request trae un token válido"""
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        user_id, _ = decode_access_token(authorization[len("Bearer "):])
+    except HTTPException:
+        return None
+    return user_id
 
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    # Limpiar requests antiguos (últimos 60 segundos)
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if current_time - req_time < 60
-    ]
-    
-    # Verificar límite (100 requests por minuto por IP)
-    if len(request_counts[client_ip]) >= 100:
-        raise HTTPException(
+    client_ip = request.client.host if request.client else "unknown"
+    args = (request.method, request.url.path, client_ip, request_user_id(request))
+    if rate_limiter.backend.blocking:
+        # El backend SQLite puede esperar el lock del archivo: fuera del event loop
+        allowed, retry_after = await run_in_threadpool(rate_limiter.check, *args)
+    else:
+        allowed, retry_after = rate_limiter.check(*args)
+    if not allowed:
+        # Las excepciones lanzadas en un middleware no pasan por los handlers de FastAPI
+        return JSONResponse(
             status_code=429,
-            detail="Too many requests. Please try again later."
+            content={"detail": "Too many requests. Please try again later."},
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
-    
-    request_counts[client_ip].append(current_time)
+
     response = await call_next(request)
     return response
 
-app.middleware("http")(rate_limit_middleware)
+if RATE_LIMIT_ENABLED:
+    app.middleware("http")(rate_limit_middleware)
+
+# Compresión gzip/brotli de las respuestas (las de http_cache.py ya llegan comprimidas)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 # CORS middleware - CONFIGURACIÓN FLEXIBLE PARA DESARROLLO
 def get_allowed_origins():
@@ -101,113 +131,305 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# JWT settings - MEJORADOS
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Validar que SECRET_KEY esté configurada en producción
-if SECRET_KEY == "your-secret-key-here-change-in-production":
-    import warnings
-    warnings.warn("⚠️  SECURITY WARNING: Using default SECRET_KEY. Change this in production!")
-
-# Security
-security = HTTPBearer()
+# Métricas por ruta (/metrics); el más externo, para medir también los demás middlewares
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def find_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials"
-            )
-    except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
-        )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
+def save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
     return user
 
+# register y login son async: el hash de bcrypt corre en el pool de passwords.py
+# y las consultas en el threadpool, así ningún hilo queda esperando a bcrypt
 @app.post("/api/auth/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Check if user exists
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await run_in_threadpool(find_user_by_email, db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         email=user_data.email,
         hashed_password=hashed_password,
         name=user_data.name
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = await run_in_threadpool(save_user, db, user)
     
     return UserResponse(id=user.id, email=user.email, name=user.name)
 
 @app.post("/api/auth/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user_by_email, db, user_data.email)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(user_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+
+    # BCRYPT_ROUNDS cambió: se guarda el hash con el costo nuevo
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data=access_token_claims(user), expires_delta=access_token_expires
     )
     return Token(access_token=access_token, token_type="bearer")
 
 @app.get("/api/auth/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     return UserResponse(id=current_user.id, email=current_user.email, name=current_user.name)
 
-@app.get("/api/exercises", response_model=List[ExerciseResponse])
-def get_exercises(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    exercises = db.query(Exercise).filter(
-        (Exercise.user_id == current_user.id) | (Exercise.user_id.is_(None))
-    ).all()
-    return exercises
+@app.get("/api/cache/stats")
+def get_cache_stats(current_user: Principal = Depends(get_current_user)):
+    """Contadores de aciertos/fallos de las cachés en memoria de este proceso y de la compresión"""
+    return {**cache_stats(), "compression": compression_stats.stats(), "events": broker.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Latencia, consultas y tiempo en SQL por ruta, en formato de texto de Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def load_exercise_catalog():
+    catalog.load()
+
+# Rankings precalculados (ver leaderboards.py); usa el engine sync también con DB_MODE=async
+leaderboard_refresher = LeaderboardRefresher(engine)
+
+@app.on_event("startup")
+def start_leaderboard_refresher():
+    leaderboard_refresher.start()
+
+@app.on_event("shutdown")
+def stop_leaderboard_refresher():
+    leaderboard_refresher.stop()
+
+# Archivados interrumpidos con ARCHIVE_RAW=file, antes de que los workers vuelvan a archivar
+@app.on_event("startup")
+def recover_archive_files():
+    if ARCHIVE_RAW == "file":
+        with SessionLocal() as db:
+            recover_files(db)
+
+# Trabajos en segundo plano (ver jobs.py)
+@app.on_event("startup")
+def start_job_runner():
+    job_runner.start()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    job_runner.stop()
+
+# Eventos en vivo (ver events.py)
+version_watcher = VersionWatcher(engine)
+
+@app.on_event("startup")
+def start_version_watcher():
+    version_watcher.start()
+
+@app.on_event("shutdown")
+def stop_event_streams():
+    version_watcher.stop()
+    broker.close_all()
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+@app.post("/api/admin/catalog/refresh", dependencies=[Depends(require_admin)])
+def refresh_exercise_catalog():
+    """Recarga el catálogo de ejercicios predefinidos en este proceso (p. ej. tras seed_data.py)"""
+    catalog.load()
+    return catalog.stats()
+
+@app.post("/api/admin/leaderboards/refresh", status_code=202, response_model=JobResponse, dependencies=[Depends(require_admin)])
+def refresh_leaderboards_now(full: bool = Query(False), db: Session = Depends(get_db)):
+    """Encola una actualización de los rankings sin esperar al próximo ciclo (p. ej. tras una importación grande)"""
+    job, _ = enqueue(db, "refresh_leaderboards", {"full": full}, key="refresh_leaderboards")
+    return accepted_response(job)
+
+@app.post("/api/admin/rebuild/{target}", status_code=202, response_model=JobResponse, dependencies=[Depends(require_admin)])
+def rebuild_derived(
+    target: str,
+    user_id: Optional[int] = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """Encola el recálculo de progress_summaries o personal_records (de todos o de un usuario)"""
+    if target not in ("summaries", "records"):
+        raise HTTPException(status_code=404, detail="Unknown rebuild target")
+    job, _ = enqueue(db, f"rebuild_{target}", {"user_id": user_id}, key=f"rebuild_{target}:{user_id or 'all'}")
+    return accepted_response(job)
+
+@app.post("/api/admin/archive", status_code=202, response_model=JobResponse, dependencies=[Depends(require_admin)])
+def archive_old_workouts(
+    user_id: Optional[int] = Query(None, gt=0),
+    horizon_days: int = Query(ARCHIVE_HORIZON_DAYS, ge=31),
+    db: Session = Depends(get_db)
+):
+    """Encola el archivado de los entrenamientos anteriores al horizonte (ver archive.py)"""
+    payload = {"user_id": user_id, "horizon_days": horizon_days}
+    job, _ = enqueue(db, "archive_workouts", payload, key=f"archive:{user_id or 'all'}")
+    return accepted_response(job)
+
+@app.get("/api/admin/jobs/{job_id}", response_model=JobResponse, dependencies=[Depends(require_admin)])
+def get_admin_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@app.get("/api/jobs", response_model=List[JobResponse])
+def list_jobs(
+    job_status: Optional[str] = Query(None, alias="status", pattern=JOB_STATUS_PATTERN),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Últimos trabajos en segundo plano del usuario"""
+    return [job_response(job) for job in db.scalars(user_jobs_select(current_user.id, job_status, limit))]
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@app.get("/api/events", response_class=StreamingResponse)
+async def stream_events(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+):
+    """Cambios en los entrenamientos y el progreso del usuario (Server-Sent Events)
+
+    EventSource no permite enviar headers, así que el token también se acepta en ?token=.
+    """
+    if not EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Live events are disabled")
+    if authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id, _ = decode_access_token(token)
+
+    # Primero la suscripción y después la versión: un cambio en el medio no se pierde
+    subscription = broker.subscribe(user_id)
+    try:
+        data_version = await run_in_threadpool(stream_data_version, SessionLocal, user_id)
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+    if data_version is None:
+        broker.unsubscribe(subscription)
+        raise user_not_found()
+    broker.note_version(user_id, data_version)
+    return StreamingResponse(
+        broker.stream(subscription, data_version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Si el cliente se desconecta antes del primer evento el generador nunca corre
+        background=BackgroundTask(broker.unsubscribe, subscription)
+    )
+
+@app.post("/api/workouts/bulk", response_model=BulkImportResult, responses={202: {"model": JobResponse}})
+async def bulk_import_workouts(
+    request: Request,
+    background: bool = Query(False),
+    idempotency_key: Optional[str] = Header(None, max_length=100),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Importa entrenamientos desde un array JSON, CSV (cuerpo o archivo 'file') o NDJSON.
+
+    Todas las filas válidas se insertan en una única transacción; las inválidas
+    se devuelven con su número de fila. Con background=true responde 202 y la
+    importación corre como trabajo (el resultado queda en GET /api/jobs/{id});
+    un Idempotency-Key repetido mientras el trabajo sigue activo devuelve el mismo.
+    """
+    if background:
+        rows = []
+        async for row_number, data in request_rows(request):
+            if row_number > BULK_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Too many rows. The limit is {BULK_IMPORT_MAX_ROWS} per request"
+                )
+            rows.append((row_number, data))
+        key = f"bulk_import:{current_user.id}:{idempotency_key}" if idempotency_key else None
+        job, _ = await run_in_threadpool(
+            enqueue, db, "bulk_import", {"user_id": current_user.id, "rows": rows}, current_user.id, key
+        )
+        return accepted_response(job)
+
+    importer = BulkImporter(db, current_user.id)
+    chunk = []
+    async for row_number, data in request_rows(request):
+        if row_number > BULK_IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many rows. The limit is {BULK_IMPORT_MAX_ROWS} per request"
+            )
+        values = importer.validate(row_number, data)
+        if values is not None:
+            chunk.append((row_number, values))
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            await run_in_threadpool(importer.insert_chunk, chunk)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(importer.insert_chunk, chunk)
+
+    await run_in_threadpool(importer.finish)
+    await run_in_threadpool(db.commit)
+    return importer.result()
+
+@app.get("/api/workouts/export")
+def export_workouts(
+    format: str = Query("csv", pattern="^(csv|ndjson|columnar)$"),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Historial completo unido con los ejercicios, leído del cursor por bloques"""
+    return StreamingResponse(
+        export_stream(db, current_user.id, format, gzip=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format, gzip)}"'}
+    )
 
-@app.post("/api/exercises", response_model=ExerciseResponse)
-def create_exercise(exercise_data: ExerciseCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+# Endpoints de datos en modo sync; con DB_MODE=async se usan los de async_api.py
+sync_router = APIRouter()
+
+@sync_router.get("/api/exercises", response_model=List[ExerciseResponse])
+def get_exercises(request: Request, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    # ETag / caché de respuestas según la versión de los datos del usuario (ver http_cache.py)
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    # Predefinidos desde el catálogo en memoria + personalizados del usuario
+    exercises = [*catalog.exercises, *db.scalars(custom_exercises_select(current_user.id))]
+    return store_response(request, current_user.id, version, json_body(List[ExerciseResponse], exercises))
+
+@sync_router.post("/api/exercises", response_model=ExerciseResponse)
+def create_exercise(exercise_data: ExerciseCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     exercise = Exercise(
         name=exercise_data.name,
         description=exercise_data.description,
@@ -219,18 +441,70 @@ def create_exercise(exercise_data: ExerciseCreate, current_user: User = Depends(
     db.refresh(exercise)
     return exercise
 
-@app.get("/api/workouts", response_model=List[WorkoutEntryResponse])
-def get_workouts(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    workouts = db.query(WorkoutEntry).filter(WorkoutEntry.user_id == current_user.id).all()
-    return workouts
-
-@app.post("/api/workouts", response_model=WorkoutEntryResponse)
-def create_workout(workout_data: WorkoutEntryCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Verificar que el ejercicio existe y el usuario tiene acceso
-    exercise = db.query(Exercise).filter(
-        Exercise.id == workout_data.exercise_id,
-        (Exercise.user_id == current_user.id) | (Exercise.user_id.is_(None))
-    ).first()
+def stream_workouts_ndjson(db: Session, stmt, archived, limit: Optional[int] = None):
+    # yield_per usa un cursor del lado del servidor (stream_results) en PostgreSQL
+    # y lee por lotes en SQLite, así la memoria no crece con el historial
+    result = db.scalars(stmt.execution_options(yield_per=WORKOUTS_STREAM_CHUNK_SIZE))
+    # Los archivados se intercalan por (date, id) sin materializar ninguna de las dos fuentes
+    merged = heapq.merge(result, archived, key=workout_order, reverse=True)
+    for workout in islice(merged, limit):
+        yield WorkoutEntryResponse.model_validate(workout).model_dump_json() + "\n"
+
+@sync_router.get("/api/workouts", response_model=List[WorkoutEntryResponse])
+def get_workouts(
+    request: Request,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = Query(None, gt=0),
+    muscle_group: Optional[str] = Query(None, max_length=50),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    filters = dict(
+        date_from=date_from, date_to=date_to,
+        exercise_id=exercise_id, muscle_group=muscle_group,
+        cursor=cursor
+    )
+    stmt = workouts_select(current_user.id, **filters, columns=WORKOUT_COLUMNS if FAST_JSON and format == "json" else None)
+
+    if format == "ndjson":
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        archived = iter_archived(db, current_user.id, limit=limit, **filters)
+        return StreamingResponse(stream_workouts_ndjson(db, stmt, archived, limit), media_type="application/x-ndjson")
+
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    # Sin limit se mantiene la respuesta completa para clientes existentes
+    # Con FAST_JSON las filas son tuplas de WORKOUT_COLUMNS en lugar de objetos ORM
+    # Los entrenamientos archivados (archive.py) se intercalan por (date, id)
+    fetch = db.execute if FAST_JSON else db.scalars
+    headers = {}
+    if limit is None:
+        workouts = merge_workouts(fetch(stmt).all(), archived_page(db, current_user.id, **filters))
+    else:
+        workouts = merge_workouts(
+            fetch(stmt.limit(limit + 1)).all(), archived_page(db, current_user.id, limit + 1, **filters), limit + 1
+        )
+        if len(workouts) > limit:
+            workouts = workouts[:limit]
+            headers["X-Next-Cursor"] = encode_workouts_cursor(workouts[-1])
+    body = workouts_json(workouts) if FAST_JSON else json_body(List[WorkoutEntryResponse], workouts)
+    return store_response(request, current_user.id, version, body, headers)
+
+@sync_router.post("/api/workouts", response_model=WorkoutEntryResponse)
+def create_workout(workout_data: WorkoutEntryCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Verificar que el ejercicio existe y el usuario tiene acceso (los predefinidos, sin consultar la base)
+    exercise = (
+        catalog.get(workout_data.exercise_id)
+        or db.scalar(own_exercise_select(current_user.id, workout_data.exercise_id))
+    )
     
     if not exercise:
         raise HTTPException(
@@ -262,116 +536,127 @@ def create_workout(workout_data: WorkoutEntryCreate, current_user: User = Depend
     db.refresh(workout)
     return workout
 
-@app.get("/api/progress/{exercise_id}", response_model=ProgressStats)
-def get_exercise_progress(exercise_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+# Debe registrarse antes de /api/progress/{exercise_id}
+@sync_router.get("/api/progress/overview", response_model=ProgressOverview)
+def get_progress_overview(
+    weeks: int = Query(12, ge=1, le=104),
+    sparkline_points: int = Query(0, ge=0, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Estadísticas de todos los ejercicios, volumen semanal y sparklines opcionales"""
+    return compute_overview(db, current_user.id, weeks, sparkline_points)
+
+@sync_router.get("/api/progress/{exercise_id}", response_model=ProgressStats)
+def get_exercise_progress(
+    request: Request,
+    exercise_id: int,
+    buckets: Optional[int] = Query(None, ge=2, le=2000),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     # Obtener el ejercicio para determinar su tipo
     exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
-    
-    workouts = db.query(WorkoutEntry).filter(
-        WorkoutEntry.user_id == current_user.id,
-        WorkoutEntry.exercise_id == exercise_id
-    ).all()
-    
-    if not workouts:
-        return ProgressStats(
-            max_primary=0,
-            avg_primary=0,
-            last_primary=0,
-            total_sessions=0,
-            primary_metric_name="Peso",
-            primary_metric_unit="kg",
-            progress_data=[]
-        )
-    
-    # Determinar la métrica principal según el grupo muscular
-    def get_primary_metric_config(muscle_group: str):
-        if muscle_group == 'Cardio':
-            return {
-                'field': 'time_minutes',
-                'name': 'Tiempo',
-                'unit': 'min',
-                'fallback_field': 'distance_km',
-                'fallback_name': 'Distancia',
-                'fallback_unit': 'km'
-            }
-        elif muscle_group == 'Abdomen':
-            return {
-                'field': 'repetitions',
-                'name': 'Repeticiones',
-                'unit': 'reps',
-                'fallback_field': 'time_minutes',
-                'fallback_name': 'Tiempo',
-                'fallback_unit': 'min'
-            }
-        else:
-            return {
-                'field': 'weight',
-                'name': 'Peso',
-                'unit': 'kg',
-                'fallback_field': 'repetitions',
-                'fallback_name': 'Repeticiones',
-                'fallback_unit': 'reps'
-            }
-    
-    config = get_primary_metric_config(exercise.muscle_group)
-    
-    # Extraer valores de la métrica principal
-    primary_values = []
-    progress_data = []
-    
-    for w in sorted(workouts, key=lambda x: x.date):
-        # Obtener valor principal
-        primary_value = getattr(w, config['field'], None)
-        if primary_value is None and 'fallback_field' in config:
-            primary_value = getattr(w, config['fallback_field'], None)
-        
-        if primary_value is not None:
-            primary_values.append(primary_value)
-            
-            # Determinar etiqueta basada en qué campo se usó
-            used_field = config['field'] if getattr(w, config['field'], None) is not None else config.get('fallback_field', config['field'])
-            label = config['name'] if used_field == config['field'] else config.get('fallback_name', config['name'])
-            
-            progress_data.append({
-                "date": w.date.isoformat(),
-                "weight": w.weight,
-                "reps": w.repetitions,
-                "sets": w.sets,
-                "time_minutes": w.time_minutes,
-                "distance_km": w.distance_km,
-                "primary_metric": primary_value,
-                "primary_label": label
-            })
-    
-    if not primary_values:
-        return ProgressStats(
-            max_primary=0,
-            avg_primary=0,
-            last_primary=0,
-            total_sessions=len(workouts),
-            primary_metric_name=config['name'],
-            primary_metric_unit=config['unit'],
-            progress_data=[]
-        )
-    
-    return ProgressStats(
-        max_primary=max(primary_values),
-        avg_primary=sum(primary_values) / len(primary_values),
-        last_primary=primary_values[-1] if primary_values else 0,
-        total_sessions=len(workouts),
-        primary_metric_name=config['name'],
-        primary_metric_unit=config['unit'],
-        progress_data=progress_data
-    )
+
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    # Métrica principal, estadísticas y (opcionalmente) downsampling se calculan en SQL
+    if FAST_JSON:
+        body = compute_progress_stats(db, current_user.id, exercise, buckets=buckets, build=progress_stats_json)
+    else:
+        body = json_body(ProgressStats, compute_progress_stats(db, current_user.id, exercise, buckets=buckets))
+    return store_response(request, current_user.id, version, body)
+
+@sync_router.get("/api/records", response_model=List[PersonalRecordResponse])
+def get_personal_records(
+    request: Request,
+    exercise_id: Optional[int] = Query(None, gt=0),
+    record_type: Optional[str] = Query(None, pattern=RECORD_TYPE_PATTERN),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Récords personales y 1RM estimado, leídos solo de personal_records"""
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    rows = db.execute(records_select(current_user.id, exercise_id, record_type)).all()
+    return store_response(request, current_user.id, version, json_body(List[PersonalRecordResponse], record_rows(rows)))
+
+@sync_router.get("/api/analytics/volume", response_model=VolumeAnalytics)
+def get_volume_analytics(
+    request: Request,
+    period: str = Query("week", pattern="^(week|month)$"),
+    window: int = Query(4, ge=1, le=52),
+    periods: int = Query(52, ge=1, le=520),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Volumen, series y sesiones por semana o mes, con media móvil del volumen"""
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    history = load_history(db, current_user.id, version)
+    return store_response(request, current_user.id, version, json_body(VolumeAnalytics, compute_volume(history, period, window, periods)))
+
+@sync_router.get("/api/analytics/trends", response_model=TrendAnalytics)
+def get_trend_analytics(
+    request: Request,
+    plateau_weeks: int = Query(6, ge=1, le=52),
+    exercise_id: Optional[int] = Query(None, gt=0),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tendencia lineal de la métrica principal y estancamientos por ejercicio"""
+    version = get_data_version(db, current_user.id)
+    cached = cached_response(request, current_user.id, version)
+    if cached is not None:
+        return cached
+
+    history = load_history(db, current_user.id, version)
+    return store_response(request, current_user.id, version, json_body(TrendAnalytics, compute_trends(history, plateau_weeks, exercise_id)))
+
+@sync_router.get("/api/analytics/workload", response_model=WorkloadAnalytics)
+def get_workload_analytics(
+    metric: str = Query("volume", pattern="^(volume|time)$"),
+    days: int = Query(90, ge=7, le=730),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Relación de carga aguda:crónica; depende del día actual, así que no usa la caché de respuestas"""
+    history = load_history(db, current_user.id, get_data_version(db, current_user.id))
+    return compute_workload(history, metric, days)
+
+@sync_router.get("/api/leaderboards/{exercise_id}", response_model=Leaderboard)
+def get_leaderboard(
+    exercise_id: int,
+    metric: str = Query("e1rm", pattern=METRIC_PATTERN),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_MAX_LIMIT),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Top N y percentil del usuario en un ejercicio global, desde los rankings precalculados"""
+    if catalog.get(exercise_id) is None:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    top = db.execute(top_select(exercise_id, metric, limit)).all()
+    sketch = db.execute(sketch_select(exercise_id, metric)).first()
+    own_value = db.scalar(entry_select(exercise_id, metric, current_user.id))
+    return build_leaderboard(exercise_id, metric, top, sketch, own_value, current_user.id, db.scalar(state_select()))
 
 # Update endpoints
-@app.put("/api/exercises/{exercise_id}", response_model=ExerciseResponse)
+@sync_router.put("/api/exercises/{exercise_id}", response_model=ExerciseResponse)
 def update_exercise(
     exercise_id: int, 
     exercise_data: ExerciseUpdate, 
-    current_user: User = Depends(get_current_user), 
+    current_user: Principal = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
     # Find the exercise
@@ -391,15 +676,20 @@ def update_exercise(
     for field, value in update_data.items():
         setattr(exercise, field, value)
     
-    db.commit()
+    try:
+        # Un cambio de grupo muscular recalcula los meses archivados (archive.py)
+        db.commit()
+    except ArchiveConflict as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(exc))
     db.refresh(exercise)
     return exercise
 
-@app.put("/api/workouts/{workout_id}", response_model=WorkoutEntryResponse)
+@sync_router.put("/api/workouts/{workout_id}", response_model=WorkoutEntryResponse)
 def update_workout(
     workout_id: int, 
     workout_data: WorkoutEntryUpdate, 
-    current_user: User = Depends(get_current_user), 
+    current_user: Principal = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
     # Find the workout
@@ -424,10 +714,10 @@ def update_workout(
     return workout
 
 # Delete endpoints
-@app.delete("/api/exercises/{exercise_id}")
+@sync_router.delete("/api/exercises/{exercise_id}")
 def delete_exercise(
     exercise_id: int, 
-    current_user: User = Depends(get_current_user), 
+    current_user: Principal = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
     # Find the exercise
@@ -442,8 +732,9 @@ def delete_exercise(
             detail="Exercise not found or you don't have permission to delete it"
         )
     
-    # Check if exercise is used in workouts
+    # Check if exercise is used in workouts (también los archivados)
     workout_count = db.query(WorkoutEntry).filter(WorkoutEntry.exercise_id == exercise_id).count()
+    workout_count += db.scalar(archived_sessions_select(current_user.id, exercise_id))
     if workout_count > 0:
         raise HTTPException(
             status_code=400, 
@@ -454,10 +745,10 @@ def delete_exercise(
     db.commit()
     return {"message": "Exercise deleted successfully"}
 
-@app.delete("/api/workouts/{workout_id}")
+@sync_router.delete("/api/workouts/{workout_id}")
 def delete_workout(
     workout_id: int, 
-    current_user: User = Depends(get_current_user), 
+    current_user: Principal = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
     # Find the workout
@@ -476,6 +767,16 @@ def delete_workout(
     db.commit()
     return {"message": "Workout deleted successfully"}
 
+if DB_MODE == "async":
+    from async_api import router as async_router
+    app.include_router(async_router)
+else:
+    app.include_router(sync_router)
+
+# El profiler necesita perfilar los endpoints sync dentro del threadpool
+if PROFILE_SAMPLE_RATE > 0 or PROFILE_HEADER_ENABLED:
+    instrument_sync_calls(app)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,302 @@
+"""
+Métricas por endpoint (formato de texto de Prometheus en /metrics) y profiler opcional por request.
+
+MetricsMiddleware mide cada request por ruta (la plantilla, p. ej.
+/api/progress/{exercise_id}, no la URL concreta): latencia, cantidad de
+consultas SQL y tiempo acumulado en SQL. Las consultas se cuentan con los
+eventos before/after_cursor_execute de SQLAlchemy, que corren en el mismo
+contexto que la request (también en el threadpool de los endpoints sync).
+
+La misma SELECT repetida N_PLUS_ONE_THRESHOLD veces en una request se reporta
+como posible N+1 (p. ej. una relación lazy cargada fila por fila).
+
+El profiler (cProfile) se activa con PROFILE_SAMPLE_RATE o, si
+PROFILE_HEADER_ENABLED=true, con el header `X-Profile: 1`; guarda un .prof por
+request en PROFILE_DIR (se lee con `python -m pstats archivo.prof`).
+"""
+import cProfile
+import inspect
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas, como los de Prometheus"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # etiquetas -> [conteo por bucket..., suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = format_labels(self.label_names, labels)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{base},le="{format_value(bound)}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+                lines.append(f"{self.name}_sum{{{base}}} {format_value(series[-2])}")
+                lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{format_labels(self.label_names, labels)}}} {format_value(value)}")
+        return lines
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Latencia de las requests por ruta", ("method", "route"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "Consultas SQL por request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+requests_total = CounterMetric("http_requests_total", "Requests por ruta y código de estado", ("method", "route", "status"))
+sql_seconds_total = CounterMetric("db_query_duration_seconds_total", "Tiempo acumulado en SQL por ruta", ("method", "route"))
+n_plus_one_total = CounterMetric(
+    "db_n_plus_one_total", "Requests con la misma SELECT repetida (posible N+1)", ("method", "route")
+)
+METRICS = (request_latency, request_queries, requests_total, sql_seconds_total, n_plus_one_total)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    profiler: Optional[cProfile.Profile] = None
+    # Perfiles de los hilos del threadpool (endpoints y dependencias sync)
+    thread_profiles: list = field(default_factory=list)
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None and context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_request.get()
+    started = getattr(context, "metrics_query_start", None)
+    if metrics is None or started is None:
+        return
+    metrics.queries += 1
+    metrics.sql_seconds += time.perf_counter() - started
+    metrics.statements[statement] += 1
+
+
+def repeated_selects(statements: Counter) -> list:
+    """SELECTs ejecutadas al menos N_PLUS_ONE_THRESHOLD veces en la request"""
+    return [
+        (statement, count) for statement, count in statements.most_common()
+        if count >= N_PLUS_ONE_THRESHOLD and statement.lstrip().upper().startswith("SELECT")
+    ]
+
+
+def should_profile(scope) -> bool:
+    if PROFILE_HEADER_ENABLED:
+        for key, value in scope["headers"]:
+            if key == b"x-profile" and value in (b"1", b"true"):
+                return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def dump_profile(metrics: RequestMetrics, method: str, route: str, elapsed: float) -> str:
+    stats = pstats.Stats(metrics.profiler)
+    for profile in metrics.thread_profiles:
+        stats.add(profile)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{method}_{name}.prof")
+    stats.dump_stats(path)
+    logger.info(
+        "Perfil %s %s: %.1f ms, %d consultas (%.1f ms en SQL) -> %s",
+        method, route, elapsed * 1000, metrics.queries, metrics.sql_seconds * 1000, path
+    )
+    return path
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: registra las métricas de cada request y, si corresponde, la perfila"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[dict] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        if should_profile(scope):
+            metrics.profiler = cProfile.Profile()
+        token = current_request.set(metrics)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        if metrics.profiler is not None:
+            metrics.profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if metrics.profiler is not None:
+                metrics.profiler.disable()
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            self.record(scope, metrics, status, elapsed)
+
+    def record(self, scope, metrics: RequestMetrics, status: int, elapsed: float) -> None:
+        method = scope["method"]
+        route = self.route_label(scope)
+        labels = (method, route)
+        request_latency.observe(labels, elapsed)
+        request_queries.observe(labels, metrics.queries)
+        requests_total.inc((method, route, str(status)))
+        sql_seconds_total.inc(labels, metrics.sql_seconds)
+
+        repeated = repeated_selects(metrics.statements)
+        if repeated:
+            n_plus_one_total.inc(labels)
+            statement, count = repeated[0]
+            logger.warning(
+                "Posible N+1 en %s %s: %d ejecuciones de %s", method, route, count, " ".join(statement.split())[:200]
+            )
+        if metrics.profiler is not None:
+            dump_profile(metrics, method, route, elapsed)
+
+    def route_label(self, scope) -> str:
+        # El router deja el endpoint en el scope; sin él (404) no se usa la URL
+        # para no crear una serie por cada ruta inexistente
+        endpoint = scope.get("endpoint")
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+
+def profiled_call(call):
+    """Envuelve una función sync que FastAPI corre en el threadpool para perfilarla en su hilo"""
+    @wraps(call)
+    def wrapper(*args, **kwargs):
+        metrics = current_request.get()
+        if metrics is None or metrics.profiler is None:
+            return call(*args, **kwargs)
+        # cProfile solo ve el hilo donde se activa: cada llamada tiene su propio perfil
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.disable()
+            metrics.thread_profiles.append(profile)
+    return wrapper
+
+
+def instrument_sync_calls(app) -> None:
+    """Aplica profiled_call a los endpoints y dependencias sync de las rutas ya registradas"""
+    wrapped = {}
+
+    def instrument(dependant):
+        call = dependant.call
+        if call is not None and runs_in_threadpool(call):
+            if call not in wrapped:
+                wrapped[call] = profiled_call(call)
+            dependant.call = wrapped[call]
+        for sub_dependant in dependant.dependencies:
+            instrument(sub_dependant)
+
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None:
+            instrument(dependant)
+
+
+def runs_in_threadpool(call) -> bool:
+    """Funciones sync comunes; las async corren en el loop y los generadores se dejan como están"""
+    if not inspect.isfunction(call):
+        return False
+    return not (inspect.iscoroutinefunction(call) or inspect.isgeneratorfunction(call) or inspect.isasyncgenfunction(call))
@@ -0,0 +1,82 @@
+"""initial schema
+
+Crea las tablas iniciales. En bases de datos creadas antes de usar Alembic
+(con create_all o migrate_db.py) solo agrega lo que falte, así que se puede
+aplicar sobre una base existente sin perder datos.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-10 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'users' not in tables:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('email', sa.String()),
+            sa.Column('hashed_password', sa.String()),
+            sa.Column('name', sa.String()),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    if 'exercises' not in tables:
+        op.create_table(
+            'exercises',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String()),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('muscle_group', sa.String()),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_exercises_id', 'exercises', ['id'])
+        op.create_index('ix_exercises_name', 'exercises', ['name'])
+
+    if 'workout_entries' not in tables:
+        op.create_table(
+            'workout_entries',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id')),
+            sa.Column('weight', sa.Float(), nullable=True),
+            sa.Column('repetitions', sa.Integer(), nullable=True),
+            sa.Column('sets', sa.Integer(), nullable=True),
+            sa.Column('time_minutes', sa.Float(), nullable=True),
+            sa.Column('distance_km', sa.Float(), nullable=True),
+            sa.Column('date', sa.DateTime()),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime()),
+        )
+        op.create_index('ix_workout_entries_id', 'workout_entries', ['id'])
+    else:
+        # Columnas de cardio/abdomen que antes agregaba migrate_db.py
+        columns = {column['name'] for column in inspector.get_columns('workout_entries')}
+        if 'time_minutes' not in columns:
+            op.add_column('workout_entries', sa.Column('time_minutes', sa.Float(), nullable=True))
+        if 'distance_km' not in columns:
+            op.add_column('workout_entries', sa.Column('distance_km', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_table('workout_entries')
+    op.drop_table('exercises')
+    op.drop_table('users')
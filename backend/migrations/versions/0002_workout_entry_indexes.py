@@ -0,0 +1,44 @@
+"""composite indexes for workout_entries and exercises
+
+Índices para los filtros más usados: (user_id, exercise_id, date) para el
+progreso por ejercicio, (user_id, date) para el historial paginado,
+exercise_id para el conteo de delete_exercise y (user_id, name) para el
+catálogo de ejercicios.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-10 00:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_workout_entries_user_exercise_date', 'workout_entries', ['user_id', 'exercise_id', 'date']),
+    ('ix_workout_entries_user_date', 'workout_entries', ['user_id', 'date']),
+    ('ix_workout_entries_exercise_id', 'workout_entries', ['exercise_id']),
+    ('ix_exercises_user_name', 'exercises', ['user_id', 'name']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # create_all ya pudo haber creado el índice desde models.py
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,78 @@
+"""progress_summaries table
+
+Resumen de la métrica principal por usuario y ejercicio (ver summaries.py).
+La tabla se rellena desde workout_entries al aplicar la migración con SQL
+propio (no importa summaries.py, así el resultado no cambia con el código
+posterior); también se puede recalcular con `python summaries.py rebuild`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-20 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Métrica principal (y alternativa) por grupo muscular, como en progress.py
+# al crear esta revisión; el último valor es el del entrenamiento más reciente
+BACKFILL = """
+WITH valued AS (
+    SELECT w.id, w.user_id, w.exercise_id, w.date,
+           CASE e.muscle_group
+               WHEN 'Cardio' THEN COALESCE(w.time_minutes, w.distance_km)
+               WHEN 'Abdomen' THEN COALESCE(w.repetitions, w.time_minutes)
+               ELSE COALESCE(w.weight, w.repetitions)
+           END AS value
+    FROM workout_entries w
+    JOIN exercises e ON e.id = w.exercise_id
+),
+latest AS (
+    SELECT user_id, exercise_id, value, date, id,
+           ROW_NUMBER() OVER (PARTITION BY user_id, exercise_id ORDER BY date DESC, id DESC) AS position
+    FROM valued
+    WHERE value IS NOT NULL
+)
+INSERT INTO progress_summaries (
+    user_id, exercise_id, total_sessions, primary_count, primary_sum, max_primary,
+    last_primary, last_date, last_workout_id
+)
+SELECT v.user_id, v.exercise_id, COUNT(*), COUNT(v.value), COALESCE(SUM(v.value), 0), MAX(v.value),
+       l.value, l.date, l.id
+FROM valued v
+LEFT JOIN latest l ON l.user_id = v.user_id AND l.exercise_id = v.exercise_id AND l.position = 1
+GROUP BY v.user_id, v.exercise_id, l.value, l.date, l.id
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # create_all ya pudo haber creado la tabla (vacía) desde models.py
+    if 'progress_summaries' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'progress_summaries',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('total_sessions', sa.Integer(), nullable=False),
+            sa.Column('primary_count', sa.Integer(), nullable=False),
+            sa.Column('primary_sum', sa.Float(), nullable=False),
+            sa.Column('max_primary', sa.Float(), nullable=True),
+            sa.Column('last_primary', sa.Float(), nullable=True),
+            sa.Column('last_date', sa.DateTime(), nullable=True),
+            sa.Column('last_workout_id', sa.Integer(), nullable=True),
+        )
+
+    op.execute('DELETE FROM progress_summaries')
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('progress_summaries')
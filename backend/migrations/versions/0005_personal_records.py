@@ -0,0 +1,86 @@
+"""personal_records table
+
+Récords personales y 1RM estimado por usuario y ejercicio (ver records.py).
+La tabla se rellena desde workout_entries al aplicar la migración con SQL
+propio (no importa records.py, así el resultado no cambia con el código
+posterior); también se puede recalcular con `python records.py rebuild`.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-03 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Candidatos de cada entrenamiento como en records.py al crear esta revisión
+# (1RM solo hasta 12 repeticiones); gana el mayor valor y, con empate, el
+# entrenamiento más antiguo
+BACKFILL = """
+WITH candidates AS (
+    SELECT user_id, exercise_id, 'max_weight' AS record_type, 0.0 AS weight, weight AS value,
+           id AS workout_id, date
+    FROM workout_entries WHERE weight > 0
+    UNION ALL
+    SELECT user_id, exercise_id, 'max_reps', CASE WHEN weight > 0 THEN weight ELSE 0.0 END,
+           CAST(repetitions AS FLOAT), id, date
+    FROM workout_entries WHERE repetitions > 0
+    UNION ALL
+    SELECT user_id, exercise_id, 'e1rm_epley', 0.0, weight * (1 + CAST(repetitions AS FLOAT) / 30), id, date
+    FROM workout_entries WHERE weight > 0 AND repetitions > 0 AND repetitions <= 12
+    UNION ALL
+    SELECT user_id, exercise_id, 'e1rm_brzycki', 0.0, weight * 36 / (37 - CAST(repetitions AS FLOAT)), id, date
+    FROM workout_entries WHERE weight > 0 AND repetitions > 0 AND repetitions <= 12
+    UNION ALL
+    SELECT user_id, exercise_id, 'max_distance', 0.0, distance_km, id, date
+    FROM workout_entries WHERE distance_km > 0
+    UNION ALL
+    SELECT user_id, exercise_id, 'max_time', 0.0, time_minutes, id, date
+    FROM workout_entries WHERE time_minutes > 0
+),
+ranked AS (
+    SELECT user_id, exercise_id, record_type, weight, value, workout_id, date,
+           ROW_NUMBER() OVER (
+               PARTITION BY user_id, exercise_id, record_type, weight
+               ORDER BY value DESC, date, workout_id
+           ) AS position
+    FROM candidates
+)
+INSERT INTO personal_records (user_id, exercise_id, record_type, weight, value, workout_id, date)
+SELECT user_id, exercise_id, record_type, weight, value, workout_id, date
+FROM ranked
+WHERE position = 1
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # create_all ya pudo haber creado la tabla (vacía) desde models.py
+    if 'personal_records' not in sa.inspect(bind).get_table_names():
+        # La clave primaria (user_id, exercise_id, record_type, weight) es el índice de lectura
+        op.create_table(
+            'personal_records',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('record_type', sa.String(length=20), primary_key=True),
+            sa.Column('weight', sa.Float(), primary_key=True),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('workout_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=False),
+        )
+
+    op.execute('DELETE FROM personal_records')
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('personal_records')
@@ -0,0 +1,70 @@
+"""leaderboard tables
+
+Rankings precalculados de los ejercicios globales (ver leaderboards.py). Las
+tablas se crean vacías; la primera actualización (al iniciar la app o con
+`python leaderboards.py refresh`) las rellena.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-10 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all ya pudo haber creado las tablas (vacías) desde models.py
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'leaderboard_entries' not in existing:
+        op.create_table(
+            'leaderboard_entries',
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('metric', sa.String(length=20), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('period_start', sa.DateTime(), nullable=True),
+        )
+        # Top N recorriendo el índice; el de user_id sirve para reemplazar las filas de un usuario
+        op.create_index('ix_leaderboard_entries_ranking', 'leaderboard_entries', ['exercise_id', 'metric', 'value', 'user_id'])
+        op.create_index('ix_leaderboard_entries_user', 'leaderboard_entries', ['user_id'])
+    if 'leaderboard_sketches' not in existing:
+        op.create_table(
+            'leaderboard_sketches',
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('metric', sa.String(length=20), primary_key=True),
+            sa.Column('users', sa.Integer(), nullable=False),
+            sa.Column('quantiles', sa.Text(), nullable=False),
+            sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        )
+    if 'leaderboard_users' not in existing:
+        op.create_table(
+            'leaderboard_users',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('data_version', sa.Integer(), nullable=False),
+        )
+    if 'leaderboard_state' not in existing:
+        op.create_table(
+            'leaderboard_state',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+            sa.Column('week_start', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('leaderboard_state')
+    op.drop_table('leaderboard_users')
+    op.drop_table('leaderboard_sketches')
+    op.drop_index('ix_leaderboard_entries_user', table_name='leaderboard_entries')
+    op.drop_index('ix_leaderboard_entries_ranking', table_name='leaderboard_entries')
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,60 @@
+"""jobs table
+
+Cola de trabajos en segundo plano (ver jobs.py).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-02-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade() -> None:
+    # create_all ya pudo haber creado la tabla (vacía) desde models.py
+    if 'jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('key', sa.String(length=200), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    # Próximo trabajo a reservar, purga de terminados y listado por usuario
+    op.create_index('ix_jobs_status_run_after', 'jobs', ['status', 'run_after'])
+    op.create_index('ix_jobs_status_finished_at', 'jobs', ['status', 'finished_at'])
+    op.create_index('ix_jobs_user_id', 'jobs', ['user_id', 'id'])
+    # Deduplicación: una sola clave entre los trabajos pendientes o en curso
+    op.create_index('ix_jobs_active_key', 'jobs', ['key'], unique=True, sqlite_where=ACTIVE, postgresql_where=ACTIVE)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_active_key', table_name='jobs')
+    op.drop_index('ix_jobs_user_id', table_name='jobs')
+    op.drop_index('ix_jobs_status_finished_at', table_name='jobs')
+    op.drop_index('ix_jobs_status_run_after', table_name='jobs')
+    op.drop_table('jobs')
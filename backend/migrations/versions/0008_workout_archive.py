@@ -0,0 +1,84 @@
+"""workout archive tables
+
+Archivo de entrenamientos antiguos (ver archive.py): resúmenes mensuales,
+récords de lo archivado y, con ARCHIVE_RAW=table, las filas originales. Las
+tablas empiezan vacías; se llenan con `python archive.py run`.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-02-24 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all ya pudo haber creado las tablas (vacías) desde models.py
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'workout_archive_months' not in existing:
+        # La clave primaria (user_id, exercise_id, month) es el índice de lectura
+        op.create_table(
+            'workout_archive_months',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('month', sa.DateTime(), primary_key=True),
+            sa.Column('sessions', sa.Integer(), nullable=False),
+            sa.Column('primary_count', sa.Integer(), nullable=False),
+            sa.Column('primary_field_count', sa.Integer(), nullable=False),
+            sa.Column('primary_sum', sa.Float(), nullable=False),
+            sa.Column('primary_min', sa.Float(), nullable=True),
+            sa.Column('primary_max', sa.Float(), nullable=True),
+            sa.Column('first_date', sa.DateTime(), nullable=True),
+            sa.Column('last_primary', sa.Float(), nullable=True),
+            sa.Column('last_date', sa.DateTime(), nullable=True),
+            sa.Column('last_workout_id', sa.Integer(), nullable=True),
+        )
+    if 'archived_records' not in existing:
+        op.create_table(
+            'archived_records',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+            sa.Column('record_type', sa.String(length=20), primary_key=True),
+            sa.Column('weight', sa.Float(), primary_key=True),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('workout_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=False),
+        )
+    if 'workout_entries_archive' not in existing:
+        op.create_table(
+            'workout_entries_archive',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), nullable=False),
+            sa.Column('weight', sa.Float(), nullable=True),
+            sa.Column('repetitions', sa.Integer(), nullable=True),
+            sa.Column('sets', sa.Integer(), nullable=True),
+            sa.Column('time_minutes', sa.Float(), nullable=True),
+            sa.Column('distance_km', sa.Float(), nullable=True),
+            sa.Column('date', sa.DateTime(), nullable=False),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+        # Mismos recorridos que workout_entries: listado por fecha y por ejercicio
+        op.create_index('ix_workout_entries_archive_user_date', 'workout_entries_archive', ['user_id', 'date'])
+        op.create_index(
+            'ix_workout_entries_archive_user_exercise_date', 'workout_entries_archive', ['user_id', 'exercise_id', 'date']
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_workout_entries_archive_user_exercise_date', table_name='workout_entries_archive')
+    op.drop_index('ix_workout_entries_archive_user_date', table_name='workout_entries_archive')
+    op.drop_table('workout_entries_archive')
+    op.drop_table('archived_records')
+    op.drop_table('workout_archive_months')
@@ -0,0 +1,74 @@
+"""workout_entries ids never reused on SQLite
+
+Sin AUTOINCREMENT, SQLite asigna max(id) + 1: después de archivar y borrar la
+fila más nueva, un entrenamiento nuevo recibiría el id de uno archivado. La
+tabla se reconstruye con AUTOINCREMENT y la secuencia arranca en el id más
+alto conocido (filas, archivo, resúmenes y récords). Con ARCHIVE_RAW=file las
+filas de los archivos mensuales no están en la base; sus ids son menores que
+el máximo de workout_entries al archivarlas, salvo que esa fila se haya
+borrado después. En PostgreSQL la secuencia nunca reutiliza ids y no cambia
+nada.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-03-03 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columnas con ids de entrenamientos, además de workout_entries.id
+WORKOUT_ID_COLUMNS = [
+    ('workout_entries_archive', 'id'),
+    ('workout_archive_months', 'last_workout_id'),
+    ('archived_records', 'workout_id'),
+    ('personal_records', 'workout_id'),
+    ('progress_summaries', 'last_workout_id'),
+]
+
+
+def has_autoincrement(bind) -> bool:
+    sql = bind.scalar(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'workout_entries'"))
+    return 'AUTOINCREMENT' in (sql or '').upper()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    # create_all ya pudo haber creado la tabla con AUTOINCREMENT desde models.py
+    if not has_autoincrement(bind):
+        with op.batch_alter_table('workout_entries', recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}):
+            pass
+    existing = set(sa.inspect(bind).get_table_names())
+    highest = [
+        f'SELECT max({column}) AS value FROM {table}'
+        for table, column in [('workout_entries', 'id'), *WORKOUT_ID_COLUMNS] if table in existing
+    ]
+    high_water = bind.scalar(sa.text(f"SELECT max(value) FROM ({' UNION ALL '.join(highest)})"))
+    if high_water is None:
+        return
+    # La copia de la tabla ya creó la fila de la secuencia si había datos
+    bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'workout_entries'"))
+    bind.execute(
+        sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('workout_entries', :seq)"), {'seq': high_water}
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite' or not has_autoincrement(bind):
+        return
+    with op.batch_alter_table('workout_entries', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}):
+        pass
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -13,6 +13,8 @@ class User(Base):
     hashed_password = Column(String)
     name = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Se incrementa con cada cambio en sus datos (ver data_versions.py)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     workout_entries = relationship("WorkoutEntry", back_populates="user")
@@ -32,6 +34,10 @@ class Exercise(Base):
     user = relationship("User", back_populates="custom_exercises")
     workout_entries = relationship("WorkoutEntry", back_populates="exercise")
 
+    __table_args__ = (
+        Index("ix_exercises_user_name", "user_id", "name"),
+    )
+
 class WorkoutEntry(Base):
     __tablename__ = "workout_entries"
     
@@ -50,3 +56,167 @@ class WorkoutEntry(Base):
     # Relationships
     user = relationship("User", back_populates="workout_entries")
     exercise = relationship("Exercise", back_populates="workout_entries")
+
+    # Los índices se crean con migraciones de Alembic (ver migrations/versions).
+    # AUTOINCREMENT: SQLite no reutiliza ids de filas borradas o archivadas (archive.py)
+    __table_args__ = (
+        Index("ix_workout_entries_user_exercise_date", "user_id", "exercise_id", "date"),
+        Index("ix_workout_entries_user_date", "user_id", "date"),
+        Index("ix_workout_entries_exercise_id", "exercise_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+class ProgressSummary(Base):
+    """Estadísticas de la métrica principal por usuario y ejercicio (ver summaries.py)"""
+    __tablename__ = "progress_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    total_sessions = Column(Integer, nullable=False, default=0)
+    primary_count = Column(Integer, nullable=False, default=0)  # Sesiones con métrica principal
+    primary_sum = Column(Float, nullable=False, default=0)
+    max_primary = Column(Float, nullable=True)
+    last_primary = Column(Float, nullable=True)
+    last_date = Column(DateTime, nullable=True)
+    last_workout_id = Column(Integer, nullable=True)
+
+    @property
+    def avg_primary(self):
+        return self.primary_sum / self.primary_count if self.primary_count else None
+
+class PersonalRecord(Base):
+    """Mejor marca por usuario, ejercicio y tipo de récord (ver records.py)"""
+    __tablename__ = "personal_records"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    record_type = Column(String(20), primary_key=True)
+    weight = Column(Float, primary_key=True, default=0)  # Peso de los récords max_reps; 0 en el resto
+    value = Column(Float, nullable=False)
+    workout_id = Column(Integer, nullable=False)  # Entrenamiento que estableció el récord
+    date = Column(DateTime, nullable=False)
+
+class LeaderboardEntry(Base):
+    """Valor de un usuario en el ranking de un ejercicio global (ver leaderboards.py)"""
+    __tablename__ = "leaderboard_entries"
+
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    metric = Column(String(20), primary_key=True)  # e1rm, weekly_volume
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    value = Column(Float, nullable=False)
+    period_start = Column(DateTime, nullable=True)  # Lunes de la semana de weekly_volume
+
+    __table_args__ = (
+        Index("ix_leaderboard_entries_ranking", "exercise_id", "metric", "value", "user_id"),
+        Index("ix_leaderboard_entries_user", "user_id"),
+    )
+
+class LeaderboardSketch(Base):
+    """Cuantiles de un ranking para calcular percentiles sin recorrerlo"""
+    __tablename__ = "leaderboard_sketches"
+
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    metric = Column(String(20), primary_key=True)
+    users = Column(Integer, nullable=False)
+    quantiles = Column(Text, nullable=False)  # JSON: LEADERBOARD_SKETCH_SIZE + 1 valores, de menor a mayor
+    refreshed_at = Column(DateTime, nullable=False)
+
+class LeaderboardUser(Base):
+    """data_version de cada usuario incluida en los rankings (los que difieren se recalculan)"""
+    __tablename__ = "leaderboard_users"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    data_version = Column(Integer, nullable=False)
+
+class LeaderboardState(Base):
+    """Una sola fila: última actualización de los rankings y semana de weekly_volume"""
+    __tablename__ = "leaderboard_state"
+
+    id = Column(Integer, primary_key=True)
+    refreshed_at = Column(DateTime, nullable=True)
+    week_start = Column(DateTime, nullable=True)
+
+class Job(Base):
+    """Trabajo en segundo plano (ver jobs.py)"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    # Deduplicación: solo puede haber un trabajo pendiente o en curso por clave
+    key = Column(String(200), nullable=True)
+    status = Column(String(20), nullable=False)  # queued, running, succeeded, failed
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # None para trabajos de administración
+    payload = Column(Text, nullable=False)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # queued: cuándo puede empezar; running: cuándo vence la reserva del worker
+    run_after = Column(DateTime, nullable=False)
+    locked_by = Column(String(100), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_status_finished_at", "status", "finished_at"),
+        Index("ix_jobs_user_id", "user_id", "id"),
+        Index(
+            "ix_jobs_active_key", "key", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+class WorkoutArchiveMonth(Base):
+    """Entrenamientos archivados de un usuario y ejercicio en un mes (ver archive.py)"""
+    __tablename__ = "workout_archive_months"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    month = Column(DateTime, primary_key=True)  # Primer día del mes
+    sessions = Column(Integer, nullable=False)
+    # Métrica principal (progress.py) de las sesiones que la tienen, fijada al archivar
+    primary_count = Column(Integer, nullable=False, default=0)
+    primary_field_count = Column(Integer, nullable=False, default=0)  # Con el campo principal, no la alternativa
+    primary_sum = Column(Float, nullable=False, default=0)
+    primary_min = Column(Float, nullable=True)
+    primary_max = Column(Float, nullable=True)
+    first_date = Column(DateTime, nullable=True)
+    last_primary = Column(Float, nullable=True)
+    last_date = Column(DateTime, nullable=True)
+    last_workout_id = Column(Integer, nullable=True)
+
+class ArchivedRecord(Base):
+    """Mejores marcas de los entrenamientos archivados; records.py las combina con las del historial"""
+    __tablename__ = "archived_records"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    record_type = Column(String(20), primary_key=True)
+    weight = Column(Float, primary_key=True, default=0)
+    value = Column(Float, nullable=False)
+    workout_id = Column(Integer, nullable=False)
+    date = Column(DateTime, nullable=False)
+
+class ArchivedWorkoutEntry(Base):
+    """Entrenamiento movido fuera de workout_entries con ARCHIVE_RAW=table; conserva su id"""
+    __tablename__ = "workout_entries_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
+    weight = Column(Float, nullable=True)
+    repetitions = Column(Integer, nullable=True)
+    sets = Column(Integer, nullable=True)
+    time_minutes = Column(Float, nullable=True)
+    distance_km = Column(Float, nullable=True)
+    date = Column(DateTime, nullable=False)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_workout_entries_archive_user_date", "user_id", "date"),
+        Index("ix_workout_entries_archive_user_exercise_date", "user_id", "exercise_id", "date"),
+    )
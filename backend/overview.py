@@ -0,0 +1,148 @@
+"""
+Resumen del dashboard: todos los ejercicios del usuario en una sola respuesta.
+
+Reemplaza las N llamadas a /api/progress/{exercise_id}:
+- estadísticas por ejercicio: una consulta a progress_summaries unida con exercises
+- volumen semanal (peso × reps × series) y sesiones: una consulta agrupada por
+  semana y grupo muscular sobre el período pedido
+- sparklines (opcional): los últimos N valores de cada ejercicio en una consulta
+  con ROW_NUMBER por ejercicio
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Exercise, ProgressSummary, WorkoutEntry
+from progress import get_primary_metric_config, primary_metric_expression
+from schemas import ExerciseOverview, MuscleGroupOverview, ProgressOverview, WeeklyVolume
+
+
+def first_week_start(weeks: int, now: datetime) -> datetime:
+    """Lunes 00:00 de la primera semana del período"""
+    monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return monday - timedelta(weeks=weeks - 1)
+
+
+def week_start_column(dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.date_trunc("week", WorkoutEntry.date)
+    # SQLite: avanzar al domingo y volver 6 días da el lunes de la semana
+    return func.date(WorkoutEntry.date, "weekday 0", "-6 days")
+
+
+def exercise_stats_select(user_id: int):
+    return (
+        select(ProgressSummary, Exercise.name, Exercise.muscle_group)
+        .join(Exercise, Exercise.id == ProgressSummary.exercise_id)
+        .where(ProgressSummary.user_id == user_id)
+        .order_by(Exercise.name, Exercise.id)
+    )
+
+
+def weekly_volume_select(user_id: int, since: datetime, dialect_name: str):
+    week_start = week_start_column(dialect_name).label("week_start")
+    return (
+        select(
+            week_start,
+            Exercise.muscle_group,
+            func.coalesce(func.sum(WorkoutEntry.weight * WorkoutEntry.repetitions * WorkoutEntry.sets), 0).label("volume"),
+            func.count().label("sessions")
+        )
+        .join(Exercise, Exercise.id == WorkoutEntry.exercise_id)
+        .where(WorkoutEntry.user_id == user_id, WorkoutEntry.date >= since)
+        .group_by(week_start, Exercise.muscle_group)
+    )
+
+
+def sparklines_select(user_id: int, points: int):
+    value = primary_metric_expression(Exercise.muscle_group)
+    ranked = (
+        select(
+            WorkoutEntry.exercise_id,
+            value.label("value"),
+            func.row_number().over(
+                partition_by=WorkoutEntry.exercise_id,
+                order_by=(WorkoutEntry.date.desc(), WorkoutEntry.id.desc())
+            ).label("position")
+        )
+        .join(Exercise, Exercise.id == WorkoutEntry.exercise_id)
+        .where(WorkoutEntry.user_id == user_id, value.isnot(None))
+        .subquery()
+    )
+    return (
+        select(ranked.c.exercise_id, ranked.c.value)
+        .where(ranked.c.position <= points)
+        .order_by(ranked.c.exercise_id, ranked.c.position.desc())
+    )
+
+
+def week_key(value) -> str:
+    # SQLite devuelve 'YYYY-MM-DD'; PostgreSQL, un timestamp
+    return value if isinstance(value, str) else value.date().isoformat()
+
+
+def build_overview(weeks: int, since: datetime, stats_rows, weekly_rows, sparkline_rows) -> ProgressOverview:
+    sparklines: Dict[int, List[float]] = defaultdict(list)
+    for row in sparkline_rows or ():
+        sparklines[row.exercise_id].append(row.value)
+
+    exercises = []
+    groups: Dict[str, dict] = defaultdict(lambda: {"exercises": 0, "total_sessions": 0, "volume": 0.0})
+    for summary, name, muscle_group in stats_rows:
+        config = get_primary_metric_config(muscle_group)
+        has_primary = summary.primary_count > 0
+        exercises.append(ExerciseOverview(
+            exercise_id=summary.exercise_id,
+            name=name,
+            muscle_group=muscle_group,
+            total_sessions=summary.total_sessions,
+            max_primary=summary.max_primary if has_primary else None,
+            avg_primary=summary.avg_primary if has_primary else None,
+            last_primary=summary.last_primary if has_primary else None,
+            last_date=summary.last_date,
+            primary_metric_name=config['name'],
+            primary_metric_unit=config['unit'],
+            sparkline=sparklines.get(summary.exercise_id, []) if sparkline_rows is not None else None
+        ))
+        groups[muscle_group]["exercises"] += 1
+        groups[muscle_group]["total_sessions"] += summary.total_sessions
+
+    weekly = {
+        (since + timedelta(weeks=index)).date().isoformat(): {"volume": 0.0, "sessions": 0}
+        for index in range(weeks)
+    }
+    for row in weekly_rows:
+        week = weekly.setdefault(week_key(row.week_start), {"volume": 0.0, "sessions": 0})
+        week["volume"] += row.volume
+        week["sessions"] += row.sessions
+        groups[row.muscle_group]["volume"] += row.volume
+
+    return ProgressOverview(
+        weeks=weeks,
+        exercises=exercises,
+        muscle_groups=[
+            MuscleGroupOverview(muscle_group=muscle_group, **values)
+            for muscle_group, values in sorted(groups.items())
+        ],
+        weekly=[WeeklyVolume(week_start=week, **values) for week, values in sorted(weekly.items())]
+    )
+
+
+def compute_overview(db: Session, user_id: int, weeks: int, sparkline_points: int = 0) -> ProgressOverview:
+    since = first_week_start(weeks, datetime.utcnow())
+    stats_rows = db.execute(exercise_stats_select(user_id)).all()
+    weekly_rows = db.execute(weekly_volume_select(user_id, since, db.get_bind().dialect.name)).all()
+    sparkline_rows = db.execute(sparklines_select(user_id, sparkline_points)).all() if sparkline_points else None
+    return build_overview(weeks, since, stats_rows, weekly_rows, sparkline_rows)
+
+
+async def compute_overview_async(db: AsyncSession, user_id: int, weeks: int, sparkline_points: int = 0) -> ProgressOverview:
+    since = first_week_start(weeks, datetime.utcnow())
+    stats_rows = (await db.execute(exercise_stats_select(user_id))).all()
+    weekly_rows = (await db.execute(weekly_volume_select(user_id, since, db.bind.dialect.name))).all()
+    sparkline_rows = (await db.execute(sparklines_select(user_id, sparkline_points))).all() if sparkline_points else None
+    return build_overview(weeks, since, stats_rows, weekly_rows, sparkline_rows)
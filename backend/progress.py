@@ -0,0 +1,283 @@
+"""
+Cálculo de progreso por ejercicio en SQL (métrica principal, estadísticas y downsampling)
+
+Las estadísticas (máximo, promedio, último, sesiones) se leen de
+progress_summaries, que summaries.py mantiene en cada escritura; solo la serie
+de puntos se consulta sobre workout_entries. Los meses archivados (archive.py)
+se agregan al principio de la serie como un punto por mes, con el formato de
+los tramos (mínimo, máximo y muestras).
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Exercise, ProgressSummary, WorkoutArchiveMonth, WorkoutEntry
+from schemas import ProgressDataPoint, ProgressStats
+
+
+# Grupos con métrica principal propia; el resto usa peso
+SPECIAL_MUSCLE_GROUPS = ('Cardio', 'Abdomen')
+
+
+def get_primary_metric_config(muscle_group: str):
+    """Determina la métrica principal (y su alternativa) según el grupo muscular"""
+    if muscle_group == 'Cardio':
+        return {
+            'field': 'time_minutes',
+            'name': 'Tiempo',
+            'unit': 'min',
+            'fallback_field': 'distance_km',
+            'fallback_name': 'Distancia',
+            'fallback_unit': 'km'
+        }
+    elif muscle_group == 'Abdomen':
+        return {
+            'field': 'repetitions',
+            'name': 'Repeticiones',
+            'unit': 'reps',
+            'fallback_field': 'time_minutes',
+            'fallback_name': 'Tiempo',
+            'fallback_unit': 'min'
+        }
+    else:
+        return {
+            'field': 'weight',
+            'name': 'Peso',
+            'unit': 'kg',
+            'fallback_field': 'repetitions',
+            'fallback_name': 'Repeticiones',
+            'fallback_unit': 'reps'
+        }
+
+
+def primary_metric_columns(config: dict):
+    """Expresiones SQL para el valor principal (COALESCE) y su etiqueta"""
+    field = getattr(WorkoutEntry, config['field'])
+    fallback = getattr(WorkoutEntry, config['fallback_field'])
+    primary = func.coalesce(field, fallback)
+    label = case((field.isnot(None), literal(config['name'])), else_=literal(config['fallback_name']))
+    return primary, label
+
+
+def primary_metric_expression(muscle_group):
+    """Valor principal según el grupo muscular de cada fila (consultas de varios ejercicios)"""
+    whens = []
+    for group in SPECIAL_MUSCLE_GROUPS:
+        primary, _ = primary_metric_columns(get_primary_metric_config(group))
+        whens.append((muscle_group == group, primary))
+    default, _ = primary_metric_columns(get_primary_metric_config(None))
+    return case(*whens, else_=default)
+
+
+def empty_progress(config: Optional[dict] = None, total_sessions: int = 0) -> ProgressStats:
+    config = config or get_primary_metric_config(None)
+    return ProgressStats(
+        max_primary=0,
+        avg_primary=0,
+        last_primary=0,
+        total_sessions=total_sessions,
+        primary_metric_name=config['name'],
+        primary_metric_unit=config['unit'],
+        progress_data=[]
+    )
+
+
+def progress_filter(user_id: int, exercise_id: int):
+    return (
+        WorkoutEntry.user_id == user_id,
+        WorkoutEntry.exercise_id == exercise_id
+    )
+
+
+def progress_points_select(user_id: int, exercise_id: int, config: dict):
+    primary, label = primary_metric_columns(config)
+    return select(
+        WorkoutEntry.date,
+        WorkoutEntry.weight,
+        WorkoutEntry.repetitions,
+        WorkoutEntry.sets,
+        WorkoutEntry.time_minutes,
+        WorkoutEntry.distance_km,
+        primary.label('primary_metric'),
+        label.label('primary_label')
+    ).where(*progress_filter(user_id, exercise_id), primary.isnot(None)).order_by(WorkoutEntry.date, WorkoutEntry.id)
+
+
+def bucketed_progress_select(user_id: int, exercise_id: int, config: dict, buckets: int):
+    """Reduce la serie a `buckets` puntos con mínimo, máximo y promedio por tramo"""
+    primary, _ = primary_metric_columns(config)
+    field = getattr(WorkoutEntry, config['field'])
+    ranked = select(
+        WorkoutEntry.date.label('date'),
+        primary.label('primary_metric'),
+        field.label('field_value'),
+        func.ntile(buckets).over(order_by=(WorkoutEntry.date, WorkoutEntry.id)).label('bucket')
+    ).where(*progress_filter(user_id, exercise_id), primary.isnot(None)).subquery()
+
+    return select(
+        func.min(ranked.c.date).label('date'),
+        func.min(ranked.c.primary_metric).label('primary_min'),
+        func.max(ranked.c.primary_metric).label('primary_max'),
+        func.avg(ranked.c.primary_metric).label('primary_avg'),
+        # El tramo usa la etiqueta principal salvo que todos sus puntos usen la alternativa
+        case(
+            (func.count(ranked.c.field_value) > 0, literal(config['name'])),
+            else_=literal(config['fallback_name'])
+        ).label('primary_label'),
+        func.count().label('samples')
+    ).group_by(ranked.c.bucket).order_by(ranked.c.bucket)
+
+
+def points_select(user_id: int, exercise_id: int, config: dict, count: int, buckets: Optional[int]):
+    """Elige la serie completa o la reducida según cuántos puntos hay"""
+    if buckets and count > buckets:
+        return bucketed_progress_select(user_id, exercise_id, config, buckets), True
+    return progress_points_select(user_id, exercise_id, config), False
+
+
+@dataclass
+class ArchivedPoint:
+    """Un mes archivado (o varios, si hubo que reducir la serie) con las columnas de un tramo"""
+    date: object
+    primary_sum: float
+    primary_min: float
+    primary_max: float
+    samples: int
+    primary_label: str
+
+    @property
+    def primary_avg(self) -> float:
+        return self.primary_sum / self.samples
+
+
+def archived_points_select(user_id: int, exercise_id: int):
+    m = WorkoutArchiveMonth
+    return select(
+        m.first_date, m.primary_count, m.primary_field_count, m.primary_sum, m.primary_min, m.primary_max
+    ).where(m.user_id == user_id, m.exercise_id == exercise_id, m.primary_count > 0).order_by(m.month)
+
+
+def archived_points(rows, config: dict) -> List[ArchivedPoint]:
+    return [
+        ArchivedPoint(
+            date=row.first_date,
+            primary_sum=row.primary_sum,
+            primary_min=row.primary_min,
+            primary_max=row.primary_max,
+            samples=row.primary_count,
+            primary_label=config['name'] if row.primary_field_count else config['fallback_name']
+        )
+        for row in rows
+    ]
+
+
+def merge_points(points: List[ArchivedPoint], count: int, config: dict) -> List[ArchivedPoint]:
+    """Junta meses consecutivos hasta dejar `count` puntos (como ntile)"""
+    if len(points) <= count:
+        return points
+    size, extra = divmod(len(points), count)
+    merged, start = [], 0
+    for index in range(count):
+        group = points[start:start + size + (1 if index < extra else 0)]
+        start += len(group)
+        merged.append(ArchivedPoint(
+            date=group[0].date,
+            primary_sum=sum(point.primary_sum for point in group),
+            primary_min=min(point.primary_min for point in group),
+            primary_max=max(point.primary_max for point in group),
+            samples=sum(point.samples for point in group),
+            primary_label=(
+                config['name'] if any(point.primary_label == config['name'] for point in group)
+                else config['fallback_name']
+            )
+        ))
+    return merged
+
+
+def point_date(row):
+    return row.date
+
+
+def split_buckets(archived: List[ArchivedPoint], hot_count: int, config: dict, buckets: Optional[int]):
+    """Reparte `buckets` entre los meses archivados y el historial reciente"""
+    if not buckets or len(archived) + hot_count <= buckets:
+        return archived, buckets
+    # Con historial reciente, lo archivado usa a lo sumo la mitad de los puntos
+    archived = merge_points(archived, max(1, buckets // 2) if hot_count > 0 else buckets, config)
+    return archived, max(1, buckets - len(archived))
+
+
+def progress_point(row, bucketed: bool) -> ProgressDataPoint:
+    if bucketed:
+        return ProgressDataPoint(
+            date=row.date.isoformat(),
+            primary_metric=row.primary_avg,
+            primary_label=row.primary_label,
+            primary_min=row.primary_min,
+            primary_max=row.primary_max,
+            samples=row.samples
+        )
+    return ProgressDataPoint(
+        date=row.date.isoformat(),
+        weight=row.weight,
+        reps=row.repetitions,
+        sets=row.sets,
+        time_minutes=row.time_minutes,
+        distance_km=row.distance_km,
+        primary_metric=row.primary_metric,
+        primary_label=row.primary_label
+    )
+
+
+def build_progress_stats(config: dict, stats, rows, bucketed: bool) -> ProgressStats:
+    if stats is None or not stats.total_sessions:
+        return empty_progress()
+    if not stats.primary_count:
+        return empty_progress(config, stats.total_sessions)
+    return ProgressStats(
+        max_primary=stats.max_primary,
+        avg_primary=stats.avg_primary,
+        last_primary=stats.last_primary,
+        total_sessions=stats.total_sessions,
+        primary_metric_name=config['name'],
+        primary_metric_unit=config['unit'],
+        progress_data=[progress_point(row, bucketed or isinstance(row, ArchivedPoint)) for row in rows]
+    )
+
+
+# `build(config, stats, rows, bucketed)` arma la respuesta; fast_json.py pasa su
+# propio builder para serializar las filas sin construir modelos Pydantic
+def compute_progress_stats(db: Session, user_id: int, exercise: Exercise, buckets: Optional[int] = None,
+                           build=build_progress_stats):
+    config = get_primary_metric_config(exercise.muscle_group)
+    stats = db.get(ProgressSummary, (user_id, exercise.id))
+
+    rows, bucketed = [], False
+    if stats is not None and stats.primary_count:
+        archived = archived_points(db.execute(archived_points_select(user_id, exercise.id)), config)
+        hot_count = stats.primary_count - sum(point.samples for point in archived)
+        rows, buckets = split_buckets(archived, hot_count, config, buckets)
+        if hot_count > 0:
+            stmt, bucketed = points_select(user_id, exercise.id, config, hot_count, buckets)
+            # Entrenamientos cargados después con fechas viejas pueden quedar entre meses archivados
+            rows = sorted([*rows, *db.execute(stmt)], key=point_date)
+    return build(config, stats, rows, bucketed)
+
+
+async def compute_progress_stats_async(db: AsyncSession, user_id: int, exercise: Exercise, buckets: Optional[int] = None,
+                                       build=build_progress_stats):
+    config = get_primary_metric_config(exercise.muscle_group)
+    stats = await db.get(ProgressSummary, (user_id, exercise.id))
+
+    rows, bucketed = [], False
+    if stats is not None and stats.primary_count:
+        archived = archived_points(await db.execute(archived_points_select(user_id, exercise.id)), config)
+        hot_count = stats.primary_count - sum(point.samples for point in archived)
+        rows, buckets = split_buckets(archived, hot_count, config, buckets)
+        if hot_count > 0:
+            stmt, bucketed = points_select(user_id, exercise.id, config, hot_count, buckets)
+            rows = sorted([*rows, *(await db.execute(stmt))], key=point_date)
+    return build(config, stats, rows, bucketed)
@@ -0,0 +1,83 @@
+"""
+Consultas compartidas por los endpoints sync (main.py) y async (async_api.py)
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import contains_eager
+
+from models import Exercise, WorkoutEntry
+
+# Paginación por cursor (keyset) sobre (date, id), de más reciente a más antiguo
+WORKOUTS_STREAM_CHUNK_SIZE = 500
+
+
+def encode_workouts_cursor(workout: WorkoutEntry) -> str:
+    raw = f"{workout.date.isoformat()}|{workout.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_workouts_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def workouts_select(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    exercise_id: Optional[int] = None,
+    muscle_group: Optional[str] = None,
+    cursor: Optional[str] = None,
+    columns: Optional[Sequence] = None,
+):
+    """Construye la consulta de entrenamientos con el ejercicio cargado en el mismo JOIN.
+
+    Con `columns` devuelve tuplas con esas columnas en lugar de objetos ORM.
+    """
+    if columns is None:
+        stmt = select(WorkoutEntry).join(WorkoutEntry.exercise).options(contains_eager(WorkoutEntry.exercise))
+    else:
+        stmt = select(*columns).join(WorkoutEntry.exercise)
+    stmt = stmt.where(WorkoutEntry.user_id == user_id)
+    if date_from is not None:
+        stmt = stmt.where(WorkoutEntry.date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(WorkoutEntry.date <= date_to)
+    if exercise_id is not None:
+        stmt = stmt.where(WorkoutEntry.exercise_id == exercise_id)
+    if muscle_group is not None:
+        stmt = stmt.where(Exercise.muscle_group == muscle_group)
+    if cursor is not None:
+        cursor_date, cursor_id = decode_workouts_cursor(cursor)
+        stmt = stmt.where(or_(
+            WorkoutEntry.date < cursor_date,
+            and_(WorkoutEntry.date == cursor_date, WorkoutEntry.id < cursor_id)
+        ))
+    return stmt.order_by(WorkoutEntry.date.desc(), WorkoutEntry.id.desc())
+
+
+def custom_exercises_select(user_id: int):
+    """Solo los ejercicios personalizados; los predefinidos vienen de catalog.py"""
+    return select(Exercise).where(Exercise.user_id == user_id).order_by(Exercise.id)
+
+
+def own_exercise_select(user_id: int, exercise_id: int):
+    return select(Exercise).where(
+        Exercise.id == exercise_id,
+        Exercise.user_id == user_id
+    )
+
+
+def own_workout_select(user_id: int, workout_id: int):
+    return select(WorkoutEntry).where(
+        WorkoutEntry.id == workout_id,
+        WorkoutEntry.user_id == user_id
+    )
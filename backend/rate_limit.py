@@ -0,0 +1,198 @@
+"""
+Rate limiting con token bucket: O(1) por request y memoria acotada.
+
+Cada clave (IP o usuario, y ruta + cliente) tiene un balde de `requests` fichas
+que se recarga a razón de requests / period_seconds. Un request autenticado usa
+el balde de su usuario en lugar del de su IP. Se toma una ficha de cada balde
+que aplica solo si todos tienen: un request rechazado no gasta fichas. El estado
+vive en un backend intercambiable:
+
+- MemoryBackend: por proceso, con desalojo LRU de las claves inactivas.
+- SQLiteBackend: archivo compartido para que el límite se respete entre
+  varios workers de uvicorn en la misma máquina.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+MAX_REQUESTS_PER_MINUTE = int(os.getenv("MAX_REQUESTS_PER_MINUTE", "100"))
+MAX_REQUESTS_PER_MINUTE_PER_USER = int(os.getenv("MAX_REQUESTS_PER_MINUTE_PER_USER", "300"))
+# Límites por ruta: "METODO /ruta=requests_por_minuto", separados por coma
+RATE_LIMIT_ROUTES = os.getenv(
+    "RATE_LIMIT_ROUTES",
+    "POST /api/auth/login=20,POST /api/auth/register=10"
+)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", os.path.join(BACKEND_DIR, "rate_limits.db"))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests: int
+    period_seconds: float = 60.0
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.requests / self.period_seconds
+
+
+def refill(tokens: float, updated_at: float, now: float, limit: RateLimit) -> float:
+    return min(float(limit.requests), tokens + (now - updated_at) * limit.refill_per_second)
+
+
+def consume_all(buckets: List[Tuple[float, RateLimit]]) -> Tuple[bool, List[float], float]:
+    """Una ficha de cada balde solo si todos tienen: (permitido, fichas restantes, segundos de espera)"""
+    waits = [(1 - tokens) / limit.refill_per_second for tokens, limit in buckets if tokens < 1]
+    if waits:
+        return False, [tokens for tokens, _ in buckets], max(waits)
+    return True, [tokens - 1 for tokens, _ in buckets], 0.0
+
+
+class MemoryBackend:
+    """Baldes en un OrderedDict; las claves menos usadas se desalojan primero"""
+
+    # No hace I/O: se puede llamar desde el event loop
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, checks: List[Tuple[str, RateLimit]], now: float) -> Tuple[bool, float]:
+        """Devuelve (permitido, segundos de espera) y consume solo si todos los baldes permiten"""
+        with self._lock:
+            buckets = []
+            for key, limit in checks:
+                state = self._buckets.pop(key, None)
+                buckets.append((float(limit.requests) if state is None else refill(state[0], state[1], now, limit), limit))
+            allowed, remaining, retry_after = consume_all(buckets)
+            for (key, _), tokens in zip(checks, remaining):
+                self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # El menos usado es el que lleva más tiempo inactivo (y más cerca de estar lleno)
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    """Baldes en una tabla SQLite compartida entre procesos"""
+
+    # Cada cuántas operaciones se borran los baldes inactivos
+    CLEANUP_EVERY = 1000
+    # Espera el lock de escritura del archivo: no se llama desde el event loop
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, idle_seconds: float = 3600):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._operations = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_updated_at ON rate_limit_buckets (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, checks: List[Tuple[str, RateLimit]], now: float) -> Tuple[bool, float]:
+        conn = self._connection()
+        # BEGIN IMMEDIATE toma el lock de escritura: leer y actualizar es atómico entre workers
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            buckets = []
+            for key, limit in checks:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                buckets.append((float(limit.requests) if row is None else refill(row[0], row[1], now, limit), limit))
+            allowed, remaining, retry_after = consume_all(buckets)
+            conn.executemany(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                [(key, tokens, now) for (key, _), tokens in zip(checks, remaining)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._operations += 1
+        if self._operations % self.CLEANUP_EVERY == 0:
+            conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.idle_seconds,))
+        return allowed, retry_after
+
+
+def parse_route_limits(spec: str) -> Dict[Tuple[str, str], RateLimit]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, requests = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        limits[(method.upper(), path.strip())] = RateLimit(int(requests))
+    return limits
+
+
+class RateLimiter:
+    def __init__(self, backend, default_limit: RateLimit, user_limit: Optional[RateLimit] = None,
+                 route_limits: Optional[Dict[Tuple[str, str], RateLimit]] = None):
+        self.backend = backend
+        self.default_limit = default_limit
+        self.user_limit = user_limit
+        self.route_limits = route_limits or {}
+
+    def limits_for(self, method: str, path: str, client_ip: str, user_id: Optional[int]) -> List[Tuple[str, RateLimit]]:
+        """Claves y límites que aplican a un request"""
+        # Con un token válido el límite es el del usuario (varios usuarios pueden compartir IP)
+        if user_id is not None and self.user_limit is not None:
+            client = f"user:{user_id}"
+            checks = [(client, self.user_limit)]
+        else:
+            client = f"ip:{client_ip}"
+            checks = [(client, self.default_limit)]
+        route_limit = self.route_limits.get((method, path))
+        if route_limit is not None:
+            checks.append((f"route:{method} {path}:{client}", route_limit))
+        return checks
+
+    def check(self, method: str, path: str, client_ip: str, user_id: Optional[int] = None,
+              now: Optional[float] = None) -> Tuple[bool, float]:
+        """Devuelve (permitido, segundos de espera sugeridos)"""
+        now = time.time() if now is None else now
+        return self.backend.take(self.limits_for(method, path, client_ip, user_id), now)
+
+
+def create_rate_limiter() -> RateLimiter:
+    if RATE_LIMIT_BACKEND == "sqlite":
+        backend = SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    else:
+        backend = MemoryBackend(RATE_LIMIT_MAX_KEYS)
+    return RateLimiter(
+        backend,
+        default_limit=RateLimit(MAX_REQUESTS_PER_MINUTE),
+        user_limit=RateLimit(MAX_REQUESTS_PER_MINUTE_PER_USER),
+        route_limits=parse_route_limits(RATE_LIMIT_ROUTES),
+    )
@@ -0,0 +1,356 @@
+"""
+Récords personales por usuario y ejercicio, detectados en cada escritura.
+
+personal_records guarda el mejor valor de cada tipo de récord y el
+entrenamiento que lo estableció:
+- max_weight: mayor peso
+- max_reps: más repeticiones con un peso dado (columna weight; 0 sin peso)
+- e1rm_epley / e1rm_brzycki: 1RM estimado, solo con series de hasta E1RM_MAX_REPS repeticiones
+- max_distance / max_time: mayor distancia o duración
+
+Al guardar un entrenamiento sus valores se comparan con la tabla en la misma
+transacción (INSERT ... ON CONFLICT que solo reemplaza si mejora; un empate lo
+conserva el entrenamiento más antiguo). Si se edita o borra el entrenamiento
+que tiene un récord, los récords de su par (usuario, ejercicio) se recalculan
+desde workout_entries con el índice (user_id, exercise_id, date), junto con las
+mejores marcas de lo archivado (archived_records, ver archive.py). Como en
+summaries.py, antes se bloquea la fila del usuario (data_versions.lock_user_data)
+para que el recálculo no pise récords de otra transacción sin confirmar.
+
+Uso (desde backend/):
+    python records.py rebuild   # recalcula todos los récords
+    python records.py check     # compara los récords con el historial
+"""
+import argparse
+import math
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, and_, case, cast, delete, event, func, insert, literal, or_, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from data_versions import lock_user_data
+from models import ArchivedRecord, PersonalRecord, WorkoutEntry
+from summaries import entry_values, previous_values, scope_filters
+
+record_table = PersonalRecord.__table__
+RECORD_KEY = ("user_id", "exercise_id", "record_type", "weight")
+RECORD_VALUES = ("value", "workout_id", "date")
+
+# Las fórmulas de 1RM pierden precisión con series largas
+E1RM_MAX_REPS = 12
+
+RECORD_UNITS = {
+    "max_weight": "kg",
+    "max_reps": "reps",
+    "e1rm_epley": "kg",
+    "e1rm_brzycki": "kg",
+    "max_distance": "km",
+    "max_time": "min",
+}
+RECORD_TYPE_PATTERN = f"^({'|'.join(RECORD_UNITS)})$"
+# Único récord ligado a un peso concreto; en el resto la columna weight vale 0
+# solo para completar la clave y la API la devuelve como null
+LOAD_RECORD_TYPES = ("max_reps",)
+
+
+def epley(weight: float, repetitions: int) -> float:
+    return weight * (1 + repetitions / 30)
+
+
+def brzycki(weight: float, repetitions: int) -> float:
+    return weight * 36 / (37 - repetitions)
+
+
+def record_candidates(values: dict) -> List[dict]:
+    """Récords que podría establecer un entrenamiento"""
+    weight = values.get("weight")
+    repetitions = values.get("repetitions")
+    lifted = weight is not None and weight > 0
+    candidates = []
+    if lifted:
+        candidates.append(("max_weight", 0.0, weight))
+    if repetitions is not None and repetitions > 0:
+        candidates.append(("max_reps", weight if lifted else 0.0, float(repetitions)))
+        if lifted and repetitions <= E1RM_MAX_REPS:
+            candidates.append(("e1rm_epley", 0.0, epley(weight, repetitions)))
+            candidates.append(("e1rm_brzycki", 0.0, brzycki(weight, repetitions)))
+    for record_type, field in (("max_distance", "distance_km"), ("max_time", "time_minutes")):
+        if values.get(field) is not None and values[field] > 0:
+            candidates.append((record_type, 0.0, values[field]))
+    return [
+        {"user_id": values["user_id"], "exercise_id": values["exercise_id"], "record_type": record_type,
+         "weight": weight_key, "value": value, "workout_id": values["id"], "date": values["date"]}
+        for record_type, weight_key, value in candidates
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Cálculo desde cero
+# ---------------------------------------------------------------------------
+
+def record_definitions():
+    """(tipo, peso, valor, condición) en SQL, con las mismas operaciones que record_candidates"""
+    w = WorkoutEntry
+    lifted = w.weight > 0
+    repetitions = cast(w.repetitions, Float)
+    e1rm_range = and_(lifted, w.repetitions > 0, w.repetitions <= E1RM_MAX_REPS)
+    return [
+        ("max_weight", literal(0.0), w.weight, lifted),
+        ("max_reps", case((lifted, w.weight), else_=0.0), repetitions, w.repetitions > 0),
+        ("e1rm_epley", literal(0.0), w.weight * (1 + repetitions / 30), e1rm_range),
+        ("e1rm_brzycki", literal(0.0), w.weight * 36 / (37 - repetitions), e1rm_range),
+        ("max_distance", literal(0.0), w.distance_km, w.distance_km > 0),
+        ("max_time", literal(0.0), w.time_minutes, w.time_minutes > 0),
+    ]
+
+
+def expected_records(connection: Connection, user_id: Optional[int] = None,
+                     exercise_ids: Optional[Iterable[int]] = None, archived: bool = True) -> Dict[Tuple, dict]:
+    """Mejor entrenamiento por (usuario, ejercicio, tipo, peso), en una sola consulta
+
+    archived=False omite archived_records (migraciones anteriores a que exista).
+    """
+    filters = scope_filters(user_id, exercise_ids)
+    candidates = union_all(*(
+        select(
+            WorkoutEntry.user_id,
+            WorkoutEntry.exercise_id,
+            literal(record_type).label("record_type"),
+            weight.label("weight"),
+            value.label("value"),
+            WorkoutEntry.id.label("workout_id"),
+            WorkoutEntry.date.label("date"),
+        ).where(*filters, condition)
+        for record_type, weight, value, condition in record_definitions()
+    )).subquery()
+    c = candidates.c
+    ranked = select(
+        candidates,
+        func.row_number().over(
+            partition_by=(c.user_id, c.exercise_id, c.record_type, c.weight),
+            order_by=(c.value.desc(), c.date, c.workout_id)
+        ).label("position")
+    ).subquery()
+    rows = connection.execute(
+        select(*(ranked.c[name] for name in RECORD_KEY + RECORD_VALUES)).where(ranked.c.position == 1)
+    )
+    records = {tuple(row._mapping[name] for name in RECORD_KEY): dict(row._mapping) for row in rows}
+    if archived:
+        for best in connection.execute(archived_records_select(user_id, exercise_ids)):
+            keep_best(records, dict(best._mapping))
+    return records
+
+
+def archived_records_select(user_id: Optional[int] = None, exercise_ids: Optional[Iterable[int]] = None):
+    a = ArchivedRecord
+    stmt = select(*(getattr(a, name) for name in RECORD_KEY + RECORD_VALUES))
+    if user_id is not None:
+        stmt = stmt.where(a.user_id == user_id)
+    if exercise_ids is not None:
+        stmt = stmt.where(a.exercise_id.in_(list(exercise_ids)))
+    return stmt
+
+
+def record_rank(record: dict):
+    # Mismo orden que is_better: mayor valor; con empate, el entrenamiento más antiguo
+    return (-record["value"], record["date"], record["workout_id"])
+
+
+def keep_best(records: Dict[Tuple, dict], candidate: dict) -> None:
+    key = tuple(candidate[name] for name in RECORD_KEY)
+    current = records.get(key)
+    if current is None or record_rank(candidate) < record_rank(current):
+        records[key] = candidate
+
+
+def rebuild_records(connection: Connection, user_id: Optional[int] = None,
+                    exercise_ids: Optional[Iterable[int]] = None, archived: bool = True) -> int:
+    """Reemplaza los récords del alcance por los calculados desde el historial"""
+    if exercise_ids is not None:
+        exercise_ids = list(exercise_ids)
+        if not exercise_ids:
+            return 0
+    lock_user_data(connection, user_id)
+    records = expected_records(connection, user_id, exercise_ids, archived)
+
+    stale = delete(record_table)
+    if user_id is not None:
+        stale = stale.where(record_table.c.user_id == user_id)
+    if exercise_ids is not None:
+        stale = stale.where(record_table.c.exercise_id.in_(exercise_ids))
+    connection.execute(stale)
+    if records:
+        connection.execute(insert(record_table), list(records.values()))
+    return len(records)
+
+
+# ---------------------------------------------------------------------------
+# Mantenimiento incremental
+# ---------------------------------------------------------------------------
+
+def is_better(value, date, workout_id, current_value, current_date, current_workout_id):
+    """Condición SQL de mejora: mayor valor; con empate, el entrenamiento más antiguo"""
+    return or_(
+        value > current_value,
+        and_(value == current_value, or_(
+            date < current_date,
+            and_(date == current_date, workout_id < current_workout_id)
+        ))
+    )
+
+
+def record_key(values: dict):
+    return [record_table.c[name] == values[name] for name in RECORD_KEY]
+
+
+def add_records(connection: Connection, entry: dict) -> None:
+    """Registra los récords que establece un entrenamiento (ya guardado)"""
+    candidates = record_candidates(entry)
+    if not candidates:
+        return
+    lock_user_data(connection, entry["user_id"])
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    dialect = dialects.get(connection.dialect.name)
+    c = record_table.c
+    if dialect is None:
+        for candidate in candidates:
+            current = connection.execute(select(record_table).where(*record_key(candidate))).first()
+            if current is None:
+                connection.execute(insert(record_table).values(candidate))
+            # Misma condición que is_better: fecha e id comparan al revés (gana el más antiguo)
+            elif (candidate["value"], current.date, current.workout_id) > (current.value, candidate["date"], candidate["workout_id"]):
+                connection.execute(delete(record_table).where(*record_key(candidate)))
+                connection.execute(insert(record_table).values(candidate))
+        return
+    stmt = dialect.insert(record_table).values(candidates)
+    excluded = stmt.excluded
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=list(RECORD_KEY),
+        set_={name: excluded[name] for name in RECORD_VALUES},
+        where=is_better(excluded.value, excluded.date, excluded.workout_id, c.value, c.date, c.workout_id)
+    ))
+
+
+def holds_records(connection: Connection, entry: dict) -> bool:
+    c = record_table.c
+    return connection.scalar(select(c.workout_id).where(
+        c.user_id == entry["user_id"], c.exercise_id == entry["exercise_id"], c.workout_id == entry["id"]
+    ).limit(1)) is not None
+
+
+def remove_records(connection: Connection, entry: dict) -> bool:
+    """Si el entrenamiento (ya modificado o borrado) tenía récords, recalcula su par"""
+    lock_user_data(connection, entry["user_id"])
+    if not holds_records(connection, entry):
+        return False
+    rebuild_records(connection, user_id=entry["user_id"], exercise_ids=[entry["exercise_id"]])
+    return True
+
+
+@event.listens_for(WorkoutEntry, "after_insert")
+def records_after_insert(mapper, connection, target):
+    add_records(connection, entry_values(target))
+
+
+@event.listens_for(WorkoutEntry, "after_update")
+def records_after_update(mapper, connection, target):
+    old, changed = previous_values(target)
+    if not changed:
+        return
+    new = entry_values(target)
+    recomputed = remove_records(connection, old)
+    # El recálculo ya lee la fila actualizada si el par no cambió
+    if recomputed and old["exercise_id"] == new["exercise_id"]:
+        return
+    add_records(connection, new)
+
+
+@event.listens_for(WorkoutEntry, "after_delete")
+def records_after_delete(mapper, connection, target):
+    remove_records(connection, entry_values(target))
+
+
+# ---------------------------------------------------------------------------
+# Lectura y verificación
+# ---------------------------------------------------------------------------
+
+def records_select(user_id: int, exercise_id: Optional[int] = None, record_type: Optional[str] = None):
+    """Récords del usuario en el orden de la clave primaria (sin tocar workout_entries)"""
+    c = record_table.c
+    stmt = select(c.exercise_id, c.record_type, c.weight, c.value, c.workout_id, c.date).where(c.user_id == user_id)
+    if exercise_id is not None:
+        stmt = stmt.where(c.exercise_id == exercise_id)
+    if record_type is not None:
+        stmt = stmt.where(c.record_type == record_type)
+    return stmt.order_by(c.exercise_id, c.record_type, c.weight)
+
+
+def record_rows(rows) -> List[dict]:
+    return [
+        dict(
+            row._mapping,
+            weight=row.weight if row.record_type in LOAD_RECORD_TYPES else None,
+            unit=RECORD_UNITS[row.record_type],
+        )
+        for row in rows
+    ]
+
+
+def values_match(stored, expected) -> bool:
+    if isinstance(stored, float) and isinstance(expected, float):
+        return math.isclose(stored, expected, rel_tol=1e-9, abs_tol=1e-6)
+    return stored == expected
+
+
+def check_records(connection: Connection, user_id: Optional[int] = None) -> List[str]:
+    """Diferencias entre los récords guardados y los calculados desde el historial"""
+    expected = expected_records(connection, user_id)
+    stored_stmt = select(record_table)
+    if user_id is not None:
+        stored_stmt = stored_stmt.where(record_table.c.user_id == user_id)
+    stored = {tuple(row._mapping[name] for name in RECORD_KEY): row._mapping for row in connection.execute(stored_stmt)}
+
+    problems = []
+    for key in sorted(expected.keys() | stored.keys()):
+        label = f"user={key[0]} exercise={key[1]} {key[2]}@{key[3]}"
+        if key not in stored:
+            problems.append(f"{label}: missing record")
+        elif key not in expected:
+            problems.append(f"{label}: record without workouts")
+        else:
+            for name in RECORD_VALUES:
+                if not values_match(stored[key][name], expected[key][name]):
+                    problems.append(f"{label}: {name} is {stored[key][name]!r}, expected {expected[key][name]!r}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de personal_records")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, help="Limitar a un usuario")
+    args = parser.parse_args()
+
+    from data_versions import bump_data_version
+    from database import engine
+
+    if args.command == "rebuild":
+        with engine.begin() as connection:
+            count = rebuild_records(connection, user_id=args.user_id)
+            bump_data_version(connection, args.user_id)
+        print(f"✅ {count} récords recalculados")
+        return
+
+    with engine.connect() as connection:
+        problems = check_records(connection, user_id=args.user_id)
+    if problems:
+        print(f"❌ {len(problems)} diferencias:")
+        for problem in problems:
+            print(f"   {problem}")
+        sys.exit(1)
+    print("✅ Los récords coinciden con el historial")
+
+
+if __name__ == "__main__":
+    main()
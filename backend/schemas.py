@@ -119,6 +119,29 @@ class WorkoutEntryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Bulk import schemas
+class BulkImportRowError(BaseModel):
+    row: int  # Número de fila (1 = primera fila de datos)
+    errors: List[str]
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportRowError]
+
+# Job schemas
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[dict] = None  # Lo que devuelve el trabajo (p. ej. un BulkImportResult)
+    error: Optional[str] = None    # Último error, también mientras queda un reintento
+
 # Progress schemas
 class ProgressDataPoint(BaseModel):
     date: str
@@ -129,6 +152,10 @@ class ProgressDataPoint(BaseModel):
     distance_km: Optional[float] = None
     primary_metric: float  # Métrica principal para el gráfico
     primary_label: str    # Etiqueta de la métrica principal
+    # Solo presentes cuando se pide downsampling (?buckets=N)
+    primary_min: Optional[float] = None
+    primary_max: Optional[float] = None
+    samples: Optional[int] = None
 
 class ProgressStats(BaseModel):
     max_primary: float
@@ -138,3 +165,118 @@ class ProgressStats(BaseModel):
     primary_metric_name: str  # "Peso", "Tiempo", etc.
     primary_metric_unit: str  # "kg", "min", etc.
     progress_data: List[ProgressDataPoint]
+
+# Personal records schemas
+class PersonalRecordResponse(BaseModel):
+    exercise_id: int
+    record_type: str  # max_weight, max_reps, e1rm_epley, e1rm_brzycki, max_distance, max_time
+    weight: Optional[float]  # Peso de los récords max_reps (None en el resto)
+    value: float
+    unit: str         # "kg", "reps", "km", "min"
+    workout_id: int
+    date: datetime
+
+# Dashboard overview schemas
+class ExerciseOverview(BaseModel):
+    exercise_id: int
+    name: str
+    muscle_group: str
+    total_sessions: int
+    # None si ninguna sesión tiene la métrica principal
+    max_primary: Optional[float] = None
+    avg_primary: Optional[float] = None
+    last_primary: Optional[float] = None
+    last_date: Optional[datetime] = None
+    primary_metric_name: str
+    primary_metric_unit: str
+    sparkline: Optional[List[float]] = None  # Últimos valores, del más antiguo al más reciente
+
+class MuscleGroupOverview(BaseModel):
+    muscle_group: str
+    exercises: int
+    total_sessions: int
+    volume: float  # peso × reps × series dentro del período
+
+class WeeklyVolume(BaseModel):
+    week_start: str  # Lunes de la semana (YYYY-MM-DD)
+    volume: float
+    sessions: int
+
+class ProgressOverview(BaseModel):
+    weeks: int
+    exercises: List[ExerciseOverview]
+    muscle_groups: List[MuscleGroupOverview]
+    weekly: List[WeeklyVolume]
+
+# Analytics schemas (analytics.py)
+class VolumePeriod(BaseModel):
+    period_start: str  # Lunes de la semana o primer día del mes (YYYY-MM-DD)
+    volume: float      # peso × reps × series
+    rolling_volume: float  # Media de los últimos `window` períodos
+    sets: int
+    entries: int
+    sessions: int      # Días con entrenamientos
+    time_minutes: float
+    distance_km: float
+
+class VolumeAnalytics(BaseModel):
+    period: str
+    window: int
+    periods: List[VolumePeriod]
+
+class ExerciseTrend(BaseModel):
+    exercise_id: int
+    name: Optional[str] = None
+    muscle_group: Optional[str] = None
+    metric_name: str
+    metric_unit: str
+    sessions: int
+    first_date: str
+    last_date: str
+    # Regresión lineal de la métrica principal; None con menos de dos fechas distintas
+    slope_per_week: Optional[float] = None
+    r2: Optional[float] = None
+    best: float
+    best_date: str
+    plateau: bool  # Sin superar la mejor marca en las últimas plateau_weeks
+
+class TrendAnalytics(BaseModel):
+    plateau_weeks: int
+    exercises: List[ExerciseTrend]
+
+class WorkloadDay(BaseModel):
+    date: str
+    load: float
+    acute: float    # Carga de los últimos 7 días
+    chronic: float  # Media semanal de los últimos 28 días
+    ratio: Optional[float] = None
+
+class WorkloadAnalytics(BaseModel):
+    metric: str  # "volume" (kg) o "time" (min)
+    days: int
+    ratio: Optional[float] = None
+    zone: Optional[str] = None  # low, optimal, caution, high
+    series: List[WorkloadDay]
+
+# Leaderboard schemas
+class LeaderboardEntryResponse(BaseModel):
+    rank: int  # Empates comparten puesto
+    user_id: int
+    name: Optional[str] = None
+    value: float
+
+class LeaderboardPosition(BaseModel):
+    value: float
+    percentile: float  # % de la cohorte con un valor menor o igual (resolución 100 / LEADERBOARD_SKETCH_SIZE)
+    rank: int
+    rank_is_estimate: bool  # Exacto si el usuario está en entries; si no, estimado desde el percentil
+
+class Leaderboard(BaseModel):
+    exercise_id: int
+    metric: str  # "e1rm" o "weekly_volume"
+    unit: str
+    users: int
+    refreshed_at: Optional[datetime] = None  # Los datos reflejan los entrenamientos guardados hasta este momento
+    max_staleness_seconds: Optional[float] = None  # None si la actualización periódica está desactivada
+    entries: List[LeaderboardEntryResponse]
+    you: Optional[LeaderboardPosition] = None
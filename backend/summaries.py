@@ -0,0 +1,396 @@
+"""
+Resumen de progreso por usuario y ejercicio, mantenido en cada escritura.
+
+progress_summaries guarda, para la métrica principal de cada (usuario,
+ejercicio): cantidad de sesiones, cantidad y suma de valores, máximo y último
+valor. Los listeners de WorkoutEntry lo actualizan en la misma transacción que
+el insert/update/delete, así las estadísticas de /api/progress se leen por
+clave primaria en lugar de recorrer el historial.
+
+El máximo y el último valor no se pueden "restar": si se quita el entrenamiento
+que los define, el resumen de ese par se recalcula desde workout_entries más
+los meses archivados (workout_archive_months, ver archive.py). Antes de tocar
+un resumen se bloquea la fila del usuario (data_versions.lock_user_data): en
+PostgreSQL el recálculo lee entonces lo ya confirmado por las demás
+transacciones del usuario y ninguna pisa el incremento de otra.
+
+Uso (desde backend/):
+    python summaries.py rebuild   # recalcula todos los resúmenes
+    python summaries.py check     # compara los resúmenes con el historial
+"""
+import argparse
+import math
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from data_versions import lock_user_data
+from models import Exercise, ProgressSummary, WorkoutArchiveMonth, WorkoutEntry
+from progress import SPECIAL_MUSCLE_GROUPS, get_primary_metric_config, primary_metric_columns
+
+summary_table = ProgressSummary.__table__
+SUMMARY_KEY = ("user_id", "exercise_id")
+SUMMARY_VALUES = ("total_sessions", "primary_count", "primary_sum", "max_primary", "last_primary", "last_date", "last_workout_id")
+
+# Campos que pueden cambiar el resumen al editar un entrenamiento
+TRACKED_FIELDS = ("exercise_id", "date", "weight", "repetitions", "time_minutes", "distance_km")
+
+
+def primary_value(config: dict, values: dict) -> Optional[float]:
+    value = values.get(config['field'])
+    return values.get(config['fallback_field']) if value is None else value
+
+
+def exercise_config(connection: Connection, exercise_id: int) -> dict:
+    muscle_group = connection.scalar(select(Exercise.muscle_group).where(Exercise.id == exercise_id))
+    return get_primary_metric_config(muscle_group)
+
+
+def summary_key(values: dict):
+    return (summary_table.c.user_id == values["user_id"], summary_table.c.exercise_id == values["exercise_id"])
+
+
+# ---------------------------------------------------------------------------
+# Cálculo desde cero
+# ---------------------------------------------------------------------------
+
+def computed_summaries(connection: Connection, config: dict, *filters) -> Dict[Tuple[int, int], dict]:
+    """Resúmenes calculados desde workout_entries para las filas que cumplen `filters`"""
+    primary, _ = primary_metric_columns(config)
+    totals = select(
+        WorkoutEntry.user_id,
+        WorkoutEntry.exercise_id,
+        func.count().label('total_sessions'),
+        func.count(primary).label('primary_count'),
+        func.coalesce(func.sum(primary), 0).label('primary_sum'),
+        func.max(primary).label('max_primary')
+    ).where(*filters).group_by(WorkoutEntry.user_id, WorkoutEntry.exercise_id)
+
+    ranked = select(
+        WorkoutEntry.user_id,
+        WorkoutEntry.exercise_id,
+        primary.label('last_primary'),
+        WorkoutEntry.date.label('last_date'),
+        WorkoutEntry.id.label('last_workout_id'),
+        func.row_number().over(
+            partition_by=(WorkoutEntry.user_id, WorkoutEntry.exercise_id),
+            order_by=(WorkoutEntry.date.desc(), WorkoutEntry.id.desc())
+        ).label('position')
+    ).where(*filters, primary.isnot(None)).subquery()
+    latest = select(
+        ranked.c.user_id, ranked.c.exercise_id, ranked.c.last_primary, ranked.c.last_date, ranked.c.last_workout_id
+    ).where(ranked.c.position == 1)
+
+    summaries = {
+        (row.user_id, row.exercise_id): dict(row._mapping, last_primary=None, last_date=None, last_workout_id=None)
+        for row in connection.execute(totals)
+    }
+    for row in connection.execute(latest):
+        summaries[(row.user_id, row.exercise_id)].update(
+            last_primary=row.last_primary, last_date=row.last_date, last_workout_id=row.last_workout_id
+        )
+    return summaries
+
+
+def archived_summaries(connection: Connection, user_id: Optional[int] = None,
+                       exercise_ids: Optional[Iterable[int]] = None) -> Dict[Tuple[int, int], dict]:
+    """Aporte de los meses archivados a cada resumen"""
+    m = WorkoutArchiveMonth
+    stmt = select(
+        m.user_id, m.exercise_id, m.sessions, m.primary_count, m.primary_sum, m.primary_max,
+        m.last_primary, m.last_date, m.last_workout_id
+    )
+    if user_id is not None:
+        stmt = stmt.where(m.user_id == user_id)
+    if exercise_ids is not None:
+        stmt = stmt.where(m.exercise_id.in_(list(exercise_ids)))
+    summaries = {}
+    for row in connection.execute(stmt):
+        merge_summary(summaries, {
+            "user_id": row.user_id, "exercise_id": row.exercise_id, "total_sessions": row.sessions,
+            "primary_count": row.primary_count, "primary_sum": row.primary_sum, "max_primary": row.primary_max,
+            "last_primary": row.last_primary, "last_date": row.last_date, "last_workout_id": row.last_workout_id,
+        })
+    return summaries
+
+
+def merge_summary(summaries: Dict[Tuple[int, int], dict], other: dict) -> None:
+    """Suma `other` al resumen de su par en `summaries`"""
+    key = (other["user_id"], other["exercise_id"])
+    current = summaries.get(key)
+    if current is None:
+        summaries[key] = dict(other)
+        return
+    current["total_sessions"] += other["total_sessions"]
+    current["primary_count"] += other["primary_count"]
+    current["primary_sum"] += other["primary_sum"]
+    if other["max_primary"] is not None and (current["max_primary"] is None or other["max_primary"] > current["max_primary"]):
+        current["max_primary"] = other["max_primary"]
+    if other["last_date"] is not None and (
+        current["last_date"] is None
+        or (other["last_date"], other["last_workout_id"]) > (current["last_date"], current["last_workout_id"])
+    ):
+        current.update(last_primary=other["last_primary"], last_date=other["last_date"], last_workout_id=other["last_workout_id"])
+
+
+def metric_groups() -> Iterable[Tuple[object, dict]]:
+    """(condición sobre Exercise.muscle_group, configuración de la métrica principal)"""
+    for muscle_group in SPECIAL_MUSCLE_GROUPS:
+        yield Exercise.muscle_group == muscle_group, get_primary_metric_config(muscle_group)
+    yield (
+        or_(Exercise.muscle_group.notin_(SPECIAL_MUSCLE_GROUPS), Exercise.muscle_group.is_(None)),
+        get_primary_metric_config(None)
+    )
+
+
+def scope_filters(user_id: Optional[int] = None, exercise_ids: Optional[Iterable[int]] = None):
+    filters = []
+    if user_id is not None:
+        filters.append(WorkoutEntry.user_id == user_id)
+    if exercise_ids is not None:
+        filters.append(WorkoutEntry.exercise_id.in_(list(exercise_ids)))
+    return filters
+
+
+def expected_summaries(connection: Connection, user_id: Optional[int] = None,
+                       exercise_ids: Optional[Iterable[int]] = None, archived: bool = True) -> Dict[Tuple[int, int], dict]:
+    """Resúmenes esperados para todo el alcance, una consulta por tipo de métrica
+
+    archived=False omite workout_archive_months (migraciones anteriores a que exista).
+    """
+    if exercise_ids is not None:
+        exercise_ids = list(exercise_ids)
+    filters = scope_filters(user_id, exercise_ids)
+    summaries = {}
+    for condition, config in metric_groups():
+        exercises = select(Exercise.id).where(condition)
+        if exercise_ids is not None:
+            # Con alcance, la subconsulta lee solo esos ejercicios por clave primaria
+            exercises = exercises.where(Exercise.id.in_(exercise_ids))
+        exercise_filter = WorkoutEntry.exercise_id.in_(exercises)
+        summaries.update(computed_summaries(connection, config, *filters, exercise_filter))
+    if archived:
+        for month_totals in archived_summaries(connection, user_id, exercise_ids).values():
+            merge_summary(summaries, month_totals)
+    return summaries
+
+
+def rebuild_summaries(connection: Connection, user_id: Optional[int] = None,
+                      exercise_ids: Optional[Iterable[int]] = None, archived: bool = True) -> int:
+    """Reemplaza los resúmenes del alcance por los calculados desde el historial"""
+    if exercise_ids is not None:
+        exercise_ids = list(exercise_ids)
+        if not exercise_ids:
+            return 0
+    lock_user_data(connection, user_id)
+    summaries = expected_summaries(connection, user_id, exercise_ids, archived)
+
+    stale = delete(summary_table)
+    if user_id is not None:
+        stale = stale.where(summary_table.c.user_id == user_id)
+    if exercise_ids is not None:
+        stale = stale.where(summary_table.c.exercise_id.in_(exercise_ids))
+    connection.execute(stale)
+    if summaries:
+        connection.execute(insert(summary_table), list(summaries.values()))
+    return len(summaries)
+
+
+def upsert_summary(connection: Connection, values: dict) -> None:
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    dialect = dialects.get(connection.dialect.name)
+    if dialect is None:
+        connection.execute(delete(summary_table).where(*summary_key(values)))
+        connection.execute(insert(summary_table).values(values))
+        return
+    stmt = dialect.insert(summary_table).values(values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=list(SUMMARY_KEY),
+        set_={name: stmt.excluded[name] for name in SUMMARY_VALUES}
+    ))
+
+
+def recompute_summary(connection: Connection, user_id: int, exercise_id: int) -> None:
+    """Recalcula un solo par (usuario, ejercicio) con el índice (user_id, exercise_id, date)"""
+    lock_user_data(connection, user_id)
+    config = exercise_config(connection, exercise_id)
+    summaries = computed_summaries(
+        connection, config, WorkoutEntry.user_id == user_id, WorkoutEntry.exercise_id == exercise_id
+    )
+    for month_totals in archived_summaries(connection, user_id, [exercise_id]).values():
+        merge_summary(summaries, month_totals)
+    computed = summaries.get((user_id, exercise_id))
+    if computed is None:
+        connection.execute(delete(summary_table).where(*summary_key({"user_id": user_id, "exercise_id": exercise_id})))
+    else:
+        upsert_summary(connection, computed)
+
+
+# ---------------------------------------------------------------------------
+# Mantenimiento incremental
+# ---------------------------------------------------------------------------
+
+def add_to_summary(connection: Connection, entry: dict) -> None:
+    """Suma un entrenamiento (ya guardado) al resumen de su par"""
+    lock_user_data(connection, entry["user_id"])
+    c = summary_table.c
+    config = exercise_config(connection, entry["exercise_id"])
+    value = primary_value(config, entry)
+    changes = {c.total_sessions: c.total_sessions + 1}
+    if value is not None:
+        newer = or_(
+            c.last_date.is_(None),
+            c.last_date < entry["date"],
+            and_(c.last_date == entry["date"], c.last_workout_id < entry["id"])
+        )
+        # Todas las expresiones del SET ven los valores anteriores de la fila
+        changes.update({
+            c.primary_count: c.primary_count + 1,
+            c.primary_sum: c.primary_sum + value,
+            c.max_primary: case((or_(c.max_primary.is_(None), c.max_primary < value), value), else_=c.max_primary),
+            c.last_primary: case((newer, value), else_=c.last_primary),
+            c.last_date: case((newer, entry["date"]), else_=c.last_date),
+            c.last_workout_id: case((newer, entry["id"]), else_=c.last_workout_id),
+        })
+    result = connection.execute(update(summary_table).where(*summary_key(entry)).values(changes))
+    if result.rowcount == 0:
+        # Primer entrenamiento del par (o resumen faltante)
+        recompute_summary(connection, entry["user_id"], entry["exercise_id"])
+
+
+def remove_from_summary(connection: Connection, entry: dict) -> bool:
+    """Resta un entrenamiento (ya modificado o borrado); devuelve True si hubo que recalcular"""
+    lock_user_data(connection, entry["user_id"])
+    c = summary_table.c
+    config = exercise_config(connection, entry["exercise_id"])
+    value = primary_value(config, entry)
+    changes = {c.total_sessions: c.total_sessions - 1}
+    conditions = [*summary_key(entry), c.total_sessions > 1]
+    if value is not None:
+        changes.update({c.primary_count: c.primary_count - 1, c.primary_sum: c.primary_sum - value})
+        # Solo se puede restar si el entrenamiento no es el máximo ni el último
+        conditions += [c.max_primary > value, c.last_workout_id != entry["id"]]
+    result = connection.execute(update(summary_table).where(*conditions).values(changes))
+    if result.rowcount == 0:
+        recompute_summary(connection, entry["user_id"], entry["exercise_id"])
+        return True
+    return False
+
+
+def entry_values(target: WorkoutEntry) -> dict:
+    values = {field: getattr(target, field) for field in TRACKED_FIELDS}
+    values.update(id=target.id, user_id=target.user_id)
+    return values
+
+
+def previous_values(target: WorkoutEntry) -> Tuple[dict, bool]:
+    """Valores anteriores al update y si cambió algún campo que afecte el resumen"""
+    state = inspect(target)
+    values = entry_values(target)
+    changed = False
+    for field in TRACKED_FIELDS:
+        history = state.attrs[field].history
+        if history.has_changes():
+            changed = True
+            values[field] = history.deleted[0] if history.deleted else None
+    return values, changed
+
+
+@event.listens_for(WorkoutEntry, "after_insert")
+def summary_after_insert(mapper, connection, target):
+    add_to_summary(connection, entry_values(target))
+
+
+@event.listens_for(WorkoutEntry, "after_update")
+def summary_after_update(mapper, connection, target):
+    old, changed = previous_values(target)
+    if not changed:
+        return
+    new = entry_values(target)
+    recomputed = remove_from_summary(connection, old)
+    # El recálculo ya lee la fila actualizada si el par no cambió
+    if recomputed and old["exercise_id"] == new["exercise_id"]:
+        return
+    add_to_summary(connection, new)
+
+
+@event.listens_for(WorkoutEntry, "after_delete")
+def summary_after_delete(mapper, connection, target):
+    remove_from_summary(connection, entry_values(target))
+
+
+@event.listens_for(Exercise, "after_update")
+def summary_after_exercise_update(mapper, connection, target):
+    # Cambiar el grupo muscular cambia la métrica principal de todo el historial
+    if inspect(target).attrs.muscle_group.history.has_changes():
+        # Un ejercicio propio solo tiene entrenamientos de su dueño
+        rebuild_summaries(connection, user_id=target.user_id, exercise_ids=[target.id])
+
+
+# ---------------------------------------------------------------------------
+# Verificación
+# ---------------------------------------------------------------------------
+
+def values_match(stored, expected) -> bool:
+    if isinstance(stored, float) or isinstance(expected, float):
+        if stored is None or expected is None:
+            return stored is expected
+        return math.isclose(stored, expected, rel_tol=1e-9, abs_tol=1e-6)
+    return stored == expected
+
+
+def check_summaries(connection: Connection, user_id: Optional[int] = None) -> List[str]:
+    """Diferencias entre los resúmenes guardados y los calculados desde el historial"""
+    expected = expected_summaries(connection, user_id)
+    stored_stmt = select(summary_table)
+    if user_id is not None:
+        stored_stmt = stored_stmt.where(summary_table.c.user_id == user_id)
+    stored = {(row.user_id, row.exercise_id): row._mapping for row in connection.execute(stored_stmt)}
+
+    problems = []
+    for key in sorted(expected.keys() | stored.keys()):
+        if key not in stored:
+            problems.append(f"user={key[0]} exercise={key[1]}: missing summary")
+        elif key not in expected:
+            problems.append(f"user={key[0]} exercise={key[1]}: summary without workouts")
+        else:
+            for name in SUMMARY_VALUES:
+                if not values_match(stored[key][name], expected[key][name]):
+                    problems.append(
+                        f"user={key[0]} exercise={key[1]}: {name} is {stored[key][name]!r}, expected {expected[key][name]!r}"
+                    )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de progress_summaries")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, help="Limitar a un usuario")
+    args = parser.parse_args()
+
+    from data_versions import bump_data_version
+    from database import engine
+
+    if args.command == "rebuild":
+        with engine.begin() as connection:
+            count = rebuild_summaries(connection, user_id=args.user_id)
+            # Las estadísticas pudieron cambiar: invalida ETags y respuestas en caché
+            bump_data_version(connection, args.user_id)
+        print(f"✅ {count} resúmenes recalculados")
+        return
+
+    with engine.connect() as connection:
+        problems = check_summaries(connection, user_id=args.user_id)
+    if problems:
+        print(f"❌ {len(problems)} diferencias:")
+        for problem in problems:
+            print(f"   {problem}")
+        sys.exit(1)
+    print("✅ Los resúmenes coinciden con el historial")
+
+
+if __name__ == "__main__":
+    main()